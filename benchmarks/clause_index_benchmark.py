@@ -0,0 +1,105 @@
+"""
+Recall / latency benchmark for the clause index
+
+Builds an index of synthetic contract clauses, then queries it with lightly
+reworded copies to see how often the original clause comes back.
+
+Usage:
+    python -m benchmarks.clause_index_benchmark --clauses 20000 --queries 500
+"""
+import argparse
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from src.graph.clause_index import ClauseIndex, HashingEmbedder
+
+SUBJECTS = ["Brand", "Company", "Client", "Licensee", "Agency", "Sponsor", "Creator", "Contractor"]
+VERBS = ["shall own", "may use", "is granted", "retains", "shall not license", "may terminate", "shall pay",
+         "shall indemnify", "may repost", "shall approve"]
+OBJECTS = ["all content", "the deliverables", "any derivative works", "the sponsored posts", "all invoices",
+           "the campaign materials", "third-party claims", "the usage rights", "the license", "the agreement"]
+QUALIFIERS = ["in perpetuity", "throughout the universe", "for twelve months", "within thirty days",
+              "on an exclusive basis", "royalty-free", "without prior notice", "upon written notice",
+              "net 90 days after invoice", "for any purpose", "in all media now known or later devised",
+              "subject to Creator approval", "worldwide", "for paid social only", "for organic use only"]
+FILLER = ["hereunder", "notwithstanding the foregoing", "to the extent permitted by law",
+          "as set forth in Exhibit A", "pursuant to Section 4", "at its sole discretion"]
+LEVELS = ["Low", "Medium", "High"]
+
+
+def make_clause(rng: random.Random) -> str:
+    parts = [rng.choice(SUBJECTS), rng.choice(VERBS), rng.choice(OBJECTS)]
+    parts += rng.sample(QUALIFIERS, 2) + rng.sample(FILLER, 2)
+    parts.append(f"(ref {rng.randint(1000, 99999)})")
+    return " ".join(parts)
+
+
+def perturb(text: str, rng: random.Random) -> str:
+    """Drop a word and swap two neighbours - typical re-wording between contracts"""
+    words = text.split()
+    if len(words) > 6:
+        words.pop(rng.randrange(len(words)))
+        i = rng.randrange(len(words) - 1)
+        words[i], words[i + 1] = words[i + 1], words[i]
+    return " ".join(words)
+
+
+def percentile(values: list, pct: float) -> float:
+    return float(np.percentile(np.array(values), pct)) if values else 0.0
+
+
+def run(num_clauses: int, num_queries: int, k: int, batch: int, seed: int):
+    rng = random.Random(seed)
+    clauses = [make_clause(rng) for _ in range(num_clauses)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = ClauseIndex(index_dir=tmp, embedder=HashingEmbedder())
+
+        start = time.perf_counter()
+        for i in range(0, num_clauses, batch):
+            index.add([{"text": c, "level": rng.choice(LEVELS)} for c in clauses[i:i + batch]])
+        add_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        reloaded = ClauseIndex(index_dir=tmp, embedder=HashingEmbedder())
+        load_seconds = time.perf_counter() - start
+        assert len(reloaded) == len(index), "persisted index size mismatch"
+
+        targets = rng.sample(clauses, min(num_queries, len(clauses)))
+        queries = [perturb(t, rng) for t in targets]
+
+        latencies = []
+        hit_at_1 = hit_at_k = 0
+        for target, query in zip(targets, queries):
+            start = time.perf_counter()
+            hits = reloaded.search([query], k=k)[0]
+            latencies.append((time.perf_counter() - start) * 1000)
+            texts = [h["text"] for h in hits]
+            hit_at_1 += bool(texts) and texts[0] == target
+            hit_at_k += target in texts
+
+        start = time.perf_counter()
+        reloaded.search(queries, k=k)
+        batch_ms = (time.perf_counter() - start) * 1000
+
+    print(f"Clauses indexed:      {num_clauses} (batches of {batch})")
+    print(f"Incremental add:      {add_seconds:.2f}s total, {num_clauses / add_seconds:,.0f} clauses/s")
+    print(f"Reload from disk:     {load_seconds * 1000:.1f} ms")
+    print(f"Recall@1:             {hit_at_1 / len(queries):.3f}")
+    print(f"Recall@{k}:             {hit_at_k / len(queries):.3f}")
+    print(f"Single query latency: p50 {percentile(latencies, 50):.2f} ms, p95 {percentile(latencies, 95):.2f} ms")
+    print(f"Batched {len(queries)} queries:  {batch_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clauses", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    run(args.clauses, args.queries, args.k, args.batch, args.seed)
@@ -0,0 +1,107 @@
+"""
+Latency / token benchmark: express mode vs. the full legal graph
+
+Runs each mode on the same contract (notifications disabled) and reports wall
+time, number of LLM round trips and token usage. Makes real LLM calls, so
+OPENAI_API_KEY must be set.
+
+Usage:
+    python -m benchmarks.express_benchmark --pdf contract.pdf --runs 3
+    python -m benchmarks.express_benchmark --modes legal,express   # built-in sample contract
+"""
+import argparse
+import os
+import statistics
+import time
+
+# Every run has to make its own LLM calls and leave the shared clause index untouched
+os.environ["LLM_CACHE"] = "0"
+os.environ["CLAUSE_INDEX_ENABLED"] = "0"
+
+from langchain_core.callbacks import BaseCallbackHandler, UsageMetadataCallbackHandler
+
+from src.graph.legal_graph import build_initial_state, create_legal_graph
+
+SAMPLE_CONTRACT = """SPONSORSHIP AGREEMENT
+
+This Sponsorship Agreement (the "Agreement") is entered into as of January 15, 2026 (the "Effective Date")
+by and between Northwind Outdoor Gear Inc. ("Brand") and Jamie Rivera ("Creator").
+
+1. Services. Creator shall produce and publish one (1) Instagram Reel and two (2) Instagram Stories
+featuring Brand's TrailLite backpack. The Reel shall be delivered for approval by February 10, 2026
+at 5:00 PM PST and published within 5 business days of approval.
+
+2. Compensation. Brand shall pay Creator $4,500 within net 60 days after receipt of a valid invoice.
+No payment is due for content that is not approved by Brand.
+
+3. License. Creator grants Brand a worldwide, royalty-free, irrevocable license to use, edit and
+repost the content in perpetuity in all media now known or later devised.
+
+4. Exclusivity. During the term and for twelve (12) months thereafter, Creator shall not promote any
+competing outdoor apparel or equipment brand.
+
+5. Termination. Brand may terminate this Agreement at any time, for any reason, upon written notice.
+Upon termination, Creator shall refund any fees paid for content not yet published.
+
+6. Indemnification. Creator shall indemnify and hold harmless Brand from any and all claims arising
+out of the content, including claims caused by Brand's edits.
+
+7. Governing Law. This Agreement is governed by the laws of the State of California.
+"""
+
+
+class CallCounter(BaseCallbackHandler):
+    """Counts chat model round trips"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.calls += 1
+
+
+def run_mode(mode: str, contract_text: str) -> dict:
+    graph = create_legal_graph(mode, notify=False)
+    usage = UsageMetadataCallbackHandler()
+    counter = CallCounter()
+    started = time.perf_counter()
+    final_state = graph.invoke(
+        build_initial_state(contract_text, "benchmark@example.com", mode, run_id=f"benchmark-{mode}"),
+        {"callbacks": [usage, counter]}
+    )
+    elapsed = time.perf_counter() - started
+    totals = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+    for model_usage in usage.usage_metadata.values():
+        for key in totals:
+            totals[key] += model_usage.get(key, 0)
+    return {"seconds": elapsed, "llm_calls": counter.calls, "error": final_state.get("error"), **totals}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", help="Contract PDF (defaults to a built-in sample contract)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--modes", default="legal,express")
+    args = parser.parse_args()
+
+    contract_text = SAMPLE_CONTRACT
+    if args.pdf:
+        import pdfplumber
+        with pdfplumber.open(args.pdf) as pdf:
+            contract_text = "\n".join(page.extract_text() or "" for page in pdf.pages)
+    print(f"Contract: {len(contract_text)} chars, {args.runs} run(s) per mode\n")
+
+    print(f"{'mode':<10} {'p50 s':>8} {'min s':>8} {'LLM calls':>10} {'input tok':>10} {'output tok':>11}")
+    for mode in args.modes.split(","):
+        results = [run_mode(mode, contract_text) for _ in range(args.runs)]
+        errors = [r["error"] for r in results if r["error"]]
+        seconds = [r["seconds"] for r in results]
+        print(f"{mode:<10} {statistics.median(seconds):>8.2f} {min(seconds):>8.2f} "
+              f"{statistics.mean(r['llm_calls'] for r in results):>10.1f} "
+              f"{statistics.mean(r['input_tokens'] for r in results):>10.0f} "
+              f"{statistics.mean(r['output_tokens'] for r in results):>11.0f}"
+              + (f"  ({len(errors)} failed: {errors[0]})" if errors else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Startup benchmark: how long importing the app takes, and what it imports
+
+Runs `python -X importtime -c "import src.app"` in a fresh interpreter (a
+gunicorn worker / container cold start pays the same cost) and reports the
+total import time and the slowest top-level packages. --warm-up also times
+src.graph.legal_graph.warm_up() after the import.
+
+Usage:
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --profile benchmarks/startup_profile.txt   # save the raw -X importtime output
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_profile(module: str = "src.app", warm_up: bool = False) -> tuple:
+    """Raw -X importtime output and wall time (seconds) for one fresh interpreter"""
+    code = (
+        "import time; t = time.perf_counter(); "
+        f"import {module}; "
+        + ("from src.graph.legal_graph import warm_up; warm_up(); " if warm_up else "")
+        + "print(time.perf_counter() - t)"
+    )
+    env = {**os.environ, "APP_PASSWORD_HASH": os.getenv("APP_PASSWORD_HASH", "benchmark")}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    seconds = float(result.stdout.strip().splitlines()[-1])
+    return result.stderr, seconds
+
+
+def slowest_packages(profile: str, top: int = 10) -> list:
+    """(top-level package, ms) summing the self time of every module it imported"""
+    totals = {}
+    for line in profile.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # header line
+        package = name.strip().split(".")[0]
+        totals[package] = totals.get(package, 0) + int(self_us) / 1000
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="src.app")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--warm-up", action="store_true", help="also time warm_up() after the import")
+    parser.add_argument("--profile", help="write the last run's -X importtime output here")
+    args = parser.parse_args()
+
+    times = []
+    profile = ""
+    for _ in range(args.runs):
+        profile, seconds = import_profile(args.module, args.warm_up)
+        times.append(seconds)
+
+    label = f"import {args.module}" + (" + warm_up()" if args.warm_up else "")
+    print(f"{label}: median {statistics.median(times):.3f}s "
+          f"(min {min(times):.3f}s, max {max(times):.3f}s, {args.runs} runs)")
+    print("\nSlowest packages (ms, self time of all their modules):")
+    for package, ms in slowest_packages(profile, args.top):
+        print(f"  {package:<28} {ms:>9.1f}")
+
+    if args.profile:
+        with open(args.profile, "w") as f:
+            f.write(profile)
+        print(f"\nRaw profile written to {args.profile}")
+
+
+if __name__ == "__main__":
+    main()
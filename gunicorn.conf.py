@@ -0,0 +1,27 @@
+"""
+Gunicorn settings (loaded automatically from the working directory)
+Set WARM_UP=1 to compile the graphs, create the LLM clients and import the
+heavy dependencies in each worker before it accepts traffic, so the first
+request doesn't pay for them.
+"""
+import os
+
+WARM_UP = os.getenv("WARM_UP", "0") == "1"
+
+
+def post_worker_init(worker):
+    # With REDIS_URL, each web worker also takes jobs from the shared queue
+    from src.jobs import jobs
+    if hasattr(jobs, "start_workers"):
+        jobs.start_workers()
+    # Digests already waiting in the outbox flush on their interval after a restart
+    from src.graph.digest import start_flusher
+    start_flusher()
+    if not WARM_UP:
+        return
+    try:
+        from src.graph.legal_graph import warm_up
+        warm_up()
+    except Exception as e:
+        # A failed warm-up only costs the first request some latency
+        worker.log.warning(f"Warm-up failed: {e}")
@@ -0,0 +1,319 @@
+"""
+JSON API for internal integrations - token authenticated, bulk uploads
+POST /api/v1/analyses accepts several PDFs (or zips of PDFs) in one request,
+starts one background analysis per contract and returns job ids; results
+(parsed contract, risks, deliverables, summary markdown) come back from the
+results endpoints, or directly with ?wait=<seconds>.
+
+Tokens: API_TOKENS="name:token,other:token2" (a bare token is named "api").
+Send one as "Authorization: Bearer <token>" or "X-API-Token: <token>".
+"""
+import hmac
+import json
+import os
+import time
+import uuid
+import zipfile
+from functools import wraps
+
+from flask import Blueprint, g, jsonify, request
+
+from src.graph.legal_graph import run_legal_analysis
+from src.graph.progress import set_run_owner
+from src.graph.redis_client import get_redis, redis_key
+from src.graph.quick_look import quick_look
+from src.graph.text_normalizer import normalize_pages
+from src.jobs import JOB_TTL_SECONDS, USER_PRIORITIES, estimate_run_seconds, jobs
+from src.uploads import MAX_UPLOAD_BYTES, UploadError, read_pdf_upload
+
+API_MAX_CONTRACTS = int(os.getenv("API_MAX_CONTRACTS", "20"))
+# Whole-request cap for bulk uploads (each PDF is still limited to MAX_UPLOAD_MB)
+API_MAX_REQUEST_MB = float(os.getenv("API_MAX_REQUEST_MB", "100"))
+API_MAX_WAIT_SECONDS = float(os.getenv("API_MAX_WAIT_SECONDS", "300"))
+MODES = ("legal", "creator", "express")
+
+api = Blueprint("api", __name__, url_prefix="/api/v1")
+
+# Batches of this process, when Redis isn't there to share them
+_batches = {}
+
+
+def load_tokens() -> dict:
+    """token -> client name from API_TOKENS"""
+    tokens = {}
+    for entry in os.getenv("API_TOKENS", "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, _, token = entry.rpartition(":")
+        tokens[token] = name or "api"
+    return tokens
+
+
+API_TOKENS = load_tokens()
+
+
+def token_required(fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not API_TOKENS:
+            return jsonify({"success": False, "message": "API is not configured (API_TOKENS)"}), 503
+        header = request.headers.get("Authorization", "")
+        supplied = header[7:].strip() if header.lower().startswith("bearer ") else request.headers.get("X-API-Token", "")
+        # Compare against every token so timing doesn't reveal which one matched
+        client = None
+        for token, name in API_TOKENS.items():
+            if hmac.compare_digest(supplied.encode(), token.encode()):
+                client = name
+        if not supplied or client is None:
+            return jsonify({"success": False, "message": "Invalid or missing API token"}), 401
+        g.api_client = client
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+@api.before_request
+def allow_bulk_uploads():
+    request.max_content_length = int(API_MAX_REQUEST_MB * 1024 * 1024)
+
+
+def _flag(value) -> bool:
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+
+def collect_contracts(files) -> tuple:
+    """
+    Extract every contract from the uploaded PDFs and zips
+    Returns ([(filename, pages)], [{"filename", "message", "status"}])
+    """
+    contracts, errors = [], []
+
+    def add(filename, stream):
+        if len(contracts) >= API_MAX_CONTRACTS:
+            errors.append({"filename": filename, "status": 413,
+                           "message": f"More than {API_MAX_CONTRACTS} contracts in one request"})
+            return
+        try:
+            contracts.append((filename, read_pdf_upload(stream)))
+        except UploadError as e:
+            errors.append({"filename": filename, "message": str(e), "status": e.status})
+
+    for upload in files:
+        name = upload.filename or "contract.pdf"
+        if name.lower().endswith(".zip"):
+            try:
+                with zipfile.ZipFile(upload.stream) as archive:
+                    for member in archive.infolist():
+                        if member.is_dir() or not member.filename.lower().endswith(".pdf") \
+                                or os.path.basename(member.filename).startswith("."):
+                            continue
+                        # Declared size first; read_pdf_upload caps what is actually inflated
+                        if member.file_size > MAX_UPLOAD_BYTES:
+                            errors.append({"filename": member.filename, "status": 413,
+                                           "message": "File is larger than the upload limit"})
+                            continue
+                        with archive.open(member) as stream:
+                            add(member.filename, stream)
+            except zipfile.BadZipFile:
+                errors.append({"filename": name, "message": "Not a valid zip file", "status": 400})
+        else:
+            add(name, upload.stream)
+    return contracts, errors
+
+
+def api_result(final_state: dict, filename: str = None) -> dict:
+    """Structured result of a finished run"""
+    return {
+        "success": not final_state.get("error"),
+        "error": final_state.get("error"),
+        "run_id": final_state.get("run_id"),
+        "filename": filename,
+        "mode": final_state.get("mode"),
+        "company_name": final_state.get("company_name"),
+        "parsed_contract": final_state.get("parsed_contract"),
+        "risk_analysis": final_state.get("risk_analysis"),
+        "deliverables": final_state.get("deliverables") or [],
+        "summary_markdown": final_state.get("summary_markdown"),
+        "notification_results": final_state.get("notification_results") or [],
+        "timings": final_state.get("timings") or {},
+        "usage": final_state.get("usage"),
+        "quick_look": final_state.get("quick_look"),
+    }
+
+
+def run_api_job(pages: list, user_email: str, mode: str, run_id: str,
+                notify: bool, filename: str, owner: str = None) -> dict:
+    # Normalizing and the quick look happen here, on the worker, not on the upload request
+    contract_text, normalization = normalize_pages(pages)
+    quick = quick_look(contract_text, page_count=len(pages))
+    quick["normalization"] = normalization
+    final_state = run_legal_analysis(
+        contract_text=contract_text,
+        user_email=user_email,
+        mode=mode,
+        quick_look=quick,
+        run_id=run_id,
+        notify=notify,
+        owner=owner
+    )
+    return api_result(final_state, filename)
+
+
+def _client_owner() -> str:
+    """Owner recorded on the jobs and runs this request's API client starts"""
+    return f"api:{g.api_client}"
+
+
+def _job_view(job_id: str) -> dict:
+    job = jobs.get(job_id)
+    # Other clients' jobs look the same as unknown ones
+    if not job or job.get("owner") != _client_owner():
+        return {"job_id": job_id, "status": "unknown"}
+    view = {k: job.get(k) for k in ("job_id", "status", "submitted_at", "started_at", "finished_at", "error",
+                                    "priority")}
+    if job["result"] is not None:
+        view["result"] = job["result"]
+    return view
+
+
+def _wait_for(job_ids: list, seconds: float) -> bool:
+    deadline = time.monotonic() + seconds
+    while True:
+        if all((jobs.get(j) or {}).get("status") in ("done", "failed", None) for j in job_ids):
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.25)
+
+
+def _prune_batches():
+    cutoff = time.time() - JOB_TTL_SECONDS
+    for batch_id in [b for b, batch in _batches.items() if batch["created_at"] < cutoff]:
+        del _batches[batch_id]
+
+
+def save_batch(batch_id: str, batch: dict):
+    """Keep a batch (client and items) for JOB_TTL_SECONDS, in Redis so every web node can report it"""
+    client = get_redis()
+    if client:
+        try:
+            client.set(redis_key("api", "batch", batch_id), json.dumps(batch), ex=JOB_TTL_SECONDS)
+            return
+        except Exception as e:
+            print(f"⚠️ API batch not shared: {e}")
+    _prune_batches()
+    _batches[batch_id] = batch
+
+
+def load_batch(batch_id: str) -> dict:
+    """Batch saved with save_batch (None if unknown or expired)"""
+    client = get_redis()
+    if client:
+        try:
+            batch = client.get(redis_key("api", "batch", batch_id))
+            return json.loads(batch) if batch else None
+        except Exception as e:
+            print(f"⚠️ API batch unavailable: {e}")
+    return _batches.get(batch_id)
+
+
+@api.route("/analyses", methods=["POST"])
+@token_required
+def create_analyses():
+    """
+    Start one analysis per uploaded contract
+    Form fields: files (PDFs and/or zips, repeatable), mode, user_email,
+    notify (email the summaries, default false), wait (seconds to wait for results),
+    priority (scheduling level; can lower but not raise the caller's USER_PRIORITIES level)
+    """
+    files = request.files.getlist("files") + request.files.getlist("contract")
+    if not files:
+        return jsonify({"success": False, "message": "No files uploaded (use the 'files' field)"}), 400
+    mode = request.form.get("mode", "legal")
+    if mode not in MODES:
+        return jsonify({"success": False, "message": f"mode must be one of {', '.join(MODES)}"}), 400
+    notify = _flag(request.form.get("notify", "false"))
+    user_email = request.form.get("user_email")
+    if notify and not user_email:
+        return jsonify({"success": False, "message": "user_email is required when notify is set"}), 400
+    try:
+        wait = min(API_MAX_WAIT_SECONDS, max(0.0, float(request.form.get("wait") or request.args.get("wait") or 0)))
+    except ValueError:
+        return jsonify({"success": False, "message": "wait must be a number of seconds"}), 400
+
+    # Priority, fair queuing and budgets follow the token's client; user_email only receives the emails
+    owner = _client_owner()
+    allowed = USER_PRIORITIES.get(owner, 0)
+    try:
+        priority = min(allowed, int(request.form.get("priority", allowed)))
+    except ValueError:
+        return jsonify({"success": False, "message": "priority must be an integer"}), 400
+
+    contracts, errors = collect_contracts(files)
+    if not contracts:
+        status = max((e["status"] for e in errors), default=400)
+        return jsonify({"success": False, "message": "No readable contracts", "errors": errors}), status
+
+    items = []
+    for filename, pages in contracts:
+        run_id = uuid.uuid4().hex
+        cost = estimate_run_seconds(mode=mode, page_count=len(pages))
+        set_run_owner(run_id, owner)
+        job_id = jobs.submit(run_api_job, pages, user_email or owner, mode, run_id, notify,
+                             filename, owner, cost=cost, user=owner, priority=priority, owner=owner)
+        items.append({"filename": filename, "job_id": job_id, "run_id": run_id,
+                      "pages": len(pages), "estimated_seconds": cost})
+
+    batch_id = uuid.uuid4().hex
+    save_batch(batch_id, {"created_at": time.time(), "client": g.api_client, "items": items})
+    print(f"🛰️ API batch {batch_id} from {g.api_client}: {len(items)} contracts ({mode} mode)")
+
+    response = {"success": True, "batch_id": batch_id, "jobs": items, "errors": errors}
+    if wait and _wait_for([item["job_id"] for item in items], wait):
+        response["jobs"] = [{**item, **_job_view(item["job_id"])} for item in items]
+        return jsonify(response)
+    return jsonify(response), 202
+
+
+@api.route("/batches/<batch_id>", methods=["GET"])
+@token_required
+def get_batch(batch_id):
+    """Status and results of every contract in a bulk upload"""
+    batch = load_batch(batch_id)
+    if not batch or batch["client"] != g.api_client:
+        return jsonify({"success": False, "message": "Unknown batch"}), 404
+    views = [{**item, **_job_view(item["job_id"])} for item in batch["items"]]
+    pending = sum(1 for v in views if v["status"] in ("queued", "running"))
+    return jsonify({"success": True, "batch_id": batch_id, "pending": pending, "jobs": views})
+
+
+@api.route("/jobs/<job_id>", methods=["GET"])
+@token_required
+def get_job(job_id):
+    """Status (and result, once done) of one analysis job"""
+    view = _job_view(job_id)
+    if view["status"] == "unknown":
+        return jsonify({"success": False, "message": "Unknown job"}), 404
+    return jsonify({"success": True, **view})
+
+
+@api.route("/runs/<run_id>", methods=["GET"])
+@token_required
+def get_run_result(run_id):
+    """A finished run's results from the history store (survives restarts and job expiry)"""
+    from src.graph.history import get_analysis
+    record = get_analysis(run_id)
+    if not record or record.pop("owner") != _client_owner():
+        return jsonify({"success": False, "message": "Unknown or unfinished run"}), 404
+    record["summary_markdown"] = record.pop("summary")
+    return jsonify({"success": True, "run_id": run_id, **record})
+
+
+@api.route("/runs/<run_id>/progress", methods=["GET"])
+@token_required
+def get_run_progress(run_id):
+    """Node-by-node progress of a run (?since=<index> for only newer events)"""
+    from src.graph.progress import progress_summary, run_owner
+    if run_owner(run_id) != _client_owner():
+        return jsonify({"success": False, "message": "Unknown run"}), 404
+    return jsonify({"success": True, **progress_summary(run_id, request.args.get("since", 0, type=int))})
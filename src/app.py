@@ -6,16 +6,27 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from flask import Flask, render_template, request, jsonify, redirect, url_for, session
-import pdfplumber
 from datetime import date
 import re
+import uuid
 from werkzeug.security import check_password_hash
 
 # Import the LangGraph workflow
-from src.graph.legal_graph import run_legal_analysis
+from src.graph.legal_graph import run_legal_analysis, resume_legal_analysis
+from src.graph.risk_rules import quick_scan
+from src.graph.quick_look import quick_look
+from src.graph.text_normalizer import normalize_pages
+from src.jobs import estimate_run_seconds, jobs
+from src.api import api
+from src.uploads import MAX_UPLOAD_BYTES, MAX_UPLOAD_MB, UploadError, read_pdf_upload
 
 app = Flask(__name__)
 app.secret_key = os.getenv("SECRET_KEY") or "dev-secret-key-change-in-production"
+# Reject oversized requests before the body is read (form fields get a little headroom)
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES + 64 * 1024
+
+# Token-authenticated JSON API (/api/v1, see src/api.py)
+app.register_blueprint(api)
 
 # Load hashed password
 APP_PASSWORD_HASH = os.getenv("APP_PASSWORD_HASH")
@@ -28,6 +39,8 @@ if not APP_PASSWORD_HASH:
 @app.before_request
 def before_request():
     """Initialize session with default values"""
+    if request.blueprint == "api":
+        return
     if 'mode' not in session:
         session['mode'] = 'legal'
     session.modified = True
@@ -35,6 +48,72 @@ def before_request():
 # -------------------------
 # Helper Functions
 # -------------------------
+def extract_pdf_pages(file_stream) -> list:
+    """Extract text from an uploaded PDF, one string per page (size/page limits in src/uploads.py)"""
+    return read_pdf_upload(file_stream)
+
+def run_analysis_job(contract_text: str, user_email: str, mode: str, quick: dict = None,
+                     run_id: str = None) -> dict:
+    """
+    Run the full LangGraph workflow (in a background job) and
+    reduce the final state to what the status endpoint reports
+    """
+    final_state = run_legal_analysis(
+        contract_text=contract_text,
+        user_email=user_email,
+        mode=mode,
+        quick_look=quick,
+        run_id=run_id
+    )
+    return summarize_final_state(final_state)
+
+def resume_analysis_job(run_id: str, from_node: str = None) -> dict:
+    """Resume a checkpointed run (in a background job)"""
+    final_state = resume_legal_analysis(run_id, from_node=from_node)
+    return summarize_final_state(final_state)
+
+def summarize_final_state(final_state: dict) -> dict:
+    """Reduce a final graph state to the job result reported to the browser"""
+    user_email = final_state.get("user_email")
+    run_id = final_state.get("run_id")
+    
+    # Log extracted company name
+    company_name = final_state.get("company_name", "Unknown")
+    extraction_method = final_state.get("company_extraction_method", "unknown")
+    print(f"🏢 Company: {company_name} (method: {extraction_method})")
+    
+    # Check for errors
+    if final_state.get("error"):
+        print(f"❌ Analysis error: {final_state['error']}")
+        return {
+            "success": False,
+            "message": f"Analysis error: {final_state['error']}",
+            "company_name": company_name,
+            "run_id": run_id
+        }
+    
+    # Build success message
+    notification_results = final_state.get("notification_results") or []
+    message = f"Contract processed! Check your email ({user_email})."
+    
+    # Add calendar info if available
+    calendar_results = [r for r in notification_results if "Calendar" in r or "📅" in r]
+    if calendar_results:
+        message += f" {calendar_results[0]}"
+    
+    print("✅ Analysis completed successfully")
+    return {
+        "success": True,
+        "message": message,
+        "company_name": company_name,
+        "notification_results": notification_results,
+        "run_id": run_id,
+        "usage": (final_state.get("usage") or {}).get("total")
+    }
+
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({"success": False, "message": f"File is larger than the {MAX_UPLOAD_MB:g} MB limit"}), 413
 
 # -------------------------
 # Authentication
@@ -78,7 +157,7 @@ def index():
 @app.route("/set_mode/<mode>", methods=["POST"])
 @login_required
 def set_mode(mode):
-    if mode not in ["legal", "creator"]:
+    if mode not in ["legal", "creator", "express"]:
         return jsonify({"success": False, "message": "Invalid mode"}), 400
     session["mode"] = mode
     session.modified = True
@@ -102,45 +181,40 @@ def upload():
         return jsonify({"success": False, "message": "Missing file or email"}), 400
     
     try:
-        # Extract text from PDF
-        with pdfplumber.open(contract_file.stream) as pdf:
-            contract_text = "\n".join(page.extract_text() or "" for page in pdf.pages)
+        # Extract text from PDF, dropping headers/footers/page numbers before any LLM sees it
+        pages = extract_pdf_pages(contract_file.stream)
+        contract_text, normalization = normalize_pages(pages)
+        print(f"🧹 Normalized contract text: {normalization['tokens_saved']} tokens saved "
+              f"({normalization['percent_saved']}%)")
         
-        # Determine which mode to use
-        analysis_mode = "creator" if mode == "creator" else "legal"
-        print(f"🔍 Running {analysis_mode} mode analysis")
+        # Instant regex-only overview, returned before the full analysis runs
+        quick = quick_look(contract_text, page_count=len(pages))
+        quick["normalization"] = normalization
+        print(f"⚡ Quick look ready in {quick['elapsed_ms']} ms "
+              f"({len(quick['red_flags'])} red flags)")
         
-        # Run the LangGraph workflow
-        final_state = run_legal_analysis(
-            contract_text=contract_text,
-            user_email=user_email,
-            mode=analysis_mode
-        )
-        
-        # Log extracted company name
-        company_name = final_state.get("company_name", "Unknown")
-        extraction_method = final_state.get("company_extraction_method", "unknown")
-        print(f"🏢 Company: {company_name} (method: {extraction_method})")
-        
-        # Check for errors
-        if final_state.get("error"):
-            return jsonify({
-                "success": False,
-                "message": f"Analysis error: {final_state['error']}"
-            }), 500
-        
-        # Build success message
-        notification_results = final_state.get("notification_results", [])
-        message = f"Contract processed! Check your email ({user_email})."
+        # Determine which mode to use
+        analysis_mode = mode if mode in ("creator", "express") else "legal"
+        print(f"🔍 Running {analysis_mode} mode analysis in background")
         
-        # Add calendar info if available
-        calendar_results = [r for r in notification_results if "Calendar" in r or "📅" in r]
-        if calendar_results:
-            message += f" {calendar_results[0]}"
+        # Run the LangGraph workflow in the background; the summary is emailed.
+        # Shorter contracts are scheduled ahead of long ones
+        run_id = uuid.uuid4().hex
+        cost = estimate_run_seconds(contract_text, analysis_mode, len(pages))
+        job_id = jobs.submit(run_analysis_job, contract_text, user_email, analysis_mode, quick, run_id,
+                             cost=cost, user=user_email)
         
-        print("✅ Analysis completed successfully")
-        return jsonify({"success": True, "message": message})
+        return jsonify({
+            "success": True,
+            "message": f"Quick look ready! The full analysis will be emailed to {user_email}.",
+            "job_id": job_id,
+            "run_id": run_id,
+            "quick_look": quick
+        })
         
+    except UploadError as e:
+        print(f"❌ Upload rejected: {str(e)}")
+        return jsonify({"success": False, "message": str(e)}), e.status
     except Exception as e:
         print(f"❌ Error in upload: {str(e)}")
         return jsonify({
@@ -148,11 +222,142 @@ def upload():
             "message": f"Processing error: {str(e)}"
         }), 500
 
+@app.route("/status/<job_id>", methods=["GET"])
+@login_required
+def job_status(job_id):
+    """Status of a background analysis started by /upload"""
+    job = jobs.get(job_id)
+    if not job:
+        return jsonify({"success": False, "message": "Unknown job"}), 404
+    return jsonify({"success": True, **job})
+
+@app.route("/runs/<run_id>/resume", methods=["POST"])
+@login_required
+def resume_run(run_id):
+    """Resume a failed or interrupted run from its last completed node"""
+    from src.graph.checkpoints import get_run
+    run = get_run(run_id)
+    if not run:
+        return jsonify({"success": False, "message": "Unknown run"}), 404
+    
+    from_node = request.form.get("from_node") or (request.get_json(silent=True) or {}).get("from_node")
+    # Only the remaining nodes run; schedule it like a short contract of its mode
+    job_id = jobs.submit(resume_analysis_job, run_id, from_node,
+                         cost=estimate_run_seconds(mode=run["mode"]), user=run["user_email"])
+    print(f"🔁 Resuming run {run_id} (job {job_id})")
+    return jsonify({"success": True, "job_id": job_id, "run_id": run_id})
+
+@app.route("/runs/<run_id>/progress", methods=["GET"])
+@login_required
+def run_progress(run_id):
+    """Node-by-node progress of a run (?since=<index> for only newer events)"""
+    from src.graph.progress import progress_summary
+    return jsonify({"success": True, **progress_summary(run_id, request.args.get("since", 0, type=int))})
+
+@app.route("/metrics", methods=["GET"])
+@login_required
+def metrics():
+    """Per-process runtime metrics"""
+    from src.graph.cascade import cascade_report
+    from src.graph.hedging import hedge_metrics
+    from src.graph.llm import prompt_cache_metrics
+    return jsonify({
+        "hedging": hedge_metrics(),
+        "cascade": cascade_report(),
+        "prompt_cache": prompt_cache_metrics(),
+        "jobs": jobs.metrics()
+    })
+
+@app.route("/usage", methods=["GET"])
+@login_required
+def usage_report():
+    """LLM tokens and cost per user per UTC day (?days=7)"""
+    from src.graph.usage import RUN_BUDGET_USD, USER_DAILY_BUDGET_USD, daily_report
+    days = min(90, max(1, request.args.get("days", 7, type=int)))
+    return jsonify({
+        "success": True,
+        "run_budget_usd": RUN_BUDGET_USD or None,
+        "user_daily_budget_usd": USER_DAILY_BUDGET_USD or None,
+        "days": daily_report(days)
+    })
+
+@app.route("/history", methods=["GET"])
+@login_required
+def history():
+    """Past analyses, newest first (?page=&per_page=&mode=&user_email=)"""
+    from src.graph.history import list_analyses
+    return jsonify({"success": True, **list_analyses(
+        page=request.args.get("page", 1, type=int),
+        per_page=request.args.get("per_page", 20, type=int),
+        user_email=request.args.get("user_email"),
+        mode=request.args.get("mode"),
+    )})
+
+@app.route("/history/search", methods=["GET"])
+@login_required
+def history_search():
+    """Full-text search over past contracts (?q=&page=&per_page=&user_email=)"""
+    from src.graph.history import search_analyses
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"success": False, "message": "Missing search query"}), 400
+    return jsonify({"success": True, **search_analyses(
+        query,
+        page=request.args.get("page", 1, type=int),
+        per_page=request.args.get("per_page", 20, type=int),
+        user_email=request.args.get("user_email"),
+    )})
+
+@app.route("/history/<run_id>", methods=["GET"])
+@login_required
+def history_detail(run_id):
+    """Everything stored for one past analysis"""
+    from src.graph.history import get_analysis
+    record = get_analysis(run_id)
+    if not record:
+        return jsonify({"success": False, "message": "Unknown run"}), 404
+    return jsonify({"success": True, **record})
+
+@app.route("/analytics", methods=["GET"])
+@login_required
+def analytics():
+    """Portfolio aggregates across past analyses (?user_email=&top=)"""
+    from src.graph.analytics import get_analytics
+    return jsonify({"success": True, **get_analytics().summary(
+        user_email=request.args.get("user_email"),
+        top=max(1, min(100, request.args.get("top", 10, type=int))),
+    )})
+
+@app.route("/quick_scan", methods=["POST"])
+@login_required
+def quick_scan_contract():
+    """Rule-based risk scan only - offline, no LLM calls, returns in milliseconds"""
+    contract_file = request.files.get("contract")
+    if not contract_file:
+        return jsonify({"success": False, "message": "Missing file"}), 400
+    
+    try:
+        contract_text, _ = normalize_pages(extract_pdf_pages(contract_file.stream))
+        result = quick_scan(contract_text)
+        print(f"⚡ Quick scan: {len(result['risks'])} risks in {result['elapsed_ms']} ms")
+        return jsonify({"success": True, **result})
+    except UploadError as e:
+        print(f"❌ Upload rejected: {str(e)}")
+        return jsonify({"success": False, "message": str(e)}), e.status
+    except Exception as e:
+        print(f"❌ Error in quick scan: {str(e)}")
+        return jsonify({
+            "success": False,
+            "message": f"Processing error: {str(e)}"
+        }), 500
+
 
 # if __name__ == "__main__":
 #     app.run(debug=True)
 
 
 if __name__ == "__main__":
+    from src.graph.digest import start_flusher
+    start_flusher()
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port)
\ No newline at end of file
@@ -0,0 +1,303 @@
+"""
+Portfolio analytics across every analyzed contract
+Stored risk analyses, deliverables and payment terms (see history.py) are
+loaded into columnar numpy arrays; aggregates are computed with vectorized
+group-bys. refresh() only reads analyses stored since the last refresh, so
+new runs are appended instead of reloading the whole history.
+"""
+import re
+import threading
+import time
+
+import numpy as np
+
+LEVELS = ["Low", "Medium", "High"]
+HIGH = LEVELS.index("High")
+# Companies need this many separate contracts with a High risk in a category to be flagged
+REPEAT_MIN_CONTRACTS = 2
+REFRESH_BATCH = 1000
+
+AMOUNT_RE = re.compile(r"\$\s?(\d{1,3}(?:,\d{3})+|\d+)(?:\.\d{1,2})?\s*(k\b|thousand)?", re.IGNORECASE)
+NET_DAYS_RE = re.compile(
+    r"\bnet[\s-]?(\d{1,3})\b|\bwithin\s+(\d{1,3})\s+(?:business\s+|calendar\s+)?days\b", re.IGNORECASE
+)
+
+
+class _Codes:
+    """String <-> small int codes, so group-bys run on integer arrays"""
+
+    def __init__(self):
+        self.index = {}
+        self.labels = []
+
+    def code(self, label: str) -> int:
+        key = label.strip().casefold()
+        if key not in self.index:
+            self.index[key] = len(self.labels)
+            self.labels.append(label.strip())
+        return self.index[key]
+
+    def find(self, label: str):
+        return self.index.get((label or "").strip().casefold())
+
+
+class _Table:
+    """Append-only columns (numpy arrays grown by concatenation per refresh)"""
+
+    def __init__(self, dtypes: dict):
+        self.columns = {name: np.empty(0, dtype=dtype) for name, dtype in dtypes.items()}
+
+    def __len__(self):
+        return len(next(iter(self.columns.values())))
+
+    def extend(self, rows: dict):
+        for name, values in rows.items():
+            if values:
+                column = self.columns[name]
+                self.columns[name] = np.concatenate([column, np.asarray(values, dtype=column.dtype)])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+
+def _text(value) -> str:
+    """Every string inside a free-form JSON value (payment_terms can be anything)"""
+    if value is None:
+        return ""
+    if isinstance(value, dict):
+        return " ".join(f"{k} {_text(v)}" for k, v in value.items())
+    if isinstance(value, list):
+        return " ".join(_text(v) for v in value)
+    return str(value)
+
+
+def payment_figures(payment_terms) -> tuple:
+    """(largest dollar amount, payment window in days) from payment_terms, NaN when absent"""
+    text = _text(payment_terms)
+    amounts = []
+    for m in AMOUNT_RE.finditer(text):
+        amount = float(m.group(1).replace(",", ""))
+        amounts.append(amount * 1000 if m.group(2) else amount)
+    days = [int(a or b) for a, b in NET_DAYS_RE.findall(text)]
+    return (max(amounts) if amounts else np.nan), (max(days) if days else np.nan)
+
+
+class PortfolioAnalytics:
+    """
+    Columnar view of the analysis history
+
+    One row per analysis (company, user, payment figures), per risk
+    (analysis, category, level) and per dated deliverable (analysis, due
+    day). A re-saved (resumed) run deactivates its earlier analysis row.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.last_id = 0
+        self.version = 0
+        self.companies = _Codes()
+        self.users = _Codes()
+        self.categories = _Codes()
+        self.run_rows = {}
+        self.analyses = _Table({
+            "company": np.int32, "user": np.int32, "created_at": np.float64,
+            "amount": np.float64, "net_days": np.float64, "active": np.bool_,
+        })
+        self.risks = _Table({"analysis": np.int32, "category": np.int32, "level": np.int8})
+        self.deliverables = _Table({"analysis": np.int32, "due": "datetime64[D]"})
+        self._cache = {}
+
+    def refresh(self) -> int:
+        """Load analyses stored since the last refresh; returns how many were added"""
+        from src.graph.history import analyses_since
+        added = 0
+        with self.lock:
+            while True:
+                rows = analyses_since(self.last_id, REFRESH_BATCH)
+                if not rows:
+                    break
+                self._append(rows)
+                self.last_id = rows[-1][0]
+                added += len(rows)
+            if added:
+                self.version += 1
+                self._cache = {}
+        return added
+
+    def _append(self, rows: list):
+        analyses = {name: [] for name in self.analyses.columns}
+        risks = {name: [] for name in self.risks.columns}
+        deliverables = {name: [] for name in self.deliverables.columns}
+        replaced = []
+        row_index = len(self.analyses)
+        for _, run_id, created_at, user_email, company, risk_analysis, items, parsed in rows:
+            if run_id in self.run_rows:
+                replaced.append(self.run_rows[run_id])
+            self.run_rows[run_id] = row_index
+            amount, net_days = payment_figures((parsed or {}).get("payment_terms"))
+            analyses["company"].append(self.companies.code(company or "Unknown"))
+            analyses["user"].append(self.users.code(user_email or ""))
+            analyses["created_at"].append(created_at)
+            analyses["amount"].append(amount)
+            analyses["net_days"].append(net_days)
+            analyses["active"].append(True)
+
+            for risk in (risk_analysis or {}).get("risks") or []:
+                if not isinstance(risk, dict) or risk.get("level") not in LEVELS:
+                    continue
+                risks["analysis"].append(row_index)
+                risks["category"].append(self.categories.code(str(risk.get("category") or "Other")))
+                risks["level"].append(LEVELS.index(risk["level"]))
+
+            for item in items or []:
+                due = _day(item.get("start_date") if isinstance(item, dict) else None)
+                if due is not None:
+                    deliverables["analysis"].append(row_index)
+                    deliverables["due"].append(due)
+            row_index += 1
+
+        self.analyses.extend(analyses)
+        self.risks.extend(risks)
+        self.deliverables.extend(deliverables)
+        # Replaced rows may belong to this batch (re-saved twice before a refresh)
+        if replaced:
+            self.analyses["active"][replaced] = False
+
+    def summary(self, user_email: str = None, top: int = 10) -> dict:
+        """All aggregates, optionally for one user's contracts only"""
+        started = time.perf_counter()
+        key = (user_email, top)
+        with self.lock:
+            if key not in self._cache:
+                self._cache[key] = self._compute(user_email, top)
+            result = self._cache[key]
+        return {**result, "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+    def _compute(self, user_email: str, top: int) -> dict:
+        include = self.analyses["active"].copy()
+        if user_email:
+            user = self.users.find(user_email)
+            include &= self.analyses["user"] == (user if user is not None else -1)
+        risk_rows = include[self.risks["analysis"]] if len(self.risks) else np.zeros(0, dtype=bool)
+        deliverable_rows = (
+            include[self.deliverables["analysis"]] if len(self.deliverables) else np.zeros(0, dtype=bool)
+        )
+        return {
+            "contracts": int(include.sum()),
+            "risks": self._risk_distribution(risk_rows, top),
+            "repeat_high_risk": self._repeat_high_risk(risk_rows, top),
+            "deadlines": self._deadline_density(deliverable_rows),
+            "payment_terms": self._payment_stats(include),
+            "version": self.version,
+        }
+
+    def _risk_distribution(self, rows: np.ndarray, top: int) -> dict:
+        category = self.risks["category"][rows]
+        level = self.risks["level"][rows].astype(np.int64)
+        company = self.analyses["company"][self.risks["analysis"][rows]]
+        n_levels = len(LEVELS)
+
+        by_category = np.bincount(category * n_levels + level, minlength=len(self.categories.labels) * n_levels)
+        by_category = by_category.reshape(-1, n_levels)
+        by_company = np.bincount(company * n_levels + level, minlength=len(self.companies.labels) * n_levels)
+        by_company = by_company.reshape(-1, n_levels)
+
+        def rows_of(matrix, labels):
+            # Most High risks first, then most risks overall
+            order = np.lexsort((-matrix.sum(axis=1), -matrix[:, HIGH]))
+            return [
+                {"name": labels[i], "total": int(matrix[i].sum()),
+                 **{lvl: int(matrix[i, j]) for j, lvl in enumerate(LEVELS)}}
+                for i in order[:top] if matrix[i].sum()
+            ]
+
+        return {
+            "total": int(len(level)),
+            "by_level": {lvl: int(n) for lvl, n in zip(LEVELS, np.bincount(level, minlength=n_levels))},
+            "by_category": rows_of(by_category, self.categories.labels),
+            "by_company": rows_of(by_company, self.companies.labels),
+        }
+
+    def _repeat_high_risk(self, rows: np.ndarray, top: int) -> list:
+        """Company/category pairs with High risks in REPEAT_MIN_CONTRACTS or more contracts"""
+        high = rows & (self.risks["level"] == HIGH)
+        analysis = self.risks["analysis"][high].astype(np.int64)
+        category = self.risks["category"][high].astype(np.int64)
+        company = self.analyses["company"][analysis].astype(np.int64)
+        n_categories = max(1, len(self.categories.labels))
+        pair = company * n_categories + category
+        # Count each contract once per pair
+        unique = np.unique(np.stack([pair, analysis]), axis=1) if len(pair) else np.empty((2, 0), np.int64)
+        pairs, contracts = np.unique(unique[0], return_counts=True)
+        keep = contracts >= REPEAT_MIN_CONTRACTS
+        pairs, contracts = pairs[keep], contracts[keep]
+        order = np.argsort(-contracts, kind="stable")[:top]
+        return [
+            {
+                "company": self.companies.labels[pairs[i] // n_categories],
+                "category": self.categories.labels[pairs[i] % n_categories],
+                "contracts": int(contracts[i]),
+            }
+            for i in order
+        ]
+
+    def _deadline_density(self, rows: np.ndarray) -> dict:
+        due = self.deliverables["due"][rows]
+        if not len(due):
+            return {"total": 0, "per_week": [], "per_month": []}
+        # 1970-01-01 was a Thursday; shift so weeks start on Monday
+        weekday = (due.astype(np.int64) + 3) % 7
+        weeks, week_counts = np.unique(due - weekday.astype("timedelta64[D]"), return_counts=True)
+        months, month_counts = np.unique(due.astype("datetime64[M]"), return_counts=True)
+        return {
+            "total": int(len(due)),
+            "per_week": [{"week_of": str(w), "deliverables": int(n)} for w, n in zip(weeks, week_counts)],
+            "per_month": [{"month": str(m), "deliverables": int(n)} for m, n in zip(months, month_counts)],
+            "busiest_week": str(weeks[np.argmax(week_counts)]),
+        }
+
+    def _payment_stats(self, include: np.ndarray) -> dict:
+        def stats(values):
+            values = values[~np.isnan(values)]
+            if not len(values):
+                return {"count": 0}
+            p25, median, p75 = np.percentile(values, [25, 50, 75])
+            return {
+                "count": int(len(values)),
+                "mean": round(float(values.mean()), 2),
+                "median": round(float(median), 2),
+                "p25": round(float(p25), 2),
+                "p75": round(float(p75), 2),
+                "min": round(float(values.min()), 2),
+                "max": round(float(values.max()), 2),
+            }
+
+        return {
+            "amount_usd": stats(self.analyses["amount"][include]),
+            "payment_days": stats(self.analyses["net_days"][include]),
+        }
+
+
+def _day(value):
+    if not value:
+        return None
+    try:
+        return np.datetime64(str(value)[:10], "D")
+    except ValueError:
+        return None
+
+
+_analytics = None
+_analytics_lock = threading.Lock()
+
+
+def get_analytics() -> PortfolioAnalytics:
+    """Process-wide analytics, brought up to date with the history store"""
+    global _analytics
+    with _analytics_lock:
+        if _analytics is None:
+            _analytics = PortfolioAnalytics()
+    added = _analytics.refresh()
+    if added:
+        print(f"📊 Analytics: {added} new analyses loaded ({len(_analytics.analyses)} total)")
+    return _analytics
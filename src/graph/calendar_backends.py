@@ -0,0 +1,256 @@
+"""
+Calendar backends for deliverable deadlines
+- google: one Google Calendar API insert per deliverable (needs GOOGLE_CALENDAR_TOKEN_JSON)
+- ics:    one RFC 5545 .ics file with every deliverable, attached to the
+          summary email - built offline, no extra network calls
+CALENDAR_BACKEND picks one per deployment ("auto": google when a token is
+configured, ics otherwise; "none" disables calendar events).
+"""
+import hashlib
+import os
+from datetime import datetime, timedelta, timezone
+
+from src.graph.date_extraction import resolve_timezone
+from src.graph.policies import call_external
+
+CALENDAR_BACKEND = os.getenv("CALENDAR_BACKEND", "auto").lower()
+ICS_PRODID = "-//Legal Agent//Contract Deliverables//EN"
+UID_DOMAIN = os.getenv("ICS_UID_DOMAIN", "legal-agent.local")
+# Timed deliverables become events of this length
+EVENT_MINUTES = 60
+
+
+def event_window(deliverable: dict):
+    """
+    (start, end, all_day) for a deliverable
+    Timed deliverables get timezone-aware datetimes in the deliverable's zone
+    (Pacific by default); date-only ones are all-day dates. None if undated.
+    """
+    start_date = deliverable.get("start_date")
+    if not start_date:
+        return None
+    day = datetime.strptime(start_date, "%Y-%m-%d")
+    start_time = deliverable.get("start_time")
+    if not start_time or start_time == "null":
+        return day.date(), (day + timedelta(days=1)).date(), True
+    import pytz
+    tz = pytz.timezone(resolve_timezone(deliverable.get("timezone")))
+    time_obj = datetime.strptime(start_time, "%H:%M").time()
+    start = tz.localize(datetime.combine(day, time_obj))
+    end = tz.normalize(start + timedelta(minutes=EVENT_MINUTES))
+    return start, end, False
+
+
+class CalendarBackend:
+    """
+    Delivers deliverable deadlines to the user's calendar
+
+    attachments() returns (filename, bytes, mime subtype) tuples to add to the
+    summary email; deliver() sends anything that goes out separately.
+    """
+    name = "none"
+
+    def attachments(self, deliverables: list, company_name: str = None) -> list:
+        return []
+
+    def deliver(self, user_email: str, deliverables: list) -> str:
+        return "Calendar disabled"
+
+
+class GoogleCalendarBackend(CalendarBackend):
+    """Google Calendar API, one event insert per deliverable"""
+    name = "google"
+
+    def deliver(self, user_email: str, deliverables: list) -> str:
+        token_json_str = os.getenv("GOOGLE_CALENDAR_TOKEN_JSON")
+        if not token_json_str:
+            return "Calendar not configured"
+
+        import json
+        from google.oauth2.credentials import Credentials
+        from google.auth.transport.requests import Request
+        from googleapiclient.discovery import build
+
+        token_data = json.loads(token_json_str)
+        creds = Credentials.from_authorized_user_info(
+            token_data,
+            ['https://www.googleapis.com/auth/calendar']
+        )
+
+        if not creds.valid and creds.expired and creds.refresh_token:
+            call_external("google_calendar", creds.refresh, Request(), retries=1)
+
+        service = build('calendar', 'v3', credentials=creds)
+
+        created_count = 0
+        for deliverable in deliverables:
+            result = create_calendar_event(service, deliverable, user_email)
+            if "created" in result.lower():
+                created_count += 1
+
+        return f"📅 Calendar: {created_count} Events Created"
+
+
+def create_calendar_event(service, deliverable: dict, user_email: str) -> str:
+    """Create a single Google Calendar event"""
+    summary = deliverable.get('summary', '')
+    description = deliverable.get('description', '')
+    window = event_window(deliverable)
+
+    if not summary or not window:
+        return f"Skipped: {summary}"
+
+    start, end, all_day = window
+    if all_day:
+        event_times = {
+            "start": {"date": start.isoformat()},
+            "end": {"date": end.isoformat()},
+        }
+    else:
+        tz_name = start.tzinfo.zone
+        event_times = {
+            "start": {"dateTime": start.isoformat(), "timeZone": tz_name},
+            "end": {"dateTime": end.isoformat(), "timeZone": tz_name},
+        }
+
+    event = {
+        "summary": f"📋 {summary}",
+        "description": f"Contract Deliverable\n\n{description}",
+        "reminders": {"useDefault": True},
+        "attendees": [{"email": user_email}],
+        **event_times
+    }
+
+    try:
+        request = service.events().insert(
+            calendarId="primary",
+            body=event,
+            sendUpdates="all"
+        )
+        call_external("google_calendar", request.execute, retries=1)
+        return f"Created: {summary}"
+    except Exception as e:
+        if "duplicate" in str(e).lower():
+            return f"Exists: {summary}"
+        return f"Error: {summary} - {str(e)}"
+
+
+class IcsCalendarBackend(CalendarBackend):
+    """A single multi-event .ics attached to the summary email"""
+    name = "ics"
+
+    def attachments(self, deliverables: list, company_name: str = None) -> list:
+        events = [d for d in deliverables if d.get("summary") and event_window(d)]
+        if not events:
+            return []
+        return [("deliverables.ics", build_ics(events, company_name).encode("utf-8"), "calendar")]
+
+    def deliver(self, user_email: str, deliverables: list) -> str:
+        count = sum(1 for d in deliverables if d.get("summary") and event_window(d))
+        return f"📅 Calendar: {count} Events attached to the email (.ics)"
+
+
+def build_ics(deliverables: list, company_name: str = None) -> str:
+    """
+    RFC 5545 calendar with one VEVENT per deliverable
+    Timed events are written in UTC (no VTIMEZONE needed), all-day events as
+    DATE values. UIDs are derived from the deliverable, so re-importing the
+    same contract's calendar updates events instead of duplicating them.
+    """
+    stamp = _utc(datetime.now(timezone.utc))
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{ICS_PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+    ]
+    if company_name:
+        lines.append(f"X-WR-CALNAME:{_escape(f'{company_name} deliverables')}")
+    for deliverable in deliverables:
+        window = event_window(deliverable)
+        if not window or not deliverable.get("summary"):
+            continue
+        start, end, all_day = window
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:{event_uid(deliverable, company_name)}",
+            f"DTSTAMP:{stamp}",
+        ]
+        if all_day:
+            lines += [
+                f"DTSTART;VALUE=DATE:{start.strftime('%Y%m%d')}",
+                f"DTEND;VALUE=DATE:{end.strftime('%Y%m%d')}",
+            ]
+        else:
+            lines += [f"DTSTART:{_utc(start)}", f"DTEND:{_utc(end)}"]
+        lines += [
+            f"SUMMARY:{_escape('📋 ' + deliverable['summary'])}",
+            f"DESCRIPTION:{_escape('Contract Deliverable' + chr(10) * 2 + (deliverable.get('description') or ''))}",
+            "TRANSP:TRANSPARENT",
+            "BEGIN:VALARM",
+            "ACTION:DISPLAY",
+            f"DESCRIPTION:{_escape(deliverable['summary'])}",
+            "TRIGGER:-P1D",
+            "END:VALARM",
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return "".join(_fold(line) + "\r\n" for line in lines)
+
+
+def event_uid(deliverable: dict, company_name: str = None) -> str:
+    """Same deliverable (recipient, company, title, date, time) -> same UID"""
+    key = "|".join(str(part or "").strip().lower() for part in (
+        deliverable.get("user_email"), company_name, deliverable.get("summary"),
+        deliverable.get("start_date"), deliverable.get("start_time"),
+    ))
+    return f"{hashlib.sha1(key.encode('utf-8')).hexdigest()[:32]}@{UID_DOMAIN}"
+
+
+def _utc(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _escape(text: str) -> str:
+    """TEXT value escaping (RFC 5545 3.3.11)"""
+    return (
+        str(text).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+        .replace("\r\n", "\\n").replace("\n", "\\n")
+    )
+
+
+def _fold(line: str, limit: int = 75) -> str:
+    """Fold content lines at 75 octets without splitting a UTF-8 character"""
+    if len(line.encode("utf-8")) <= limit:
+        return line
+    parts = []
+    current, size = "", 0
+    for char in line:
+        width = len(char.encode("utf-8"))
+        # Continuation lines start with a space, which counts toward the limit
+        if size + width > (limit if not parts else limit - 1):
+            parts.append(current)
+            current, size = "", 0
+        current += char
+        size += width
+    parts.append(current)
+    return "\r\n ".join(parts)
+
+
+BACKENDS = {
+    "google": GoogleCalendarBackend,
+    "ics": IcsCalendarBackend,
+    "none": CalendarBackend,
+}
+
+
+def get_calendar_backend(name: str = None) -> CalendarBackend:
+    """The configured backend; "auto" uses Google when a token is set, ICS otherwise"""
+    name = (name or CALENDAR_BACKEND).lower()
+    if name == "auto":
+        name = "google" if os.getenv("GOOGLE_CALENDAR_TOKEN_JSON") else "ics"
+    if name not in BACKENDS:
+        print(f"Unknown CALENDAR_BACKEND {name!r}, using ics")
+        name = "ics"
+    return BACKENDS[name]()
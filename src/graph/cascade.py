@@ -0,0 +1,196 @@
+"""
+Model cascade - try a cheap, fast model first and escalate on bad output
+Each call site names a route (usually its node) and a validator; the route
+picks the tiers to try based on contract length. A response that fails
+validation (unparseable JSON, empty clauses, low confidence...) or errors out
+is retried on the next tier. Per-tier latency, tokens and cost are tracked.
+"""
+import json
+import os
+import threading
+import time
+
+from src.graph.llm import get_llm, invoke_llm, stream_llm
+
+CASCADE_ENABLED = os.getenv("LLM_CASCADE", "1") == "1"
+
+TIER_MODELS = {
+    "fast": os.getenv("LLM_MODEL_FAST", "gpt-5-nano"),
+    "standard": os.getenv("LLM_MODEL_STANDARD", "gpt-5-mini"),
+    "strong": os.getenv("LLM_MODEL_STRONG", "gpt-5"),
+}
+
+# USD per 1M (input, output) tokens, override with LLM_PRICES='{"model": [in, out]}'
+MODEL_PRICES = {
+    "gpt-5-nano": (0.05, 0.40),
+    "gpt-5-mini": (0.25, 2.00),
+    "gpt-5": (1.25, 10.00),
+    **{k: tuple(v) for k, v in json.loads(os.getenv("LLM_PRICES", "{}")).items()},
+}
+
+# Contracts shorter than this use the "short" route
+SHORT_CONTRACT_CHARS = int(os.getenv("LLM_CASCADE_SHORT_CHARS", "12000"))
+
+# route: {"short": tiers, "long": tiers}, override with LLM_CASCADE_ROUTES (same shape, JSON)
+ROUTES = {
+    "extract_company": {"short": ["fast", "standard"], "long": ["fast", "standard"]},
+    "identify_unclear_terms": {"short": ["fast", "standard"], "long": ["fast", "standard"]},
+    "summarize_research": {"short": ["fast", "standard"], "long": ["fast", "standard"]},
+    "parse_contract": {"short": ["fast", "standard", "strong"], "long": ["standard", "strong"]},
+    "analyze_risks": {"short": ["fast", "standard"], "long": ["standard", "strong"]},
+    "extract_deliverables": {"short": ["fast", "standard"], "long": ["standard", "strong"]},
+    "write_summary": {"short": ["standard"], "long": ["standard"]},
+    "express_analysis": {"short": ["standard", "strong"], "long": ["standard", "strong"]},
+    **json.loads(os.getenv("LLM_CASCADE_ROUTES", "{}")),
+}
+
+DEFAULT_ROUTE = {"short": ["standard"], "long": ["standard"]}
+
+
+def route_tiers(route: str, contract_chars: int = None) -> list:
+    """Tiers to try, in order, for this route and contract length"""
+    if not CASCADE_ENABLED:
+        return ["standard"]
+    rule = ROUTES.get(route, DEFAULT_ROUTE)
+    if isinstance(rule, list):
+        return rule
+    short = contract_chars is not None and contract_chars < SHORT_CONTRACT_CHARS
+    return rule["short"] if short else rule["long"]
+
+
+def budget_tiers(tiers: list, route: str) -> list:
+    """Drop the strong tier once the run is over its token budget, if a cheaper tier is left"""
+    cheaper = [tier for tier in tiers if tier != "strong"]
+    if not cheaper or len(cheaper) == len(tiers):
+        return tiers
+    from src.graph.usage import budget_exceeded, run_usage
+    reason = budget_exceeded()
+    if not reason:
+        return tiers
+    run_usage.get().downgrade(f"{route} kept off the strong tier ({reason})")
+    return cheaper
+
+
+class TierStats:
+    def __init__(self):
+        self.calls = 0
+        self.accepted = 0
+        self.escalated = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cost = 0.0
+
+
+_stats = {}
+_lock = threading.Lock()
+
+
+def _record(tier: str, model: str, response, seconds: float, outcome: str):
+    usage = getattr(response, "usage_metadata", None) or {}
+    input_tokens = usage.get("input_tokens") or 0
+    output_tokens = usage.get("output_tokens") or 0
+    price_in, price_out = MODEL_PRICES.get(model, (0.0, 0.0))
+    with _lock:
+        stats = _stats.setdefault(tier, TierStats())
+        stats.calls += 1
+        stats.seconds += seconds
+        stats.input_tokens += input_tokens
+        stats.output_tokens += output_tokens
+        stats.cost += (input_tokens * price_in + output_tokens * price_out) / 1_000_000
+        setattr(stats, outcome, getattr(stats, outcome) + 1)
+
+
+def invoke_cascade(messages: list, node: str, validate, route: str = None, contract_chars: int = None,
+                   tiers: list = None):
+    """
+    Call the route's tiers in order until a response passes validation
+
+    Args:
+        messages: LangChain messages
+        node: Calling graph node (for rate limiting and retry policy)
+        validate: fn(content) -> (ok, reason)
+        route: Routing rule to use (defaults to node)
+        contract_chars: Contract length, selects the short/long route
+        tiers: Explicit tiers to try (overrides the route)
+
+    Returns:
+        The first valid response, or the last tier's response if none validated
+    """
+    tiers = budget_tiers(tiers or route_tiers(route or node, contract_chars), route or node)
+    for i, tier in enumerate(tiers):
+        model = TIER_MODELS.get(tier, tier)
+        last = i == len(tiers) - 1
+        started = time.monotonic()
+        try:
+            response = invoke_llm(get_llm(model), messages, node=node)
+        except Exception as e:
+            _record(tier, model, None, time.monotonic() - started, "errors")
+            if last:
+                raise
+            print(f"⤴️ {route or node}: {model} failed ({e}), escalating to {TIER_MODELS.get(tiers[i + 1], tiers[i + 1])}")
+            continue
+
+        ok, reason = validate(response.content)
+        if ok or last:
+            _record(tier, model, response, time.monotonic() - started, "accepted")
+            return response
+        _record(tier, model, response, time.monotonic() - started, "escalated")
+        print(f"⤴️ {route or node}: {model} output rejected ({reason}), escalating to {TIER_MODELS.get(tiers[i + 1], tiers[i + 1])}")
+
+
+def stream_cascade(messages: list, node: str, validate, on_text, on_discard=None,
+                   route: str = None, contract_chars: int = None):
+    """
+    Like invoke_cascade, but the first tier's response is streamed to on_text
+    If that stream fails or is rejected, on_discard() is called and the
+    remaining tiers are tried without streaming
+    """
+    tiers = budget_tiers(route_tiers(route or node, contract_chars), route or node)
+    tier = tiers[0]
+    model = TIER_MODELS.get(tier, tier)
+    last = len(tiers) == 1
+    started = time.monotonic()
+    try:
+        response = stream_llm(get_llm(model), messages, node=node, on_text=on_text)
+        ok, reason = validate(response.content)
+    except Exception as e:
+        _record(tier, model, None, time.monotonic() - started, "errors")
+        response, ok, reason = None, False, f"stream failed: {e}"
+
+    if ok or (last and response is not None):
+        _record(tier, model, response, time.monotonic() - started, "accepted")
+        return response
+    if response is not None:
+        _record(tier, model, response, time.monotonic() - started, "escalated")
+    if on_discard:
+        on_discard()
+    # Retry without streaming: the remaining tiers, or the same one when it was the only tier
+    fallback = tiers if last else tiers[1:]
+    print(f"⤴️ {route or node}: {model} streamed output rejected ({reason}), "
+          f"retrying on {TIER_MODELS.get(fallback[0], fallback[0])}")
+    return invoke_cascade(messages, node, validate, route=route, tiers=fallback)
+
+
+def cascade_report() -> dict:
+    """Per-tier calls, escalation counts, average latency, tokens and cost for this process"""
+    with _lock:
+        return {
+            tier: {
+                "model": TIER_MODELS.get(tier, tier),
+                "calls": stats.calls,
+                "accepted": stats.accepted,
+                "escalated": stats.escalated,
+                "errors": stats.errors,
+                "avg_latency_seconds": round(stats.seconds / stats.calls, 3) if stats.calls else None,
+                "input_tokens": stats.input_tokens,
+                "output_tokens": stats.output_tokens,
+                "cost_usd": round(stats.cost, 6),
+            }
+            for tier, stats in _stats.items()
+        }
+
+
+def accept_any(content: str) -> tuple:
+    return (True, None) if content and content.strip() else (False, "empty response")
@@ -0,0 +1,247 @@
+"""
+Durable checkpointing for analysis runs
+Every node's output is saved to a local SQLite store keyed by run id, so a
+failed or interrupted run can resume from its last successful node instead
+of paying for every LLM call again.
+
+CLI:
+    python -m src.graph.checkpoints list
+    python -m src.graph.checkpoints resume <run_id> [--from-node send_notifications]
+    python -m src.graph.checkpoints prune [--days 7]
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+
+from src.graph.run_files import remove_run_files
+
+CHECKPOINTS_ENABLED = os.getenv("CHECKPOINTS_ENABLED", "1") == "1"
+CHECKPOINT_DB = os.getenv("CHECKPOINT_DB", os.path.join("data", "checkpoints.sqlite"))
+# Runs older than this are deleted entirely by prune_checkpoints
+RETENTION_DAYS = float(os.getenv("CHECKPOINT_RETENTION_DAYS", "7"))
+
+_saver = None
+_conn = None
+_lock = threading.Lock()
+
+
+def _open() -> sqlite3.Connection:
+    directory = os.path.dirname(CHECKPOINT_DB)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(CHECKPOINT_DB, check_same_thread=False, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+def _connection() -> sqlite3.Connection:
+    """Connection for the runs table (the checkpointer has its own)"""
+    global _conn
+    if _conn is None:
+        _conn = _open()
+        _conn.execute("""
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                mode TEXT,
+                user_email TEXT,
+                status TEXT,
+                error TEXT,
+                created_at REAL,
+                updated_at REAL,
+                notify INTEGER DEFAULT 1,
+                tokens INTEGER,
+                cost_usd REAL
+            )
+        """)
+        _conn.commit()
+    return _conn
+
+
+def get_checkpointer():
+    """Process-wide SQLite checkpointer (None when CHECKPOINTS_ENABLED=0)"""
+    global _saver
+    if not CHECKPOINTS_ENABLED:
+        return None
+    with _lock:
+        if _saver is None:
+            from langgraph.checkpoint.sqlite import SqliteSaver
+            _saver = SqliteSaver(_open())
+            _saver.setup()
+        return _saver
+
+
+def register_run(run_id: str, mode: str, user_email: str, notify: bool = True):
+    """Record a new run so it can be listed and resumed later"""
+    now = time.time()
+    with _lock:
+        conn = _connection()
+        conn.execute(
+            "INSERT OR IGNORE INTO runs (run_id, mode, user_email, status, error, created_at, updated_at, notify) "
+            "VALUES (?, ?, ?, 'running', NULL, ?, ?, ?)",
+            (run_id, mode, user_email, now, now, int(notify))
+        )
+        conn.commit()
+
+
+def mark_run(run_id: str, status: str, error: str = None, usage: dict = None):
+    """Record a run's outcome (and its LLM usage so far, from state["usage"])"""
+    total = (usage or {}).get("total") or {}
+    with _lock:
+        conn = _connection()
+        conn.execute(
+            "UPDATE runs SET status = ?, error = ?, updated_at = ?, "
+            "tokens = COALESCE(?, tokens), cost_usd = COALESCE(?, cost_usd) WHERE run_id = ?",
+            (status, error, time.time(), total.get("total_tokens"), total.get("cost_usd"), run_id)
+        )
+        conn.commit()
+
+
+def get_run(run_id: str) -> dict:
+    with _lock:
+        row = _connection().execute(
+            "SELECT run_id, mode, user_email, status, error, created_at, updated_at, notify FROM runs WHERE run_id = ?",
+            (run_id,)
+        ).fetchone()
+    if not row:
+        return None
+    keys = ["run_id", "mode", "user_email", "status", "error", "created_at", "updated_at", "notify"]
+    run = dict(zip(keys, row))
+    run["notify"] = run["notify"] != 0
+    return run
+
+
+def list_runs(limit: int = 50) -> list:
+    with _lock:
+        rows = _connection().execute(
+            "SELECT run_id, mode, user_email, status, error, created_at, updated_at, tokens, cost_usd "
+            "FROM runs ORDER BY created_at DESC LIMIT ?", (limit,)
+        ).fetchall()
+    keys = ["run_id", "mode", "user_email", "status", "error", "created_at", "updated_at", "tokens", "cost_usd"]
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def run_status(final_state: dict) -> tuple:
+    """
+    Classify a finished run as ('completed', None) or ('failed', reason)
+    Email/calendar errors count as failures so the notification step can be retried
+    """
+    if final_state.get("error"):
+        return "failed", final_state["error"]
+    for result in final_state.get("notification_results") or []:
+        if "error" in result.lower():
+            return "failed", result
+    return "completed", None
+
+
+def _failed_node(history: list) -> str:
+    """
+    Name of the node that first put the run into a failed state
+    history is newest-first, as returned by get_state_history
+    """
+    chronological = list(reversed(history))
+    for before, after in zip(chronological, chronological[1:]):
+        if after.values.get("error") and not before.values.get("error") and before.next:
+            return before.next[0]
+    status, _ = run_status(history[0].values)
+    if status == "failed":
+        return "send_notifications"
+    return None
+
+
+def find_resume_config(graph, config: dict, from_node: str = None) -> dict:
+    """
+    Pick the checkpoint to continue from
+
+    - Interrupted runs continue from their latest checkpoint
+    - Failed runs restart at the node that failed (or from_node if given)
+    - Completed runs return None unless from_node is given
+    """
+    history = list(graph.get_state_history(config))
+    if not history:
+        raise ValueError(f"No checkpoints found for run {config['configurable']['thread_id']}")
+
+    latest = history[0]
+    if from_node is None and latest.next:
+        return latest.config
+    if from_node is None:
+        from_node = _failed_node(history)
+        if from_node is None:
+            return None
+
+    # Most recent checkpoint where from_node was about to run
+    for snapshot in history:
+        if from_node in snapshot.next:
+            return snapshot.config
+    raise ValueError(f"Run never reached node '{from_node}'")
+
+
+def prune_checkpoints(max_age_days: float = RETENTION_DAYS) -> dict:
+    """
+    Delete runs older than max_age_days and compact completed runs down to
+    their final checkpoint, then reclaim space
+    """
+    cutoff = time.time() - max_age_days * 86400
+    saver = get_checkpointer()
+    if saver is None:
+        return {"runs_deleted": 0, "checkpoints_compacted": 0}
+    with _lock:
+        expired = [row[0] for row in _connection().execute(
+            "SELECT run_id FROM runs WHERE updated_at < ?", (cutoff,)
+        )]
+    # Use the checkpointer's own connection and lock so we don't interleave with its writes
+    with saver.lock:
+        conn = saver.conn
+        for run_id in expired:
+            conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (run_id,))
+            conn.execute("DELETE FROM writes WHERE thread_id = ?", (run_id,))
+            conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+            remove_run_files(run_id)
+
+        # Completed runs will never be resumed mid-way: keep only their last checkpoint
+        compacted = conn.execute("""
+            DELETE FROM checkpoints
+            WHERE thread_id IN (SELECT run_id FROM runs WHERE status = 'completed')
+              AND checkpoint_id NOT IN (
+                  SELECT MAX(checkpoint_id) FROM checkpoints c2
+                  WHERE c2.thread_id = checkpoints.thread_id
+                    AND c2.checkpoint_ns = checkpoints.checkpoint_ns
+              )
+        """).rowcount
+        conn.execute("""
+            DELETE FROM writes
+            WHERE thread_id IN (SELECT run_id FROM runs WHERE status = 'completed')
+        """)
+        conn.commit()
+        conn.execute("VACUUM")
+    return {"runs_deleted": len(expired), "checkpoints_compacted": compacted}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage analysis run checkpoints")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="Show recent runs")
+    resume = sub.add_parser("resume", help="Resume a failed or interrupted run")
+    resume.add_argument("run_id")
+    resume.add_argument("--from-node", default=None, help="Re-run starting at this node")
+    prune = sub.add_parser("prune", help="Delete old runs and compact completed ones")
+    prune.add_argument("--days", type=float, default=RETENTION_DAYS)
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for run in list_runs():
+            created = time.strftime("%Y-%m-%d %H:%M", time.localtime(run["created_at"]))
+            cost = f"${run['cost_usd']:.4f}" if run["cost_usd"] is not None else "-"
+            print(f"{run['run_id']}  {created}  {run['mode']:<8} {run['status']:<10} {cost:>9}  {run['error'] or ''}")
+    elif args.command == "resume":
+        from src.graph.legal_graph import resume_legal_analysis
+        final_state = resume_legal_analysis(args.run_id, from_node=args.from_node)
+        status, error = run_status(final_state)
+        print(f"Run {args.run_id}: {status} {error or ''}")
+    elif args.command == "prune":
+        print(prune_checkpoints(args.days))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+"""
+Clause-level retrieval index - remembers previously rated clauses
+Lets new clauses be matched against known-rated boilerplate without an LLM call
+"""
+import os
+import json
+import math
+import re
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+INDEX_DIR = os.getenv("CLAUSE_INDEX_DIR", os.path.join("data", "clause_index"))
+EMBEDDING_DIM = int(os.getenv("CLAUSE_EMBEDDING_DIM", "1024"))
+
+# Similarity needed before a stored clause counts as the "same" boilerplate
+MATCH_THRESHOLD = float(os.getenv("CLAUSE_MATCH_THRESHOLD", "0.80"))
+# A quoted citation this long (characters) found inside a clause ties a risk to it
+MIN_CITATION_CHARS = 20
+
+LEVEL_ORDER = {"low": 0, "medium": 1, "high": 2}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:['\-][a-z0-9]+)*")
+
+
+class HashingEmbedder:
+    """
+    Offline embedder using the hashing trick over word unigrams and bigrams
+    Deterministic across processes, needs no model download or network
+    """
+    name = "hashing-v1"
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+
+    def _features(self, text: str) -> dict:
+        words = _TOKEN_RE.findall(text.lower())
+        counts = {}
+        for i, word in enumerate(words):
+            counts[word] = counts.get(word, 0) + 1
+            if i:
+                bigram = f"{words[i - 1]} {word}"
+                counts[bigram] = counts.get(bigram, 0) + 1
+        return counts
+
+    def embed(self, texts: list) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype="float32")
+        for row, text in enumerate(texts):
+            for feature, count in self._features(text).items():
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.dim
+                sign = 1.0 if digest[4] & 1 else -1.0
+                vectors[row, bucket] += sign * (1.0 + math.log(count))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class SentenceTransformerEmbedder:
+    """
+    Local sentence-transformers model (must already be in the HF cache)
+    """
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, local_files_only=True)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = f"st:{model_name}"
+
+    def embed(self, texts: list) -> np.ndarray:
+        vectors = self.model.encode(texts, normalize_embeddings=True)
+        return np.asarray(vectors, dtype="float32")
+
+
+def get_embedder():
+    """Pick the embedder from CLAUSE_EMBEDDING_MODEL, defaulting to hashing"""
+    model_name = os.getenv("CLAUSE_EMBEDDING_MODEL")
+    if model_name:
+        try:
+            return SentenceTransformerEmbedder(model_name)
+        except Exception as e:
+            print(f"⚠️ Could not load embedding model '{model_name}', using hashing: {e}")
+    return HashingEmbedder()
+
+
+def clause_to_text(clause) -> str:
+    """Flatten a parsed clause (string or dict from the LLM) into plain text"""
+    if isinstance(clause, str):
+        return clause.strip()
+    if isinstance(clause, dict):
+        parts = [str(v) for v in clause.values() if isinstance(v, (str, int, float)) and str(v).strip()]
+        return " - ".join(parts).strip()
+    return str(clause).strip() if clause else ""
+
+
+def clause_id(text: str) -> int:
+    """Stable 63-bit id for a clause, used for dedup across runs"""
+    normalized = " ".join(_TOKEN_RE.findall(text.lower()))
+    digest = hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") & 0x7FFFFFFFFFFFFFFF
+
+
+class ClauseIndex:
+    """
+    FAISS inner-product index over clause embeddings with a JSONL sidecar
+    holding the clause text and its risk rating
+    """
+
+    def __init__(self, index_dir: str = INDEX_DIR, embedder=None):
+        import faiss
+        self._faiss = faiss
+        self.index_dir = index_dir
+        self.embedder = embedder or get_embedder()
+        self.index_path = os.path.join(index_dir, "clauses.faiss")
+        self.meta_path = os.path.join(index_dir, "clauses.jsonl")
+        self.lock_path = os.path.join(index_dir, ".lock")
+        self._lock = threading.Lock()
+        self._loaded_mtime = None
+        self.entries = {}
+        self.index = self._new_index()
+        self.load()
+
+    def _new_index(self):
+        return self._faiss.IndexIDMap2(self._faiss.IndexFlatIP(self.embedder.dim))
+
+    def __len__(self):
+        return self.index.ntotal
+
+    @contextmanager
+    def _file_lock(self):
+        """Serialize writers across gunicorn workers"""
+        os.makedirs(self.index_dir, exist_ok=True)
+        with open(self.lock_path, "a") as lock_file:
+            try:
+                import fcntl
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            except ImportError:
+                pass
+            yield
+
+    def load(self):
+        """Load the index from disk (no-op if nothing has been saved yet)"""
+        if not (os.path.exists(self.index_path) and os.path.exists(self.meta_path)):
+            return
+        entries = {}
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            header = json.loads(f.readline() or "{}")
+            if header.get("embedder") != self.embedder.name:
+                print(f"⚠️ Clause index built with {header.get('embedder')}, "
+                      f"current embedder is {self.embedder.name} - starting fresh")
+                return
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    entries[entry["id"]] = entry
+        self.index = self._faiss.read_index(self.index_path)
+        self.entries = entries
+        self._loaded_mtime = os.path.getmtime(self.index_path)
+
+    def save(self):
+        """Persist index and metadata atomically"""
+        os.makedirs(self.index_dir, exist_ok=True)
+        tmp_index = self.index_path + ".tmp"
+        tmp_meta = self.meta_path + ".tmp"
+        self._faiss.write_index(self.index, tmp_index)
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"embedder": self.embedder.name, "dim": self.embedder.dim}) + "\n")
+            for entry in self.entries.values():
+                f.write(json.dumps(entry) + "\n")
+        os.replace(tmp_meta, self.meta_path)
+        os.replace(tmp_index, self.index_path)
+        self._loaded_mtime = os.path.getmtime(self.index_path)
+
+    def add(self, items: list) -> int:
+        """
+        Incrementally add rated clauses and persist
+
+        Args:
+            items: dicts with 'text', 'level' and optionally 'category', 'reason', 'company'
+
+        Returns:
+            Number of new clauses added (duplicates are updated in place)
+        """
+        with self._lock, self._file_lock():
+            # Another worker may have written since we loaded
+            if os.path.exists(self.index_path) and os.path.getmtime(self.index_path) != self._loaded_mtime:
+                self.load()
+
+            new_items = []
+            for item in items:
+                text = (item.get("text") or "").strip()
+                if not text:
+                    continue
+                entry = {
+                    "id": clause_id(text),
+                    "text": text[:2000],
+                    "level": item.get("level", "Low"),
+                    "category": item.get("category"),
+                    "reason": item.get("reason"),
+                    "company": item.get("company"),
+                    "added_at": time.time(),
+                }
+                if entry["id"] in self.entries:
+                    self.entries[entry["id"]].update({k: v for k, v in entry.items() if v is not None})
+                else:
+                    self.entries[entry["id"]] = entry
+                    new_items.append(entry)
+
+            if new_items:
+                vectors = self.embedder.embed([e["text"] for e in new_items])
+                ids = np.array([e["id"] for e in new_items], dtype="int64")
+                self.index.add_with_ids(vectors, ids)
+            if items:
+                self.save()
+            return len(new_items)
+
+    def search(self, texts: list, k: int = 5) -> list:
+        """
+        Find the k most similar stored clauses for each query text
+
+        Returns:
+            One list per query of {"similarity", **entry} dicts, best first
+        """
+        if not texts or self.index.ntotal == 0:
+            return [[] for _ in texts]
+        vectors = self.embedder.embed(texts)
+        with self._lock:
+            scores, ids = self.index.search(vectors, min(k, self.index.ntotal))
+        results = []
+        for row_scores, row_ids in zip(scores, ids):
+            hits = []
+            for score, idx in zip(row_scores, row_ids):
+                entry = self.entries.get(int(idx))
+                if idx != -1 and entry:
+                    hits.append({"similarity": float(score), **entry})
+            results.append(hits)
+        return results
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_clause_index() -> ClauseIndex:
+    """Process-wide clause index, loaded on first use"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ClauseIndex()
+        return _index
+
+
+def match_known_clauses(clauses: list, threshold: float = MATCH_THRESHOLD, min_level: str = "Medium") -> list:
+    """
+    Flag clauses that closely match previously rated risky clauses
+
+    Returns:
+        List of {"index" (position in clauses), "clause", "matched_clause", "level",
+        "category", "reason", "similarity"}
+    """
+    numbered = [(i, clause_to_text(c)) for i, c in enumerate(clauses or [])]
+    numbered = [(i, t) for i, t in numbered if t]
+    if not numbered:
+        return []
+
+    index = get_clause_index()
+    flags = []
+    floor = LEVEL_ORDER.get(min_level.lower(), 1)
+    for (position, text), hits in zip(numbered, index.search([t for _, t in numbered], k=1)):
+        if not hits:
+            continue
+        best = hits[0]
+        if best["similarity"] >= threshold and LEVEL_ORDER.get(str(best["level"]).lower(), 0) >= floor:
+            flags.append({
+                "index": position,
+                "clause": text[:300],
+                "matched_clause": best["text"][:300],
+                "level": best["level"],
+                "category": best.get("category"),
+                "reason": best.get("reason"),
+                "similarity": round(best["similarity"], 3),
+            })
+    return flags
+
+
+def _normalize(text: str) -> str:
+    return " ".join(_TOKEN_RE.findall(str(text).lower()))
+
+
+def risk_citations(risk: dict) -> list:
+    """Clause text a risk points at: the LLM's quoted "clause", or the rule hits' evidence"""
+    cited = [risk.get("clause")] + list(risk.get("evidence") or [])
+    pieces = []
+    for text in cited:
+        if not isinstance(text, str):
+            continue
+        # Evidence snippets are cut at word boundaries and marked with an ellipsis
+        pieces.extend(p for p in re.split(r"…|\.\.\.", text) if len(p.strip()) >= MIN_CITATION_CHARS)
+    return pieces
+
+
+def rate_clauses(clauses: list, risks: list, embedder=None) -> list:
+    """
+    Attach the most severe risk rating to each clause the risk actually cites
+    A risk is tied to a clause when its quoted text appears in the clause, or
+    is the same boilerplate (MATCH_THRESHOLD similarity). Clauses no risk cites
+    are rated Low
+    """
+    texts = [clause_to_text(c) for c in clauses or []]
+    texts = [t for t in texts if t]
+    if not texts:
+        return []
+
+    rated = [{"text": t, "level": "Low"} for t in texts]
+    cited = [(risk, piece) for risk in risks or [] if isinstance(risk, dict) for piece in risk_citations(risk)]
+    if not cited:
+        return rated
+
+    embedder = embedder or get_clause_index().embedder
+    normalized = [_normalize(t) for t in texts]
+    similarity = embedder.embed(texts) @ embedder.embed([piece for _, piece in cited]).T
+
+    for i, item in enumerate(rated):
+        best = None
+        for j, (risk, piece) in enumerate(cited):
+            quoted = _normalize(piece)
+            if not (quoted and quoted in normalized[i]) and similarity[i, j] < MATCH_THRESHOLD:
+                continue
+            severity = LEVEL_ORDER.get(str(risk.get("level", "")).lower(), 0)
+            if best is None or severity > best[0]:
+                best = (severity, risk)
+        if best:
+            risk = best[1]
+            item.update({
+                "level": risk.get("level", "Low"),
+                "category": risk.get("category"),
+                "reason": risk.get("reason"),
+            })
+    return rated
+
+
+def record_rated_clauses(clauses: list, risks: list, company: str = None) -> int:
+    """Add this run's clauses with their risk ratings to the index"""
+    index = get_clause_index()
+    rated = rate_clauses(clauses, risks, index.embedder)
+    for item in rated:
+        item["company"] = company
+    return index.add(rated)
@@ -0,0 +1,304 @@
+"""
+Deterministic date / deadline extraction - finds candidate deadlines in contract text
+Resolves absolute dates, relative phrases ("within 14 days of execution"),
+times of day and timezone abbreviations without any LLM calls
+"""
+import calendar
+import os
+import re
+from datetime import date, timedelta
+from typing import Optional
+
+DEFAULT_TIMEZONE = os.getenv("DEFAULT_TIMEZONE", "America/Los_Angeles")
+
+TIMEZONE_ALIASES = {
+    "pst": "America/Los_Angeles", "pdt": "America/Los_Angeles", "pt": "America/Los_Angeles",
+    "pacific": "America/Los_Angeles",
+    "mst": "America/Denver", "mdt": "America/Denver", "mt": "America/Denver", "mountain": "America/Denver",
+    "cst": "America/Chicago", "cdt": "America/Chicago", "ct": "America/Chicago", "central": "America/Chicago",
+    "est": "America/New_York", "edt": "America/New_York", "et": "America/New_York", "eastern": "America/New_York",
+    "akst": "America/Anchorage", "hst": "Pacific/Honolulu",
+    "utc": "UTC", "gmt": "UTC", "z": "UTC",
+    "bst": "Europe/London", "cet": "Europe/Paris", "cest": "Europe/Paris",
+    "ist": "Asia/Kolkata", "jst": "Asia/Tokyo", "aest": "Australia/Sydney", "aedt": "Australia/Sydney",
+}
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8,
+    "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14,
+    "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18, "nineteen": 19,
+    "twenty": 20, "twenty-one": 21, "twenty-eight": 28, "thirty": 30, "forty-five": 45,
+    "sixty": 60, "ninety": 90,
+}
+
+_MONTH = (r"(?P<{g}>Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|June?|July?|Aug(?:ust)?|"
+          r"Sep(?:t(?:ember)?)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)\.?")
+_ORD = r"(?:st|nd|rd|th)?"
+
+DATE_RE = re.compile(
+    rf"\b{_MONTH.format(g='m1')}\s+(?P<d1>\d{{1,2}}){_ORD}(?:,?\s+(?P<y1>\d{{4}}))?\b"
+    rf"|\b(?P<d2>\d{{1,2}}){_ORD}\s+(?:day\s+of\s+)?{_MONTH.format(g='m2')},?\s+(?P<y2>\d{{4}})\b"
+    r"|\b(?P<y3>\d{4})-(?P<m3>\d{2})-(?P<d3>\d{2})\b"
+    r"|\b(?P<m4>\d{1,2})/(?P<d4>\d{1,2})/(?P<y4>\d{4}|\d{2})\b",
+    re.IGNORECASE
+)
+
+_TZ_NAMES = "|".join(sorted((re.escape(k) for k in TIMEZONE_ALIASES if k != "z"), key=len, reverse=True))
+TIME_RE = re.compile(
+    r"\b(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?P<ampm>[ap]\.?\s?m\.?)?"
+    rf"(?:\s*\(?(?P<tz>{_TZ_NAMES})\b\)?(?:\s+time)?)?"
+    r"|\b(?P<word>noon|midnight)\b"
+    rf"(?:\s*\(?(?P<tz2>{_TZ_NAMES})\b\)?)?",
+    re.IGNORECASE
+)
+
+_NUMBER = r"(?P<num>\d{1,3}|" + "|".join(sorted(NUMBER_WORDS, key=len, reverse=True)) + r")"
+RELATIVE_RE = re.compile(
+    rf"\b(?:(?:within|no\s+later\s+than|not\s+later\s+than|at\s+least)\s+)?{_NUMBER}\s*(?:\(\d{{1,3}}\)\s*)?"
+    r"(?P<business>business\s+|calendar\s+)?(?P<unit>days?|weeks?|months?)\s+"
+    r"(?:of|after|from|following)\s+(?:the\s+)?"
+    r"(?P<anchor>execution|signing|signature|effective\s+date|date\s+of\s+this\s+agreement|"
+    r"date\s+hereof|commencement|start\s+date|the\s+execution\s+of\s+this\s+agreement|"
+    r"receipt\s+of\s+(?:the\s+)?(?:product|products|samples?|brief|materials)|"
+    r"[a-z]+\s+receipt\s+of\s+(?:the\s+)?(?:product|products|samples?|brief|materials))",
+    re.IGNORECASE
+)
+
+EFFECTIVE_RE = re.compile(
+    r"(?:effective\s+(?:as\s+of\s+|on\s+)?|dated\s+(?:as\s+of\s+)?|entered\s+into\s+(?:as\s+of\s+|on\s+)?|"
+    r"effective\s+date[\"”']?\)?\s*(?:is|:|of)?\s*)",
+    re.IGNORECASE
+)
+
+# Anchors that mean "the day the contract is signed"
+_EXECUTION_ANCHORS = ("execution", "signing", "signature", "effective", "date of this agreement",
+                      "date hereof", "commencement", "start date")
+
+
+def resolve_timezone(value: Optional[str], default: str = DEFAULT_TIMEZONE) -> str:
+    """
+    Map a timezone abbreviation ("PST", "Eastern") or IANA name to an IANA name
+    Unknown or empty values fall back to the default
+    """
+    if not value or str(value).strip().lower() in ("", "null", "none"):
+        return default
+    value = str(value).strip()
+    alias = TIMEZONE_ALIASES.get(value.lower().replace(" time", "").strip("() "))
+    if alias:
+        return alias
+    try:
+        from zoneinfo import ZoneInfo
+        ZoneInfo(value)
+        return value
+    except Exception:
+        return default
+
+
+def _month_number(name: str) -> int:
+    return MONTHS[name[:3].lower()]
+
+
+def _parse_number(value: str) -> int:
+    return int(value) if value.isdigit() else NUMBER_WORDS[value.lower()]
+
+
+def _date_from_match(match, reference: date) -> Optional[date]:
+    g = match.groupdict()
+    try:
+        if g["m1"]:
+            year = int(g["y1"]) if g["y1"] else None
+            month, day = _month_number(g["m1"]), int(g["d1"])
+            if year is None:
+                # "March 5" with no year - next occurrence on/after the reference date
+                candidate = date(reference.year, month, day)
+                return candidate if candidate >= reference else date(reference.year + 1, month, day)
+            return date(year, month, day)
+        if g["m2"]:
+            return date(int(g["y2"]), _month_number(g["m2"]), int(g["d2"]))
+        if g["y3"]:
+            return date(int(g["y3"]), int(g["m3"]), int(g["d3"]))
+        if g["m4"]:
+            year = int(g["y4"])
+            year = year + 2000 if year < 100 else year
+            return date(year, int(g["m4"]), int(g["d4"]))
+    except ValueError:
+        return None
+    return None
+
+
+def _time_from_match(match) -> Optional[tuple]:
+    """Return (HH:MM, tz alias or None) for a time match, or None if it isn't a time"""
+    g = match.groupdict()
+    if g["word"]:
+        hhmm = "12:00" if g["word"].lower() == "noon" else "23:59"
+        return hhmm, g["tz2"]
+    hour = int(g["hour"])
+    minute = int(g["minute"] or 0)
+    ampm = (g["ampm"] or "").replace(".", "").replace(" ", "").lower()
+    # A bare number is not a time unless it has minutes, am/pm or a timezone
+    if not (g["minute"] or ampm or g["tz"]):
+        return None
+    if ampm == "pm" and hour < 12:
+        hour += 12
+    elif ampm == "am" and hour == 12:
+        hour = 0
+    if hour > 23 or minute > 59:
+        return None
+    return f"{hour:02d}:{minute:02d}", g["tz"]
+
+
+def _add_offset(anchor: date, amount: int, unit: str, business: bool) -> date:
+    unit = unit.lower()
+    if unit.startswith("week"):
+        return anchor + timedelta(weeks=amount)
+    if unit.startswith("month"):
+        month = anchor.month - 1 + amount
+        year = anchor.year + month // 12
+        month = month % 12 + 1
+        day = min(anchor.day, calendar.monthrange(year, month)[1])
+        return date(year, month, day)
+    if business:
+        current, remaining = anchor, amount
+        while remaining:
+            current += timedelta(days=1)
+            if current.weekday() < 5:
+                remaining -= 1
+        return current
+    return anchor + timedelta(days=amount)
+
+
+# Sentence ends: a period before whitespace (but not "a.m.", "Inc." etc.) or a blank line
+SENTENCE_END_RE = re.compile(
+    r"(?<![ap]\.m)(?<![ap]m)(?<!\bInc)(?<!\bLtd)(?<!\bCo)(?<!\bNo)(?<!\bSt)\.(?=\s)|\n\s*\n"
+)
+
+
+def _sentence_bounds(text: str, start: int, end: int, limit: int = 300) -> tuple:
+    lo = max(0, start - limit)
+    left = lo
+    for match in SENTENCE_END_RE.finditer(text, lo, start):
+        left = match.end()
+    match = SENTENCE_END_RE.search(text, end, min(len(text), end + limit))
+    right = match.end() if match else min(len(text), end + limit)
+    return left, right
+
+
+def _span_distance(start: int, end: int, other_start: int, other_end: int) -> int:
+    if other_start >= end:
+        return other_start - end
+    if other_end <= start:
+        return start - other_end
+    return 0
+
+
+def _assign_times(text: str, spans: list, window: int = 60) -> dict:
+    """
+    Attach each time-of-day expression to the closest date in the same sentence
+    Returns {span index: (HH:MM, tz alias or None)}
+    """
+    assigned = {}
+    for i, (start, end) in enumerate(spans):
+        left, right = _sentence_bounds(text, start, end)
+        best = None
+        for match in TIME_RE.finditer(text, max(left, start - window), min(right, end + window)):
+            if any(s <= match.start() < e for s, e in spans):
+                continue
+            parsed = _time_from_match(match)
+            if not parsed:
+                continue
+            distance = _span_distance(start, end, *match.span())
+            # Skip times that sit closer to another date
+            if any(_span_distance(s, e, *match.span()) < distance for j, (s, e) in enumerate(spans) if j != i):
+                continue
+            if best is None or distance < best[0]:
+                best = (distance, parsed)
+        if best:
+            assigned[i] = best[1]
+    return assigned
+
+
+def _effective_match(contract_text: str, reference: date) -> Optional[tuple]:
+    """(date, start, end) of the date stated as the effective date, None if there is none"""
+    for match in EFFECTIVE_RE.finditer(contract_text):
+        date_match = DATE_RE.match(contract_text, match.end())
+        if date_match:
+            found = _date_from_match(date_match, reference)
+            if found:
+                return found, date_match.start(), date_match.end()
+    return None
+
+
+def find_effective_date(contract_text: str, reference: date = None) -> Optional[date]:
+    """
+    Find the contract's effective/execution date
+    Only an explicit "effective as of <date>", "dated <date>" or
+    "Effective Date: <date>" counts; None otherwise
+    """
+    found = _effective_match(contract_text, reference or date.today())
+    return found[0] if found else None
+
+
+def extract_date_candidates(contract_text: str, reference: date = None,
+                            default_timezone: str = DEFAULT_TIMEZONE) -> list:
+    """
+    Find every dated obligation in the contract
+
+    Args:
+        contract_text: Raw contract text
+        reference: Date used when the contract has no effective date (defaults to today)
+        default_timezone: IANA zone used for times without an explicit zone
+
+    Returns:
+        List of candidate dicts, ordered by position:
+        {"id", "date", "time", "timezone", "kind", "phrase", "is_effective_date",
+        "unanchored", "start", "end", "snippet"}; "unanchored" relative dates
+        were counted from the reference date because the contract states no
+        effective date
+    """
+    reference = reference or date.today()
+    effective = _effective_match(contract_text, reference)
+    anchor = effective[0] if effective else reference
+    effective_span = effective[1:] if effective else None
+
+    found = []
+    for match in DATE_RE.finditer(contract_text):
+        resolved = _date_from_match(match, anchor)
+        if resolved:
+            found.append((match.start(), match.end(), resolved, "absolute", match.group(0)))
+
+    for match in RELATIVE_RE.finditer(contract_text):
+        anchor_name = match.group("anchor").lower()
+        if not any(a in anchor_name for a in _EXECUTION_ANCHORS):
+            # Relative to an event we can't date (e.g. receipt of product) - nothing to schedule
+            continue
+        amount = _parse_number(match.group("num"))
+        business = bool(match.group("business")) and match.group("business").lower().startswith("business")
+        resolved = _add_offset(anchor, amount, match.group("unit"), business)
+        found.append((match.start(), match.end(), resolved, "relative", match.group(0)))
+
+    found.sort(key=lambda item: item[0])
+    times = _assign_times(contract_text, [(start, end) for start, end, *_ in found])
+    candidates = []
+    for i, (start, end, resolved, kind, phrase) in enumerate(found):
+        hhmm, tz_alias = times.get(i, (None, None))
+        left, right = _sentence_bounds(contract_text, start, end)
+        candidates.append({
+            "id": f"D{len(candidates) + 1}",
+            "date": resolved.isoformat(),
+            "time": hhmm,
+            "timezone": resolve_timezone(tz_alias, default_timezone) if hhmm else None,
+            "kind": kind,
+            "phrase": " ".join(phrase.split()),
+            "is_effective_date": (start, end) == effective_span,
+            "unanchored": kind == "relative" and effective is None,
+            "start": start,
+            "end": end,
+            "snippet": " ".join(contract_text[left:right].split()),
+        })
+    return candidates
+
@@ -0,0 +1,279 @@
+"""
+Per-recipient email digests
+With EMAIL_DIGEST=1, finished summaries are queued in a local SQLite outbox
+instead of being emailed one run at a time. A recipient's queue goes out as
+one combined email once it holds DIGEST_MAX_ITEMS summaries or its oldest
+summary has waited DIGEST_INTERVAL_MINUTES, and every due recipient is sent
+over a single SMTP connection.
+
+CLI:
+    python -m src.graph.digest status
+    python -m src.graph.digest flush [--all]
+"""
+import argparse
+import base64
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from dotenv import load_dotenv
+load_dotenv()
+
+EMAIL_DIGEST = os.getenv("EMAIL_DIGEST", "0") == "1"
+DIGEST_DB = os.getenv("DIGEST_DB", os.path.join("data", "outbox.sqlite"))
+DIGEST_INTERVAL_MINUTES = float(os.getenv("DIGEST_INTERVAL_MINUTES", "60"))
+DIGEST_MAX_ITEMS = int(os.getenv("DIGEST_MAX_ITEMS", "10"))
+# Rows claimed by a flush that never finished (worker died) are retried after this
+CLAIM_TIMEOUT_SECONDS = 600
+# How often the background flusher looks for due digests
+FLUSH_CHECK_SECONDS = 60
+
+_conn = None
+_lock = threading.Lock()
+_flusher = None
+
+
+def _connection() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        directory = os.path.dirname(DIGEST_DB)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(DIGEST_DB, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY,
+                recipient TEXT NOT NULL,
+                company_name TEXT,
+                run_id TEXT,
+                summary TEXT NOT NULL,
+                attachments TEXT,
+                queued_at REAL NOT NULL,
+                claim TEXT,
+                claimed_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS outbox_recipient ON outbox (recipient, queued_at);
+        """)
+        conn.commit()
+        _conn = conn
+    return _conn
+
+
+def queue_summary(recipient: str, summary_text: str, company_name: str = None,
+                  run_id: str = None, attachments: list = None) -> str:
+    """
+    Add a summary to the recipient's digest; sends right away once the
+    digest is full. attachments: (filename, bytes, subtype) tuples
+    """
+    encoded = json.dumps([
+        [filename, base64.b64encode(content).decode("ascii"), subtype]
+        for filename, content, subtype in attachments or []
+    ])
+    with _lock:
+        conn = _connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO outbox (recipient, company_name, run_id, summary, attachments, queued_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (recipient, company_name, run_id, summary_text, encoded, time.time())
+            )
+        waiting = conn.execute(
+            "SELECT COUNT(*) FROM outbox WHERE recipient = ? AND claim IS NULL", (recipient,)
+        ).fetchone()[0]
+    print(f"📥 Queued summary for {recipient} in the digest outbox ({waiting} waiting)")
+    start_flusher()
+    if waiting >= DIGEST_MAX_ITEMS:
+        result = flush_outbox(recipients=[recipient])
+        error = result.get("error") or result.get("rejected", {}).get(recipient)
+        if error:
+            # Still queued; the flusher retries
+            return f"📥 Summary queued for {recipient}; digest send failed, will retry: {error}"
+        return f"✅ Digest of {waiting} summaries sent to {recipient}"
+    return f"📥 Summary queued for {recipient}'s digest ({waiting}/{DIGEST_MAX_ITEMS})"
+
+
+def due_recipients(force: bool = False) -> list:
+    """Recipients whose digest is full or has waited long enough (all of them with force)"""
+    now = time.time()
+    with _lock:
+        rows = _connection().execute(
+            "SELECT recipient, COUNT(*), MIN(queued_at) FROM outbox "
+            "WHERE claim IS NULL OR claimed_at < ? GROUP BY recipient",
+            (now - CLAIM_TIMEOUT_SECONDS,)
+        ).fetchall()
+    return [
+        recipient for recipient, count, oldest in rows
+        if force or count >= DIGEST_MAX_ITEMS or oldest <= now - DIGEST_INTERVAL_MINUTES * 60
+    ]
+
+
+def flush_outbox(force: bool = False, recipients: list = None) -> dict:
+    """
+    Send every due digest (or the given recipients', or all with force)
+    over one SMTP connection. Rows are claimed first so concurrent workers
+    never send the same summary twice. Each recipient's rows are deleted as
+    their digest goes out; a recipient whose digest fails stays queued
+    without holding up the others.
+    """
+    recipients = recipients if recipients is not None else due_recipients(force)
+    if not recipients:
+        return {"recipients": 0, "summaries": 0}
+    claim = uuid.uuid4().hex
+    now = time.time()
+    placeholders = ", ".join("?" for _ in recipients)
+    with _lock:
+        conn = _connection()
+        with conn:
+            conn.execute(
+                f"UPDATE outbox SET claim = ?, claimed_at = ? "
+                f"WHERE recipient IN ({placeholders}) AND (claim IS NULL OR claimed_at < ?)",
+                [claim, now] + list(recipients) + [now - CLAIM_TIMEOUT_SECONDS]
+            )
+        rows = conn.execute(
+            "SELECT recipient, company_name, summary, attachments FROM outbox WHERE claim = ? ORDER BY id",
+            (claim,)
+        ).fetchall()
+    if not rows:
+        return {"recipients": 0, "summaries": 0}
+
+    by_recipient = {}
+    for recipient, company_name, summary, attachments in rows:
+        by_recipient.setdefault(recipient, []).append((company_name, summary, json.loads(attachments or "[]")))
+
+    recipient_of = {}
+    sent, rejected = [], {}
+
+    def finish(recipient, sql):
+        with _lock:
+            conn = _connection()
+            with conn:
+                conn.execute(sql, (claim, recipient))
+
+    def on_sent(msg):
+        recipient = recipient_of[id(msg)]
+        finish(recipient, "DELETE FROM outbox WHERE claim = ? AND recipient = ?")
+        sent.append(recipient)
+
+    def on_rejected(msg, error):
+        recipient = recipient_of[id(msg)]
+        finish(recipient, "UPDATE outbox SET claim = NULL, claimed_at = NULL WHERE claim = ? AND recipient = ?")
+        rejected[recipient] = str(error)
+        print(f"❌ Digest for {recipient} rejected, stays queued: {str(error)}")
+
+    error = None
+    try:
+        from src.graph.nodes.send_notifications import build_email, deliver_messages, smtp_credentials
+        sender_email, _ = smtp_credentials()
+        messages = []
+        for recipient, items in by_recipient.items():
+            msg = build_digest_email(sender_email, recipient, items, build_email)
+            recipient_of[id(msg)] = recipient
+            messages.append(msg)
+        deliver_messages(messages, on_sent=on_sent, on_rejected=on_rejected)
+    except Exception as e:
+        error = str(e)
+    finally:
+        # Whatever wasn't sent (connection lost, crash mid-flush) goes back in the queue
+        with _lock:
+            conn = _connection()
+            with conn:
+                conn.execute("UPDATE outbox SET claim = NULL, claimed_at = NULL WHERE claim = ?", (claim,))
+
+    summaries = sum(len(by_recipient[recipient]) for recipient in sent)
+    result = {"recipients": len(sent), "summaries": summaries}
+    if rejected:
+        result["rejected"] = rejected
+    if error:
+        print(f"❌ Digest flush failed, {len(rows) - summaries} summaries stay queued: {error}")
+        result["error"] = error
+    if sent:
+        print(f"📨 Digest: {summaries} summaries to {len(sent)} recipients over one SMTP connection")
+    return result
+
+
+def build_digest_email(sender_email: str, recipient: str, items: list, build_email):
+    """One email with every queued summary, a contents list first"""
+    today = datetime.now().strftime('%Y-%m-%d')
+    companies = [company or "Unknown Company" for company, _, _ in items]
+    if len(items) == 1:
+        company = companies[0]
+        subject = f"Contract Summary - {today}" + (f" - {company}" if company != "Unknown Company" else "")
+        body = items[0][1]
+    else:
+        subject = f"Contract Summaries - {today} - {len(items)} contracts"
+        contents = "\n".join(f"{i}. {company}" for i, company in enumerate(companies, 1))
+        body = f"# {len(items)} Contract Summaries\n\n{contents}\n\n---\n\n" + "\n\n---\n\n".join(
+            summary for _, summary, _ in items
+        )
+
+    attachments = []
+    for company, _, files in items:
+        for filename, content, subtype in files:
+            # Several contracts may each bring a deliverables.ics
+            prefix = re.sub(r"[^a-z0-9]+", "-", (company or "contract").lower()).strip("-")
+            attachments.append((f"{prefix}-{filename}", base64.b64decode(content), subtype))
+    return build_email(sender_email, recipient, subject, body, attachments)
+
+
+def start_flusher():
+    """
+    Background thread that sends digests once their interval has passed
+    Started when a web or job worker boots (and on the first queued summary),
+    so summaries left in the outbox by a restart still go out on time
+    """
+    global _flusher
+    if not EMAIL_DIGEST:
+        return
+    with _lock:
+        if _flusher is not None:
+            return
+        _flusher = threading.Thread(target=_flush_loop, name="digest-flusher", daemon=True)
+        _flusher.start()
+
+
+def _flush_loop():
+    while True:
+        time.sleep(min(FLUSH_CHECK_SECONDS, DIGEST_INTERVAL_MINUTES * 60))
+        try:
+            flush_outbox()
+        except Exception as e:
+            print(f"❌ Digest flusher error: {str(e)}")
+
+
+def outbox_status() -> list:
+    """(recipient, waiting summaries, minutes the oldest has waited) per recipient"""
+    now = time.time()
+    with _lock:
+        rows = _connection().execute(
+            "SELECT recipient, COUNT(*), MIN(queued_at) FROM outbox GROUP BY recipient ORDER BY MIN(queued_at)"
+        ).fetchall()
+    return [(recipient, count, round((now - oldest) / 60, 1)) for recipient, count, oldest in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Email digest outbox")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="Queued summaries per recipient")
+    flush_cmd = sub.add_parser("flush", help="Send due digests")
+    flush_cmd.add_argument("--all", action="store_true", help="Send every queued digest now")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        rows = outbox_status()
+        for recipient, count, minutes in rows:
+            print(f"{recipient:<40} {count:>3} waiting, oldest {minutes} min")
+        if not rows:
+            print("Outbox is empty")
+    else:
+        result = flush_outbox(force=args.all)
+        print(f"Sent {result['summaries']} summaries to {result['recipients']} recipients"
+              + (f" (error: {result['error']})" if result.get("error") else ""))
+
+
+if __name__ == "__main__":
+    main()
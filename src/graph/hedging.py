@@ -0,0 +1,154 @@
+"""
+Hedged LLM requests - cut tail latency on slow completions
+When a call to a hedged node hasn't returned after that node's latency
+percentile (p95 by default), a duplicate request is sent and whichever
+finishes first wins; the other's result is discarded. Hedges per node are
+capped at a fraction of its calls so a slow provider can't double our traffic.
+
+Both requests are plain llm.invoke calls on a shared thread pool: the model
+clients (and their pooled connections) are shared by the whole process, so
+they must not be tied to a short-lived event loop.
+"""
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+HEDGING_ENABLED = os.getenv("LLM_HEDGING", "0") == "1"
+HEDGE_NODES = {n.strip() for n in os.getenv("LLM_HEDGE_NODES", "parse_contract,write_summary").split(",") if n.strip()}
+# Hedge once a call is slower than this percentile of the node's recent calls
+HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+# Max hedges as a fraction of the node's calls (plus one to start with)
+HEDGE_BUDGET = float(os.getenv("LLM_HEDGE_BUDGET", "0.1"))
+# Delay used until a node has enough latency samples
+HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "30"))
+
+MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+# Threads running hedged requests (a primary and its hedge each take one)
+HEDGE_THREADS = 32
+
+_pool = ThreadPoolExecutor(max_workers=HEDGE_THREADS, thread_name_prefix="hedge")
+
+
+class NodeHedgeStats:
+    """Recent latencies and hedge counters for one node"""
+
+    def __init__(self):
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.budget_denied = 0
+
+    def delay(self) -> float:
+        if len(self.latencies) < MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return percentile(self.latencies, HEDGE_PERCENTILE)
+
+    def take_hedge(self) -> bool:
+        """Spend one hedge from the node's budget, if any is left"""
+        if self.hedges + 1 > HEDGE_BUDGET * self.calls + 1:
+            self.budget_denied += 1
+            return False
+        self.hedges += 1
+        return True
+
+
+_stats = {}
+_lock = threading.Lock()
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+    return ordered[index]
+
+
+def _node_stats(node: str) -> NodeHedgeStats:
+    with _lock:
+        if node not in _stats:
+            _stats[node] = NodeHedgeStats()
+        return _stats[node]
+
+
+def should_hedge(node: str) -> bool:
+    return HEDGING_ENABLED and node in HEDGE_NODES
+
+
+def hedged_invoke(llm, messages: list, node: str, acquire=None, **kwargs):
+    """
+    Call llm.invoke(messages), hedging with a duplicate request if it is slow
+
+    Args:
+        acquire: Called before sending the hedge, e.g. to take rate-limit capacity
+    """
+    stats = _node_stats(node)
+    with _lock:
+        stats.calls += 1
+        delay = stats.delay()
+
+    started = time.monotonic()
+    response, hedge_won = _race(llm, messages, stats, delay, acquire, kwargs)
+    elapsed = time.monotonic() - started
+
+    with _lock:
+        stats.latencies.append(elapsed)
+        if hedge_won:
+            stats.hedge_wins += 1
+    if hedge_won:
+        print(f"🏁 {node}: hedged request won after {elapsed:.1f}s (hedge delay {delay:.1f}s)")
+    return response
+
+
+def _submit(llm, messages: list, kwargs: dict):
+    # The request keeps the caller's context (node deadline, current run)
+    return _pool.submit(contextvars.copy_context().run, llm.invoke, messages, **kwargs)
+
+
+def _race(llm, messages: list, stats: NodeHedgeStats, delay: float, acquire, kwargs: dict) -> tuple:
+    primary = _submit(llm, messages, kwargs)
+    done, _ = wait({primary}, timeout=delay)
+    if done:
+        return primary.result(), False
+
+    with _lock:
+        allowed = stats.take_hedge()
+    if not allowed:
+        return primary.result(), False
+    if acquire:
+        acquire()
+        if primary.done() and primary.exception() is None:
+            return primary.result(), False
+
+    hedge = _submit(llm, messages, kwargs)
+    pending = {primary, hedge}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                # A request already in flight can't be recalled; its result is dropped
+                for loser in pending:
+                    loser.cancel()
+                return future.result(), future is hedge
+    # Both failed - surface the original request's error
+    raise primary.exception()
+
+
+def hedge_metrics() -> dict:
+    """Per-node hedge counters for this process"""
+    with _lock:
+        return {
+            node: {
+                "calls": stats.calls,
+                "hedges": stats.hedges,
+                "hedge_wins": stats.hedge_wins,
+                "hedge_win_rate": round(stats.hedge_wins / stats.hedges, 3) if stats.hedges else 0.0,
+                "budget_denied": stats.budget_denied,
+                "hedge_delay_seconds": round(stats.delay(), 2),
+                "p50_seconds": round(percentile(stats.latencies, 50), 2) if stats.latencies else None,
+            }
+            for node, stats in _stats.items()
+        }
@@ -0,0 +1,307 @@
+"""
+History of completed analyses - a local SQLite store with full-text search
+Every finished run is saved (company, mode, parsed contract, risks,
+deliverables, summary, timings, LLM usage and cost) so it can be listed and searched after the
+email has gone out. An FTS5 index covers the company name, the clauses and
+the contract text.
+
+CLI:
+    python -m src.graph.history list
+    python -m src.graph.history search "perpetual license"
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+HISTORY_ENABLED = os.getenv("HISTORY_ENABLED", "1") == "1"
+HISTORY_DB = os.getenv("HISTORY_DB", os.path.join("data", "history.sqlite"))
+MAX_PER_PAGE = 100
+# Search result counts stop at this many matches
+MAX_COUNT = 1000
+
+# Columns returned by list/search (the large JSON/text columns only come with get_analysis)
+SUMMARY_COLUMNS = [
+    "run_id", "created_at", "user_email", "mode", "status", "company_name",
+    "overall_risk_score", "risk_count", "deliverable_count", "contract_chars", "cost_usd",
+]
+JSON_COLUMNS = ["parsed_contract", "risk_analysis", "deliverables", "timings", "usage"]
+
+_conn = None
+_lock = threading.Lock()
+
+
+def _connection() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        directory = os.path.dirname(HISTORY_DB)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(HISTORY_DB, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS analyses (
+                id INTEGER PRIMARY KEY,
+                run_id TEXT UNIQUE NOT NULL,
+                created_at REAL NOT NULL,
+                user_email TEXT,
+                mode TEXT,
+                status TEXT,
+                company_name TEXT,
+                overall_risk_score TEXT,
+                risk_count INTEGER,
+                deliverable_count INTEGER,
+                contract_chars INTEGER,
+                parsed_contract TEXT,
+                risk_analysis TEXT,
+                deliverables TEXT,
+                summary TEXT,
+                timings TEXT,
+                clauses_text TEXT,
+                contract_text TEXT,
+                cost_usd REAL,
+                usage TEXT,
+                owner TEXT
+            );
+            CREATE INDEX IF NOT EXISTS analyses_created ON analyses (created_at DESC);
+            CREATE INDEX IF NOT EXISTS analyses_user_created ON analyses (user_email, created_at DESC);
+            -- External-content index: the text lives once, in analyses
+            CREATE VIRTUAL TABLE IF NOT EXISTS analyses_fts USING fts5(
+                company_name, clauses_text, contract_text,
+                content='analyses', content_rowid='id', tokenize='porter unicode61'
+            );
+        """)
+        conn.commit()
+        _conn = conn
+    return _conn
+
+
+def _clauses_text(parsed_contract: dict) -> str:
+    from src.graph.summary_renderer import as_text
+    clauses = (parsed_contract or {}).get("clauses") or []
+    return "\n".join(as_text(clause) for clause in clauses)
+
+
+def save_analysis(state: dict, status: str = "completed"):
+    """Store (or replace, for a resumed run) a finished run's results"""
+    if not HISTORY_ENABLED or not state.get("run_id"):
+        return
+    parsed = state.get("parsed_contract") or {}
+    risk = state.get("risk_analysis") or {}
+    deliverables = state.get("deliverables") or []
+    row = {
+        "run_id": state["run_id"],
+        "created_at": time.time(),
+        "user_email": state.get("user_email"),
+        "mode": state.get("mode"),
+        "status": status,
+        "company_name": state.get("company_name"),
+        "overall_risk_score": risk.get("overall_risk_score"),
+        "risk_count": len(risk.get("risks") or []),
+        "deliverable_count": len(deliverables),
+        "contract_chars": len(state.get("contract_text") or ""),
+        "parsed_contract": json.dumps(parsed),
+        "risk_analysis": json.dumps(risk),
+        "deliverables": json.dumps(deliverables),
+        "summary": state.get("summary_markdown"),
+        "timings": json.dumps(state.get("timings") or {}),
+        "clauses_text": _clauses_text(parsed),
+        "contract_text": state.get("contract_text") or "",
+        "cost_usd": ((state.get("usage") or {}).get("total") or {}).get("cost_usd"),
+        "usage": json.dumps(state.get("usage")) if state.get("usage") else None,
+        "owner": state.get("owner"),
+    }
+    columns = list(row)
+    with _lock:
+        conn = _connection()
+        with conn:
+            old = conn.execute(
+                "SELECT id, company_name, clauses_text, contract_text FROM analyses WHERE run_id = ?",
+                (row["run_id"],)
+            ).fetchone()
+            if old:
+                # External-content FTS rows must be removed with their old values
+                conn.execute(
+                    "INSERT INTO analyses_fts (analyses_fts, rowid, company_name, clauses_text, contract_text) "
+                    "VALUES ('delete', ?, ?, ?, ?)", old
+                )
+                conn.execute("DELETE FROM analyses WHERE id = ?", (old[0],))
+            cursor = conn.execute(
+                f"INSERT INTO analyses ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                [row[c] for c in columns]
+            )
+            conn.execute(
+                "INSERT INTO analyses_fts (rowid, company_name, clauses_text, contract_text) VALUES (?, ?, ?, ?)",
+                (cursor.lastrowid, row["company_name"], row["clauses_text"], row["contract_text"])
+            )
+    print(f"🗄️ Saved analysis {row['run_id']} to history")
+
+
+def _page_args(page: int, per_page: int) -> tuple:
+    page = max(1, int(page or 1))
+    per_page = min(MAX_PER_PAGE, max(1, int(per_page or 20)))
+    return page, per_page, (page - 1) * per_page
+
+
+def list_analyses(page: int = 1, per_page: int = 20, user_email: str = None, mode: str = None) -> dict:
+    """Newest-first page of past analyses"""
+    page, per_page, offset = _page_args(page, per_page)
+    where, params = [], []
+    if user_email:
+        where.append("user_email = ?")
+        params.append(user_email)
+    if mode:
+        where.append("mode = ?")
+        params.append(mode)
+    clause = f"WHERE {' AND '.join(where)}" if where else ""
+    started = time.perf_counter()
+    with _lock:
+        conn = _connection()
+        total = conn.execute(f"SELECT COUNT(*) FROM analyses {clause}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM analyses {clause} "
+            f"ORDER BY created_at DESC LIMIT ? OFFSET ?", params + [per_page, offset]
+        ).fetchall()
+    return {
+        "results": [dict(zip(SUMMARY_COLUMNS, r)) for r in rows],
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "has_more": offset + len(rows) < total,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+def fts_query(text: str) -> str:
+    """Turn free text into a safe FTS5 query: every word must match (prefix match on the last)"""
+    words = re.findall(r"\w+", text or "")
+    if not words:
+        return ""
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search_analyses(query: str, page: int = 1, per_page: int = 20, user_email: str = None) -> dict:
+    """
+    Full-text search over company, clauses and contract text, best matches first
+    Queries matching more than MAX_COUNT analyses return the newest matches
+    instead (order: "recent") and a capped total, to stay fast
+    """
+    page, per_page, offset = _page_args(page, per_page)
+    match = fts_query(query)
+    if not match:
+        return {"results": [], "query": query, "page": page, "per_page": per_page, "total": 0,
+                "total_capped": False, "order": "relevance", "has_more": False, "elapsed_ms": 0.0}
+    if user_email:
+        # CROSS JOIN keeps the FTS match as the outer loop; otherwise SQLite runs
+        # the MATCH once per row of the user's analyses
+        source = "analyses_fts CROSS JOIN analyses a ON a.id = analyses_fts.rowid"
+        where = "analyses_fts MATCH ? AND a.user_email = ?"
+        params = [match, user_email]
+    else:
+        source, where, params = "analyses_fts", "analyses_fts MATCH ?", [match]
+    started = time.perf_counter()
+    with _lock:
+        conn = _connection()
+        total = conn.execute(
+            f"SELECT COUNT(*) FROM (SELECT 1 FROM {source} WHERE {where} LIMIT ?)", params + [MAX_COUNT + 1]
+        ).fetchone()[0]
+        # Rank ids first; snippets are only built for the rows on this page. Ranking
+        # every match of a very broad query is slow, so those come back newest first
+        broad = total > MAX_COUNT
+        if user_email and not broad:
+            broad = conn.execute(
+                "SELECT COUNT(*) FROM (SELECT 1 FROM analyses_fts WHERE analyses_fts MATCH ? LIMIT ?)",
+                [match, MAX_COUNT + 1]
+            ).fetchone()[0] > MAX_COUNT
+        order = "recent" if broad else "relevance"
+        order_by = "analyses_fts.rowid DESC" if order == "recent" else "bm25(analyses_fts, 5.0, 2.0, 1.0)"
+        ids = [r[0] for r in conn.execute(
+            f"SELECT analyses_fts.rowid FROM {source} WHERE {where} "
+            f"ORDER BY {order_by} LIMIT ? OFFSET ?", params + [per_page, offset]
+        ).fetchall()]
+        placeholders = ", ".join("?" for _ in ids)
+        snippets = dict(conn.execute(
+            f"SELECT rowid, snippet(analyses_fts, -1, '[', ']', '…', 12) FROM analyses_fts "
+            f"WHERE analyses_fts MATCH ? AND rowid IN ({placeholders})", [match] + ids
+        ).fetchall()) if ids else {}
+        rows = conn.execute(
+            f"SELECT id, {', '.join(SUMMARY_COLUMNS)} FROM analyses WHERE id IN ({placeholders})", ids
+        ).fetchall() if ids else []
+    by_id = {r[0]: r[1:] for r in rows}
+    results = [
+        {**dict(zip(SUMMARY_COLUMNS, by_id[i])), "snippet": snippets.get(i)} for i in ids if i in by_id
+    ]
+    return {
+        "results": results,
+        "query": query,
+        "page": page,
+        "per_page": per_page,
+        "total": min(total, MAX_COUNT),
+        "total_capped": total > MAX_COUNT,
+        "order": order,
+        "has_more": offset + len(results) < total,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+def get_analysis(run_id: str) -> dict:
+    """Everything stored for one run (None if unknown)"""
+    columns = SUMMARY_COLUMNS + JSON_COLUMNS + ["summary", "owner"]
+    with _lock:
+        row = _connection().execute(
+            f"SELECT {', '.join(columns)} FROM analyses WHERE run_id = ?", (run_id,)
+        ).fetchone()
+    if not row:
+        return None
+    record = dict(zip(columns, row))
+    for column in JSON_COLUMNS:
+        record[column] = json.loads(record[column]) if record[column] else None
+    return record
+
+
+def analyses_since(last_id: int, limit: int = 1000) -> list:
+    """
+    Analyses stored after row id last_id, oldest first, as
+    (id, run_id, created_at, user_email, company_name, risk_analysis, deliverables, parsed_contract)
+    with the JSON columns decoded - for consumers that keep incremental state
+    """
+    with _lock:
+        rows = _connection().execute(
+            "SELECT id, run_id, created_at, user_email, company_name, risk_analysis, deliverables, parsed_contract "
+            "FROM analyses WHERE id > ? ORDER BY id LIMIT ?", (last_id, limit)
+        ).fetchall()
+    return [
+        row[:5] + tuple(json.loads(value) if value else None for value in row[5:])
+        for row in rows
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Past contract analyses")
+    sub = parser.add_subparsers(dest="command", required=True)
+    list_cmd = sub.add_parser("list", help="Most recent analyses")
+    list_cmd.add_argument("--limit", type=int, default=20)
+    search_cmd = sub.add_parser("search", help="Full-text search")
+    search_cmd.add_argument("query")
+    search_cmd.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.command == "list":
+        result = list_analyses(per_page=args.limit)
+    else:
+        result = search_analyses(args.query, per_page=args.limit)
+    for r in result["results"]:
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(r["created_at"]))
+        line = f"{r['run_id']}  {when}  {r['mode']:<8} {r['overall_risk_score'] or '-':<7} {r['company_name']}"
+        print(line + (f"\n    {r['snippet']}" if r.get("snippet") else ""))
+    total = f"{result['total']}+" if result.get("total_capped") else result["total"]
+    print(f"{total} total ({result['elapsed_ms']} ms)")
+
+
+if __name__ == "__main__":
+    main()
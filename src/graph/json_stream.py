@@ -0,0 +1,102 @@
+"""
+Incremental JSON parsing over an LLM token stream
+Emits each element of selected top-level arrays ("clauses", "deliverables")
+as soon as it is complete, while the rest of the response is still being
+generated. Text before the first "{" (a ```json fence, a preamble) is skipped.
+"""
+import json
+
+
+class StreamingArrayParser:
+    """
+    Feed response text chunk by chunk; get back completed array items
+
+    feed() returns events:
+        ("item", key, value) - one element of a watched array, parsed
+        ("end", key, None)   - the watched array closed
+    """
+
+    def __init__(self, keys):
+        self.keys = set(keys)
+        self.started = False
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.key_chars = []
+        self.last_string = None
+        self.current_key = None
+        self.array_key = None
+        self.item = []
+        self.closed = set()
+
+    def feed(self, chunk: str) -> list:
+        events = []
+        for c in chunk:
+            if not self.started:
+                if c == "{":
+                    self.started = True
+                    self.depth = 1
+                continue
+            if self.depth == 0:
+                # Top-level object finished, ignore trailing text
+                continue
+
+            inside_item = self.array_key is not None and self.depth >= 2
+
+            if self.in_string:
+                if inside_item:
+                    self.item.append(c)
+                if self.escape:
+                    self.escape = False
+                elif c == "\\":
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+                    if self.depth == 1:
+                        self.last_string = "".join(self.key_chars)
+                elif self.depth == 1:
+                    self.key_chars.append(c)
+                continue
+
+            if c == '"':
+                self.in_string = True
+                self.key_chars = []
+                if inside_item:
+                    self.item.append(c)
+            elif c == ":" and self.depth == 1:
+                self.current_key = self.last_string
+            elif c == "," and self.depth == 1:
+                self.current_key = None
+            elif c == "[" and self.depth == 1 and self.current_key in self.keys:
+                self.array_key = self.current_key
+                self.item = []
+                self.depth += 1
+            elif c in "{[":
+                if inside_item:
+                    self.item.append(c)
+                self.depth += 1
+            elif c in "}]":
+                self.depth -= 1
+                if self.array_key is not None and self.depth == 1:
+                    self._flush(events)
+                    events.append(("end", self.array_key, None))
+                    self.closed.add(self.array_key)
+                    self.array_key = None
+                elif inside_item:
+                    self.item.append(c)
+            elif c == "," and self.depth == 2 and self.array_key is not None:
+                self._flush(events)
+            elif inside_item:
+                self.item.append(c)
+        return events
+
+    def _flush(self, events: list):
+        text = "".join(self.item).strip()
+        self.item = []
+        if not text:
+            return
+        try:
+            events.append(("item", self.array_key, json.loads(text)))
+        except json.JSONDecodeError:
+            # Malformed element; the full response is still parsed at the end
+            pass
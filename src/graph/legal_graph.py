@@ -3,40 +3,54 @@ LangGraph workflow for contract analysis
 Replaces CrewAI with a state-based graph approach
 """
 from typing import TypedDict, Annotated, Optional
-from langgraph.graph import StateGraph, END
-from langchain_openai import ChatOpenAI
+import importlib
 import os
+import threading
+import uuid
+
+# langgraph, the node modules and the LLM clients are imported on first use so
+# importing the app (and booting a gunicorn worker) stays fast
 
 # Define the state that flows through the graph
 class ContractState(TypedDict):
     # Inputs
+    run_id: Optional[str]  # checkpoint thread id
     contract_text: str
+    contract_sections: Optional[list]  # section boundaries and kinds (src/graph/sections.py)
     user_email: str
-    mode: str  # 'legal' or 'creator'
+    mode: str  # 'legal', 'creator' or 'express'
+    summary_style: Optional[str]  # 'template' or 'llm' (defaults to SUMMARY_STYLE)
+    quick_look: Optional[dict]  # regex-only overview computed at upload
+    owner: Optional[str]  # API client that started the run ("api:<name>"), saved with the history row
     
     # Intermediate state
     company_name: Optional[str]
     company_extraction_method: Optional[str]
     parsed_contract: Optional[dict]
+    risk_preflags: Optional[list]
     risk_analysis: Optional[dict]
     research_results: Optional[dict]
     deliverables: Optional[list]
+    pipelined: Optional[list]  # downstream nodes whose work overlapped the parse
     
     # Outputs
     summary_file: Optional[str]
+    summary_markdown: Optional[str]
     calendar_file: Optional[str]
     notification_results: Optional[list]
+    timings: Optional[dict]  # seconds spent per node
+    usage: Optional[dict]  # LLM tokens and cost per node and in total (src/graph/usage.py)
     error: Optional[str]
 
-# Initialize the LLM
-llm = ChatOpenAI(model="gpt-5-mini", temperature=0, api_key=os.getenv("OPENAI_API_KEY"))
-
-def create_legal_graph(mode: str = "legal"):
+def create_legal_graph(mode: str = "legal", checkpointer=None, notify: bool = True):
     """
     Create a LangGraph workflow for contract analysis
     
     Args:
-        mode: 'legal' for basic analysis, 'creator' for brand deal analysis
+        mode: 'legal' for basic analysis, 'creator' for brand deal analysis,
+              'express' for a single fused analysis call plus the summary
+        checkpointer: Optional LangGraph checkpointer to persist state after each node
+        notify: Send the summary email / calendar invites (False ends after the summary)
     """
     from src.graph.nodes.extract_company import extract_company_node
     from src.graph.nodes.parse_contract import parse_contract_node
@@ -44,21 +58,31 @@ def create_legal_graph(mode: str = "legal"):
     from src.graph.nodes.research_terms import research_terms_node
     from src.graph.nodes.extract_deliverables import extract_deliverables_node
     from src.graph.nodes.write_summary import write_summary_node
-    from src.graph.nodes.send_notifications import send_notifications_node
+    from src.graph.nodes.express_analysis import express_analysis_node
+    from src.graph.policies import with_policy
+    from langgraph.graph import StateGraph
     
     # Create the graph
     workflow = StateGraph(ContractState)
     
+    if mode == "express":
+        # One structured call replaces company/parse/risk/research, then the summary
+        workflow.add_node("express_analysis", with_policy("express_analysis", express_analysis_node))
+        workflow.add_node("write_summary", with_policy("write_summary", write_summary_node))
+        workflow.set_entry_point("express_analysis")
+        workflow.add_edge("express_analysis", "write_summary")
+        _add_notifications(workflow, notify)
+        return workflow.compile(checkpointer=checkpointer)
+    
     # Add all nodes
-    workflow.add_node("extract_company", extract_company_node)
-    workflow.add_node("parse_contract", parse_contract_node)
-    workflow.add_node("analyze_risks", analyze_risks_node)
-    workflow.add_node("research_terms", research_terms_node)
-    workflow.add_node("write_summary", write_summary_node)
-    workflow.add_node("send_notifications", send_notifications_node)
+    workflow.add_node("extract_company", with_policy("extract_company", extract_company_node))
+    workflow.add_node("parse_contract", with_policy("parse_contract", parse_contract_node))
+    workflow.add_node("analyze_risks", with_policy("analyze_risks", analyze_risks_node))
+    workflow.add_node("research_terms", with_policy("research_terms", research_terms_node))
+    workflow.add_node("write_summary", with_policy("write_summary", write_summary_node))
     
     if mode == "creator":
-        workflow.add_node("extract_deliverables", extract_deliverables_node)
+        workflow.add_node("extract_deliverables", with_policy("extract_deliverables", extract_deliverables_node))
     
     # Define the flow with research step included
     workflow.set_entry_point("extract_company")
@@ -72,41 +96,202 @@ def create_legal_graph(mode: str = "legal"):
     else:
         workflow.add_edge("research_terms", "write_summary")  # Skip deliverables in legal mode
     
+    _add_notifications(workflow, notify)
+    return workflow.compile(checkpointer=checkpointer)
+
+def _add_notifications(workflow, notify: bool):
+    """Finish the graph after write_summary, sending notifications if requested"""
+    from langgraph.graph import END
+    if not notify:
+        workflow.add_edge("write_summary", END)
+        return
+    from src.graph.nodes.send_notifications import send_notifications_node
+    from src.graph.policies import with_policy
+    workflow.add_node("send_notifications", with_policy("send_notifications", send_notifications_node))
     workflow.add_edge("write_summary", "send_notifications")
     workflow.add_edge("send_notifications", END)
+
+_graphs = {}
+_graphs_lock = threading.Lock()
+
+def get_legal_graph(mode: str = "legal", notify: bool = True):
+    """
+    Compiled graph for the mode with the process-wide checkpointer, built once
+    and reused by every run
+    """
+    from src.graph.checkpoints import get_checkpointer
+    
+    key = (mode, notify)
+    with _graphs_lock:
+        if key not in _graphs:
+            _graphs[key] = create_legal_graph(mode, checkpointer=get_checkpointer(), notify=notify)
+        return _graphs[key]
+
+def warm_up(modes: list = None):
+    """
+    Import the heavy dependencies, compile the graphs and create the LLM
+    clients ahead of the first request (see gunicorn.conf.py)
+    """
+    import time
+    from src.graph.cascade import TIER_MODELS
+    from src.graph.llm import get_llm
+    from src.graph.text_normalizer import count_tokens
     
-    return workflow.compile()
+    started = time.perf_counter()
+    for mode in modes or ["legal", "creator", "express"]:
+        get_legal_graph(mode)
+    if os.getenv("OPENAI_API_KEY"):
+        for model in set(TIER_MODELS.values()):
+            get_llm(model)
+    count_tokens("warm up")  # loads the tokenizer
+    importlib.import_module("pdfplumber")  # slow first import, done here instead of on the first upload
+    print(f"🔥 Warmed up in {time.perf_counter() - started:.2f}s")
 
-def run_legal_analysis(contract_text: str, user_email: str, mode: str = "legal") -> dict:
+def run_legal_analysis(contract_text: str, user_email: str, mode: str = "legal",
+                       quick_look: dict = None, run_id: str = None, notify: bool = True,
+                       owner: str = None) -> dict:
     """
     Run the complete legal analysis workflow
     
     Args:
         contract_text: The contract text to analyze
         user_email: User's email for notifications
-        mode: 'legal' or 'creator'
+        mode: 'legal', 'creator' or 'express'
+        quick_look: Optional preliminary result from src.graph.quick_look
+        run_id: Id used to checkpoint (and later resume) this run
+        notify: Email the summary / send calendar invites (False stops after the summary)
+        owner: API client that started the run, stored with its history row; its
+               queue share and budget are charged instead of user_email's
         
     Returns:
         Final state with results or errors
     """
-    graph = create_legal_graph(mode)
+    from src.graph.llm import current_user
+    from src.graph.checkpoints import get_checkpointer, register_run
+    from src.graph.policies import start_run_deadline
+    from src.graph.usage import budget_exceeded, start_run_usage
+    
+    # LLM calls in this run are queued fairly against other users' runs
+    current_user.set(owner or user_email)
+    start_run_deadline()
+    run_id = run_id or uuid.uuid4().hex
+    
+    # A user already over their daily budget gets the cheapest run of the mode
+    usage = start_run_usage(run_id, owner or user_email)
+    summary_style = None
+    over_budget = budget_exceeded(usage)
+    if over_budget:
+        summary_style = "template"
+        if mode == "legal":
+            mode = "express"
+            usage.downgrade(f"legal mode downgraded to express ({over_budget})")
+    
+    checkpointer = get_checkpointer()
+    graph = get_legal_graph(mode, notify)
+    if checkpointer:
+        register_run(run_id, mode, user_email, notify)
+    
+    initial_state = build_initial_state(contract_text, user_email, mode, quick_look, run_id, summary_style, owner)
     
-    initial_state = {
+    # Run the graph
+    return _invoke_and_record(graph, initial_state, run_id, checkpointer)
+
+def build_initial_state(contract_text: str, user_email: str, mode: str = "legal",
+                        quick_look: dict = None, run_id: str = None, summary_style: str = None,
+                        owner: str = None) -> dict:
+    """Graph input for a new run"""
+    from src.graph.sections import segment_contract
+    
+    return {
+        "run_id": run_id,
         "contract_text": contract_text,
+        "contract_sections": segment_contract(contract_text),
         "user_email": user_email,
         "mode": mode,
+        "summary_style": summary_style,
+        "quick_look": quick_look,
+        "owner": owner,
         "company_name": None,
         "company_extraction_method": None,
         "parsed_contract": None,
+        "risk_preflags": None,
         "risk_analysis": None,
         "research_results": None,
         "deliverables": None,
+        "pipelined": None,
         "summary_file": None,
+        "summary_markdown": None,
         "calendar_file": None,
         "notification_results": None,
+        "timings": None,
+        "usage": None,
         "error": None
     }
+
+def resume_legal_analysis(run_id: str, from_node: str = None) -> dict:
+    """
+    Resume a failed or interrupted run from its last successful node
     
-    # Run the graph
-    final_state = graph.invoke(initial_state)
+    Args:
+        run_id: Id of the run to resume
+        from_node: Re-run starting at this node instead of the detected failure point
+        
+    Returns:
+        Final state with results or errors
+    """
+    from src.graph.llm import current_user
+    from src.graph.checkpoints import get_checkpointer, get_run, find_resume_config
+    from src.graph.policies import start_run_deadline
+    from src.graph.usage import start_run_usage
+    
+    checkpointer = get_checkpointer()
+    run = get_run(run_id) if checkpointer else None
+    if not run:
+        raise ValueError(f"Unknown run: {run_id}")
+    
+    start_run_deadline()
+    graph = get_legal_graph(run["mode"], run["notify"])
+    config = {"configurable": {"thread_id": run_id}}
+    resume_config = find_resume_config(graph, config, from_node)
+    if resume_config is None:
+        print(f"✅ Run {run_id} already completed - nothing to resume")
+        return graph.get_state(config).values
+    
+    # Keep counting from what the earlier attempts already spent, for whoever started the run
+    values = graph.get_state(config).values
+    account = values.get("owner") or run["user_email"]
+    current_user.set(account)
+    start_run_usage(run_id, account, values.get("usage"))
+    print(f"🔁 Resuming run {run_id} from checkpoint {resume_config['configurable'].get('checkpoint_id')}")
+    return _invoke_and_record(graph, None, run_id, checkpointer, resume_config)
+
+def _invoke_and_record(graph, graph_input, run_id: str, checkpointer, config: dict = None) -> dict:
+    """Invoke the graph, record the run's final status and save it to the history store"""
+    from src.graph.checkpoints import mark_run, run_status
+    from src.graph.history import save_analysis
+    from src.graph.usage import run_usage
+    
+    config = config or {"configurable": {"thread_id": run_id}}
+    ledger = run_usage.get()
+    try:
+        final_state = graph.invoke(graph_input, config if checkpointer else None)
+    except Exception as e:
+        if checkpointer:
+            mark_run(run_id, "failed", str(e), ledger.snapshot() if ledger else None)
+        raise
+    
+    if ledger:
+        # Includes calls that finished after the last node's snapshot (pipelined work)
+        final_state = {**final_state, "usage": ledger.snapshot()}
+        total = final_state["usage"]["total"]
+        print(f"🧾 Run {run_id}: {total['total_tokens']} tokens, ${total['cost_usd']:.4f}")
+    status, error = run_status(final_state)
+    if checkpointer:
+        mark_run(run_id, status, error, final_state.get("usage"))
+    # Keep every analysis that got as far as a summary (even if the email failed)
+    if final_state.get("summary_markdown"):
+        try:
+            save_analysis(final_state, status)
+        except Exception as e:
+            print(f"Could not save analysis to history: {e}")
     return final_state
\ No newline at end of file
@@ -0,0 +1,241 @@
+"""
+Shared LLM call path - every node's LLM call goes through invoke_llm
+Draws from the shared rate limiter, backs off when the provider returns 429 and
+retries transient failures per the calling node's policy
+"""
+import contextvars
+import os
+import random
+import threading
+import time
+
+from src.graph.hedging import hedged_invoke, should_hedge
+from src.graph.policies import call_external, check_cancelled, get_policy, time_remaining
+from src.graph.prompts import prefix_cache_key
+from src.graph.rate_limiter import get_rate_limiter
+from src.graph.shared_cache import cache_key, get_cache
+from src.graph.usage import record_llm_usage
+
+# User the current analysis runs for (set by run_legal_analysis), used for fair queuing
+current_user = contextvars.ContextVar("current_user", default=None)
+
+MAX_RATE_LIMIT_RETRIES = int(os.getenv("LLM_429_RETRIES", "4"))
+# Rough completion size reserved up front, corrected once usage is known
+OUTPUT_TOKEN_ESTIMATE = int(os.getenv("LLM_OUTPUT_TOKEN_ESTIMATE", "1500"))
+MIN_REQUEST_TIMEOUT = 5.0
+# Send prompt_cache_key so calls sharing the contract prefix hit the same provider cache
+PROMPT_CACHE_KEY_ENABLED = os.getenv("LLM_PROMPT_CACHE_KEY", "1") == "1"
+# Reuse responses to identical prompts (same model, same messages) for this long (opt-in)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "0") == "1"
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(24 * 3600)))
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_llm(model: str = "gpt-5-mini"):
+    """Shared chat model client per model name (created on first use)"""
+    with _models_lock:
+        if model not in _models:
+            from langchain_openai import ChatOpenAI
+            _models[model] = ChatOpenAI(model=model, temperature=0, api_key=os.getenv("OPENAI_API_KEY"))
+        return _models[model]
+
+
+def estimate_tokens(messages: list) -> int:
+    """Cheap prompt size estimate (~4 characters per token)"""
+    return sum(len(str(getattr(m, "content", m))) for m in messages) // 4 + 10 * len(messages)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def retry_after_seconds(error: Exception, attempt: int) -> float:
+    """Provider's Retry-After if present, otherwise jittered exponential backoff"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return min(60.0, 2 ** attempt) * (0.5 + random.random())
+
+
+def usage_tokens(response) -> int:
+    usage = getattr(response, "usage_metadata", None) or {}
+    return usage.get("total_tokens") or 0
+
+
+_cache_stats = {}
+_cache_lock = threading.Lock()
+
+
+def record_cache_usage(node: str, response):
+    """Log and accumulate how many prompt tokens the provider served from its cache"""
+    usage = getattr(response, "usage_metadata", None) or {}
+    input_tokens = usage.get("input_tokens") or 0
+    if not input_tokens:
+        return
+    cached = (usage.get("input_token_details") or {}).get("cache_read") or 0
+    with _cache_lock:
+        stats = _cache_stats.setdefault(node, {"calls": 0, "input_tokens": 0, "cached_tokens": 0})
+        stats["calls"] += 1
+        stats["input_tokens"] += input_tokens
+        stats["cached_tokens"] += cached
+    print(f"🧊 {node}: {cached}/{input_tokens} prompt tokens cached ({cached / input_tokens:.0%})")
+
+
+def prompt_cache_metrics() -> dict:
+    """Per-node prompt cache hit rate for this process"""
+    with _cache_lock:
+        return {
+            node: {**stats, "hit_rate": round(stats["cached_tokens"] / stats["input_tokens"], 3)}
+            for node, stats in _cache_stats.items()
+        }
+
+
+def model_name(llm) -> str:
+    return getattr(llm, "model_name", None) or getattr(llm, "model", None) or type(llm).__name__
+
+
+def response_cache_key(llm, messages: list):
+    if not LLM_CACHE_ENABLED:
+        return None
+    return cache_key("llm", model_name(llm), [(getattr(m, "type", ""), getattr(m, "content", str(m))) for m in messages])
+
+
+def cached_response(key: str, node: str):
+    """A stored response for this exact prompt (no usage: nothing was spent)"""
+    if not key:
+        return None
+    hit = get_cache().get(key)
+    if hit is None:
+        return None
+    from langchain_core.messages import AIMessage
+    print(f"♻️ {node}: reusing cached LLM response")
+    return AIMessage(content=hit["content"], response_metadata={**hit.get("response_metadata", {}), "cache_hit": True})
+
+
+def store_response(key: str, response):
+    if key and isinstance(getattr(response, "content", None), str):
+        metadata = {"model_name": (getattr(response, "response_metadata", None) or {}).get("model_name")}
+        get_cache().set(key, {"content": response.content, "response_metadata": metadata}, LLM_CACHE_TTL)
+
+
+def invoke_llm(llm, messages: list, node: str, user: str = None):
+    """
+    Call llm.invoke(messages) under the shared rate limit, with the calling
+    node's retry policy and the OpenAI circuit breaker (hedged for slow
+    nodes when LLM_HEDGING=1)
+
+    Args:
+        llm: Chat model to call
+        messages: LangChain messages
+        node: Name of the calling node (for logs)
+        user: User to charge for fair queuing (defaults to the current run's user)
+    """
+    limiter = get_rate_limiter()
+    user = user or current_user.get() or "anonymous"
+    estimate = estimate_tokens(messages) + OUTPUT_TOKEN_ESTIMATE
+    policy = get_policy(node)
+    cache_key = prefix_cache_key(messages) if PROMPT_CACHE_KEY_ENABLED else None
+    response_key = response_cache_key(llm, messages)
+    cached = cached_response(response_key, node)
+    if cached is not None:
+        record_llm_usage(node, model_name(llm), cached, user)
+        return cached
+
+    def call():
+        if limiter:
+            waited = limiter.acquire(user, estimate)
+            if waited > 1:
+                print(f"⏳ {node}: waited {waited:.1f}s for LLM capacity")
+        # The node may have been abandoned while this call waited for capacity
+        check_cancelled()
+        # Don't let a single request outlive the node's deadline
+        kwargs = {}
+        remaining = time_remaining()
+        if remaining is not None:
+            kwargs["timeout"] = max(MIN_REQUEST_TIMEOUT, remaining)
+        if cache_key:
+            kwargs["prompt_cache_key"] = cache_key
+        if should_hedge(node):
+            acquire = (lambda: limiter.acquire(user, estimate)) if limiter else None
+            return hedged_invoke(llm, messages, node, acquire=acquire, **kwargs)
+        return llm.invoke(messages, **kwargs)
+
+    for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+        try:
+            response = call_external(
+                "openai", call, retries=policy.retries, backoff_base=policy.backoff_base
+            )
+        except Exception as e:
+            if not is_rate_limit_error(e) or attempt == MAX_RATE_LIMIT_RETRIES:
+                raise
+            delay = retry_after_seconds(e, attempt)
+            print(f"⚠️ {node}: rate limited by provider, backing off {delay:.1f}s")
+            if limiter:
+                # Everyone sharing the key pauses, not just this call
+                limiter.penalize(delay)
+            else:
+                time.sleep(delay)
+            continue
+
+        if limiter:
+            limiter.reconcile(estimate, usage_tokens(response))
+        record_cache_usage(node, response)
+        record_llm_usage(node, model_name(llm), response, user)
+        store_response(response_key, response)
+        return response
+
+
+def stream_llm(llm, messages: list, node: str, on_text, user: str = None):
+    """
+    Stream llm.stream(messages) under the shared rate limit, calling
+    on_text(chunk_text) as tokens arrive
+
+    Not retried: text already handed to on_text can't be taken back, so on
+    failure the caller falls back to a regular invoke_llm call.
+
+    Returns:
+        The aggregated message (content and usage metadata)
+    """
+    limiter = get_rate_limiter()
+    user = user or current_user.get() or "anonymous"
+    estimate = estimate_tokens(messages) + OUTPUT_TOKEN_ESTIMATE
+    cache_key = prefix_cache_key(messages) if PROMPT_CACHE_KEY_ENABLED else None
+    response_key = response_cache_key(llm, messages)
+    cached = cached_response(response_key, node)
+    if cached is not None:
+        record_llm_usage(node, model_name(llm), cached, user)
+        on_text(cached.content)
+        return cached
+
+    def call():
+        if limiter:
+            waited = limiter.acquire(user, estimate)
+            if waited > 1:
+                print(f"⏳ {node}: waited {waited:.1f}s for LLM capacity")
+        check_cancelled()
+        kwargs = {"stream_usage": True}
+        remaining = time_remaining()
+        if remaining is not None:
+            kwargs["timeout"] = max(MIN_REQUEST_TIMEOUT, remaining)
+        if cache_key:
+            kwargs["prompt_cache_key"] = cache_key
+        full = None
+        for chunk in llm.stream(messages, **kwargs):
+            if chunk.content:
+                on_text(chunk.content if isinstance(chunk.content, str) else str(chunk.content))
+            full = chunk if full is None else full + chunk
+        if full is None:
+            raise ValueError("empty stream")
+        return full
+
+    response = call_external("openai", call, retries=0)
+    if limiter:
+        limiter.reconcile(estimate, usage_tokens(response))
+    record_cache_usage(node, response)
+    record_llm_usage(node, model_name(llm), response, user)
+    store_response(response_key, response)
+    return response
@@ -1,13 +1,15 @@
 """
 Risk analysis node - evaluates legal and business risks
 """
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import SystemMessage, HumanMessage
+from src.graph.prompts import build_messages
+from src.graph.cascade import invoke_cascade
 import os
 import json
 import re
+from src.graph.risk_rules import prescreen, flags_to_risks, highest_level
 
-llm = ChatOpenAI(model="gpt-5-mini", temperature=0, api_key=os.getenv("OPENAI_API_KEY"))
+# Match clauses against previously rated ones (set CLAUSE_INDEX_ENABLED=0 to disable)
+CLAUSE_INDEX_ENABLED = os.getenv("CLAUSE_INDEX_ENABLED", "1") == "1"
 
 def analyze_risks_node(state: dict) -> dict:
     """
@@ -19,8 +21,157 @@ def analyze_risks_node(state: dict) -> dict:
     if not parsed_contract:
         return {**state, "risk_analysis": {"error": "No parsed contract available"}}
     
+    # Clauses we've already rated in earlier runs are flagged without asking the LLM again
+    clauses = parsed_contract.get("clauses") or []
+    new_clauses, known_risks, known_clause_flags = split_known_clauses(clauses)
+    
+    # Rule-based pre-screen for obvious risky language (single regex pass, no LLM)
+    risk_preflags = state.get("risk_preflags")
+    if risk_preflags is None:
+        risk_preflags = prescreen(state.get("contract_text", ""))
+    rule_risks = flags_to_risks(risk_preflags)
+    if rule_risks:
+        print(f"🚩 Rules pre-flagged {len(rule_risks)} risks: {[r['category'] for r in rule_risks]}")
+    
+    # Risks were already analyzed batch by batch while the contract was being parsed
+    pipelined = state.get("risk_analysis")
+    if "analyze_risks" in (state.get("pipelined") or []) and isinstance(pipelined, dict):
+        print(f"⏩ Using {len(pipelined.get('risks') or [])} risks analyzed while parsing")
+        risk_data = merge_rule_risks(pipelined, rule_risks)
+        if known_clause_flags:
+            risk_data["known_clause_flags"] = known_clause_flags
+        remember_rated_clauses(parsed_contract, risk_data, state.get("company_name"))
+        return {
+            **state,
+            "risk_preflags": risk_preflags,
+            "risk_analysis": risk_data
+        }
+    
+    if clauses and not new_clauses:
+        print("🗂️ Every clause matches known risky boilerplate - no LLM call needed")
+        risk_data = merge_rule_risks(known_only_analysis(known_risks), rule_risks)
+        risk_data["known_clause_flags"] = known_clause_flags
+        return {
+            **state,
+            "risk_preflags": risk_preflags,
+            "risk_analysis": risk_data
+        }
+    
+    system_prompt = risk_system_prompt(mode)
+    
+    prompt_contract = {**parsed_contract, "clauses": new_clauses} if known_clause_flags else parsed_contract
+    user_content = f"Parsed contract data:\n\n{json.dumps(prompt_contract, separators=(',', ':'))}"
+    if rule_risks:
+        system_prompt += PREFLAG_INSTRUCTIONS
+        user_content += "\n\nAlready detected by rules:\n" + format_rule_risks(rule_risks)
+    
+    messages = build_messages(state.get("contract_text") or "", system_prompt, user_content)
+    
+    try:
+        response = invoke_cascade(
+            messages, node="analyze_risks", validate=validate_risk_analysis,
+            contract_chars=len(state.get("contract_text") or "")
+        )
+        content = response.content
+        
+        # Try multiple JSON extraction methods
+        risk_data = extract_json_safely(content)
+        
+        if risk_data:
+            print(f"Risks Analyzed! \n{risk_data}")
+            if isinstance(risk_data, dict):
+                risk_data = merge_rule_risks(add_known_risks(risk_data, known_risks), rule_risks)
+                if known_clause_flags:
+                    risk_data["known_clause_flags"] = known_clause_flags
+                remember_rated_clauses(parsed_contract, risk_data, state.get("company_name"))
+            return {
+                **state,
+                "risk_preflags": risk_preflags,
+                "risk_analysis": risk_data
+            }
+        else:
+            # Fallback: create basic risk structure from text
+            print("Could not parse JSON, creating basic risk analysis")
+            return {
+                **state,
+                "risk_preflags": risk_preflags,
+                "risk_analysis": {
+                    "risks": rule_risks + known_risks + [{
+                        "category": "General Analysis",
+                        "level": "Medium",
+                        "reason": "Analysis completed but JSON parsing failed. See summary for details.",
+                        "raw_analysis": content[:500]  # Include first 500 chars
+                    }],
+                    "overall_risk_score": highest_level(["Medium"] + [r["level"] for r in rule_risks + known_risks]),
+                    "parsing_note": "Risk analysis text available but not fully structured",
+                    "known_clause_flags": known_clause_flags
+                }
+            }
+            
+    except Exception as e:
+        print(f"Error analyzing risks: {e}")
+        return {
+            **state,
+            "risk_preflags": risk_preflags,
+            "risk_analysis": {
+                "error": f"Risk analysis failed: {str(e)}",
+                "risks": rule_risks + known_risks,
+                "overall_risk_score": highest_level([r["level"] for r in rule_risks + known_risks]) or "Unknown",
+                "known_clause_flags": known_clause_flags
+            }
+        }
+
+def split_known_clauses(clauses: list) -> tuple:
+    """
+    Separate clauses matching previously rated risky boilerplate (clause index)
+    Returns (clauses the LLM still has to rate, risks replayed for the known
+    clauses, the index's match flags)
+    """
+    if not CLAUSE_INDEX_ENABLED or not clauses:
+        return clauses, [], []
+    try:
+        from src.graph.clause_index import match_known_clauses
+        flags = match_known_clauses(clauses)
+    except Exception as e:
+        print(f"Clause index lookup skipped: {e}")
+        return clauses, [], []
+    if not flags:
+        return clauses, [], []
+    print(f"🗂️ {len(flags)} clauses match known risky boilerplate")
+    known = {flag["index"] for flag in flags}
+    risks = [{
+        "category": flag.get("category") or "Known Clause",
+        "level": flag["level"],
+        "reason": flag.get("reason") or "Matches a clause rated in an earlier contract",
+        "source": "clause_index",
+        "clause": flag["clause"],
+        "similarity": flag["similarity"],
+    } for flag in flags]
+    return [c for i, c in enumerate(clauses) if i not in known], risks, flags
+
+def known_only_analysis(known_risks: list) -> dict:
+    """Risk analysis built from the clause index alone"""
+    return {
+        "risks": known_risks,
+        "overall_risk_score": highest_level([r["level"] for r in known_risks]) or "Low"
+    }
+
+def add_known_risks(risk_data: dict, known_risks: list) -> dict:
+    """Put the clause index's risks next to the LLM's; the overall score covers both"""
+    if not known_risks:
+        return risk_data
+    return {
+        **risk_data,
+        "risks": known_risks + (risk_data.get("risks") or []),
+        "overall_risk_score": highest_level(
+            [risk_data.get("overall_risk_score")] + [r["level"] for r in known_risks]
+        ) or risk_data.get("overall_risk_score")
+    }
+
+def risk_system_prompt(mode: str) -> str:
+    """Risk analyst instructions for the mode"""
     if mode == "creator":
-        system_prompt = """You are a contract risk analyst specializing in influencer/brand deals.
+        return """You are a contract risk analyst specializing in influencer/brand deals.
 
 Analyze the contract for these specific risks:
 - **Content Ownership**: Does the brand get perpetual or exclusive rights?
@@ -43,13 +194,14 @@ Format:
       "category": "Content Ownership",
       "level": "High",
       "reason": "Brand gets perpetual rights",
-      "recommendation": "Negotiate time-limited rights"
+      "recommendation": "Negotiate time-limited rights",
+      "clause": "the sentence of the contract this risk comes from, quoted exactly"
     }
   ],
   "overall_risk_score": "Medium"
 }"""
     else:
-        system_prompt = """You are a legal risk analyst.
+        return """You are a legal risk analyst.
 
 Analyze the contract for:
 - Unfair liability or indemnification clauses
@@ -65,57 +217,93 @@ Format:
     {
       "category": "string",
       "level": "Low|Medium|High",
-      "reason": "string"
+      "reason": "string",
+      "clause": "the sentence of the contract this risk comes from, quoted exactly"
     }
   ],
   "overall_risk_score": "Low|Medium|High"
 }"""
+
+def analyze_clause_batch(state: dict, clauses: list, rule_risks: list = None):
+    """
+    Risk-analyze one batch of clauses (used while the parse is still streaming)
+    Returns the risk dict, or None if the response couldn't be parsed
+    """
+    clauses, known_risks, _ = split_known_clauses(clauses)
+    if not clauses:
+        return known_only_analysis(known_risks)
+    system_prompt = risk_system_prompt(state["mode"])
+    user_content = f"Parsed contract data (some of the clauses):\n\n{json.dumps({'clauses': clauses}, separators=(',', ':'))}"
+    if rule_risks:
+        system_prompt += PREFLAG_INSTRUCTIONS
+        user_content += "\n\nAlready detected by rules:\n" + format_rule_risks(rule_risks)
     
-    messages = [
-        SystemMessage(content=system_prompt),
-        HumanMessage(content=f"Parsed contract data:\n\n{json.dumps(parsed_contract, indent=2)}")
-    ]
-    
+    messages = build_messages(state.get("contract_text") or "", system_prompt, user_content)
+    response = invoke_cascade(
+        messages, node="analyze_risks", validate=validate_risk_analysis,
+        contract_chars=len(state.get("contract_text") or "")
+    )
+    risk_data = extract_json_safely(response.content)
+    return add_known_risks(risk_data, known_risks) if isinstance(risk_data, dict) else None
+
+def validate_risk_analysis(content: str) -> tuple:
+    """Cascade validator - escalate unless risks and an overall score came back"""
+    risk_data = extract_json_safely(content)
+    if not isinstance(risk_data, dict):
+        return False, "invalid JSON"
+    if not isinstance(risk_data.get("risks"), list):
+        return False, "missing risks"
+    if risk_data.get("overall_risk_score") not in ("Low", "Medium", "High"):
+        return False, "missing overall risk score"
+    return True, None
+
+PREFLAG_INSTRUCTIONS = """
+
+Some risks were already detected by automated rules and are listed after the contract data.
+Do NOT repeat them. Only return additional risks, or a rule-detected category again if the
+contract context makes it MORE severe than the level shown."""
+
+def format_rule_risks(rule_risks: list) -> str:
+    """Compact one-line-per-risk listing of rule hits for the prompt"""
+    return "\n".join(
+        f"- [{r['level']}] {r['category']}: {r['reason']} ({len(r['offsets'])} occurrence(s))"
+        for r in rule_risks
+    )
+
+def merge_rule_risks(risk_data: dict, rule_risks: list) -> dict:
+    """
+    Combine rule-detected risks with the LLM's risks
+    The overall score is never lower than the most severe rule hit
+    """
+    if not rule_risks:
+        return risk_data
+    llm_risks = risk_data.get("risks") or []
+    overall = highest_level(
+        [risk_data.get("overall_risk_score")] + [r["level"] for r in rule_risks]
+    )
+    return {
+        **risk_data,
+        "risks": rule_risks + llm_risks,
+        "overall_risk_score": overall or risk_data.get("overall_risk_score")
+    }
+
+def remember_rated_clauses(parsed_contract: dict, risk_data: dict, company_name: str = None):
+    """
+    Store this contract's clauses with their LLM risk ratings in the clause index
+    so later contracts can be matched against them
+    """
+    if not CLAUSE_INDEX_ENABLED:
+        return
     try:
-        response = llm.invoke(messages)
-        content = response.content
-        
-        # Try multiple JSON extraction methods
-        risk_data = extract_json_safely(content)
-        
-        if risk_data:
-            print(f"Risks Analyzed! \n{risk_data}")
-            return {
-                **state,
-                "risk_analysis": risk_data
-            }
-        else:
-            # Fallback: create basic risk structure from text
-            print("Could not parse JSON, creating basic risk analysis")
-            return {
-                **state,
-                "risk_analysis": {
-                    "risks": [{
-                        "category": "General Analysis",
-                        "level": "Medium",
-                        "reason": "Analysis completed but JSON parsing failed. See summary for details.",
-                        "raw_analysis": content[:500]  # Include first 500 chars
-                    }],
-                    "overall_risk_score": "Medium",
-                    "parsing_note": "Risk analysis text available but not fully structured"
-                }
-            }
-            
+        from src.graph.clause_index import record_rated_clauses
+        added = record_rated_clauses(
+            parsed_contract.get("clauses", []),
+            risk_data.get("risks", []),
+            company_name
+        )
+        print(f"🗂️ Added {added} new clauses to the clause index")
     except Exception as e:
-        print(f"Error analyzing risks: {e}")
-        return {
-            **state,
-            "risk_analysis": {
-                "error": f"Risk analysis failed: {str(e)}",
-                "risks": [],
-                "overall_risk_score": "Unknown"
-            }
-        }
+        print(f"Could not update clause index: {e}")
 
 def extract_json_safely(content: str) -> dict:
     """
@@ -0,0 +1,147 @@
+"""
+Express analysis node - company, clauses, risks and unclear terms in one LLM call
+Replaces extract_company -> parse_contract -> analyze_risks -> research_terms
+for short contracts, so the whole run is two round trips (this + summary).
+"""
+from src.graph.prompts import build_messages
+from src.graph.cascade import invoke_cascade
+from src.graph.risk_rules import prescreen, flags_to_risks, highest_level
+from src.graph.nodes.analyze_risk import (
+    PREFLAG_INSTRUCTIONS, extract_json_safely, format_rule_risks, merge_rule_risks, remember_rated_clauses
+)
+from src.graph.nodes.extract_company import regex_extract_company
+
+SYSTEM_PROMPT = """You are an expert legal contract analyst. In ONE pass over the contract:
+
+1. Identify the PRIMARY company or brand (the party offering the agreement, not the individual/creator)
+2. Extract and categorize the key clauses: parties, obligations, payment terms, termination,
+   liability and indemnification, intellectual property, confidentiality, unusual clauses
+3. Assess the risks: unfair liability or indemnification, ambiguous terms, unusual provisions,
+   imbalanced obligations. Rate each Low, Medium or High
+4. Pick up to 5 legal terms in THIS contract a non-lawyer may not understand and explain each
+   in one plain-language sentence
+
+CRITICAL: Return ONLY valid JSON with no additional text.
+Use double quotes for all strings, no trailing commas, proper escaping.
+
+Format:
+{
+  "company_name": "The Company Name or null",
+  "confidence": "high|medium|low|none",
+  "parties": [],
+  "obligations": [],
+  "payment_terms": {},
+  "clauses": [],
+  "risks": [
+    {
+      "category": "string",
+      "level": "Low|Medium|High",
+      "reason": "string",
+      "recommendation": "string",
+      "clause": "the sentence of the contract this risk comes from, quoted exactly"
+    }
+  ],
+  "overall_risk_score": "Low|Medium|High",
+  "unclear_terms": [
+    {"term": "short phrase", "explanation": "one sentence"}
+  ]
+}
+
+Do NOT fabricate information. If something is not in the contract, omit it or use null."""
+
+PARSED_KEYS = ["parties", "obligations", "payment_terms", "clauses"]
+
+
+def express_analysis_node(state: dict) -> dict:
+    """
+    Extract company, parse clauses, analyze risks and explain unclear terms
+    with a single structured LLM call
+    """
+    contract_text = state["contract_text"]
+    quick = state.get("quick_look") or {}
+
+    # Rule-based pre-screen runs first so the LLM only adds to it (no LLM call)
+    risk_preflags = state.get("risk_preflags")
+    if risk_preflags is None:
+        risk_preflags = prescreen(contract_text)
+    rule_risks = flags_to_risks(risk_preflags)
+
+    system_prompt = SYSTEM_PROMPT
+    rules_input = None
+    if rule_risks:
+        system_prompt += PREFLAG_INSTRUCTIONS
+        rules_input = "Already detected by rules:\n" + format_rule_risks(rule_risks)
+
+    messages = build_messages(contract_text, system_prompt, rules_input)
+
+    try:
+        response = invoke_cascade(
+            messages, node="express_analysis", validate=validate_express_result,
+            contract_chars=len(contract_text)
+        )
+        result = extract_json_safely(response.content)
+        if not isinstance(result, dict):
+            raise ValueError("Express analysis returned no JSON object")
+    except Exception as e:
+        print(f"Error in express analysis: {e}")
+        company_name = quick.get("company_name") or regex_extract_company(contract_text)
+        return {
+            **state,
+            "company_name": company_name or "Unknown Company",
+            "company_extraction_method": "regex_fallback",
+            "risk_preflags": risk_preflags,
+            "error": f"Express analysis failed: {str(e)}",
+            "parsed_contract": {"error": str(e)}
+        }
+
+    company_name = result.get("company_name")
+    method = "llm"
+    if not company_name or result.get("confidence") in ("low", "none"):
+        company_name = quick.get("company_name") or regex_extract_company(contract_text) or company_name
+        method = "regex"
+    print(f"🏢 Express analysis company: {company_name} ({method})")
+
+    parsed_contract = {key: result.get(key) for key in PARSED_KEYS if result.get(key) is not None}
+    risk_analysis = merge_rule_risks({
+        "risks": result.get("risks") or [],
+        "overall_risk_score": result.get("overall_risk_score")
+            or highest_level([r["level"] for r in rule_risks]) or "Unknown"
+    }, rule_risks)
+    remember_rated_clauses(parsed_contract, risk_analysis, company_name)
+
+    terms = {}
+    for item in result.get("unclear_terms") or []:
+        if isinstance(item, dict) and item.get("term") and item.get("explanation"):
+            terms[str(item["term"]).strip()] = str(item["explanation"]).strip()
+
+    print(f"⚡ Express analysis: {len(parsed_contract.get('clauses') or [])} clauses, "
+          f"{len(risk_analysis['risks'])} risks, {len(terms)} terms explained")
+
+    return {
+        **state,
+        "company_name": company_name or "Unknown Company",
+        "company_extraction_method": method,
+        "parsed_contract": parsed_contract,
+        "risk_preflags": risk_preflags,
+        "risk_analysis": risk_analysis,
+        "research_results": {
+            "searched": False,
+            "explained": bool(terms),
+            "terms": terms,
+            "message": "Terms explained without web search (express mode)"
+        }
+    }
+
+
+def validate_express_result(content: str) -> tuple:
+    """Cascade validator - escalate on unparseable JSON, no clauses or no risk score"""
+    result = extract_json_safely(content)
+    if not isinstance(result, dict):
+        return False, "invalid JSON"
+    if not result.get("clauses"):
+        return False, "no clauses extracted"
+    if not isinstance(result.get("risks"), list):
+        return False, "missing risks"
+    if result.get("overall_risk_score") not in ("Low", "Medium", "High"):
+        return False, "missing overall risk score"
+    return True, None
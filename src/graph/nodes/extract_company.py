@@ -1,22 +1,21 @@
 """
 Company name extraction node - extracts primary company/brand name
 """
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import SystemMessage, HumanMessage
-import os
+from src.graph.prompts import build_messages
+from src.graph.cascade import invoke_cascade
+from src.graph.sections import relevant_text
 import json
 import re
 from dotenv import load_dotenv
 load_dotenv()
 
-llm = ChatOpenAI(model="gpt-5-mini", temperature=0, api_key=os.getenv("OPENAI_API_KEY"))
-
 def extract_company_node(state: dict) -> dict:
     """
     Extract the primary company/brand name from the contract
     Falls back to regex extraction if LLM fails
     """
     contract_text = state["contract_text"]
+    quick = state.get("quick_look") or {}
     
     system_prompt = """You are an expert at identifying company and brand names in legal contracts.
 
@@ -41,22 +40,16 @@ If you cannot find a company name, return:
 
 Do NOT return the creator's name, individual names, or generic terms like "The Influencer"."""
     
-    messages = [
-        SystemMessage(content=system_prompt),
-        HumanMessage(content=f"Contract text (first 3000 chars):\n\n{contract_text[:3000]}")
-    ]
+    # The parties are named in the preamble and the signature block
+    excerpt = relevant_text(state, "extract_company")
+    messages = build_messages(excerpt, system_prompt)
     
     try:
-        response = llm.invoke(messages)
-        content = response.content
-        
-        # Extract JSON
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0].strip()
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0].strip()
-        
-        result = json.loads(content)
+        response = invoke_cascade(
+            messages, node="extract_company", validate=validate_company_result,
+            contract_chars=len(excerpt)
+        )
+        result = json.loads(strip_code_fence(response.content))
         company_name = result.get("company_name")
         confidence = result.get("confidence", "unknown")
         
@@ -64,7 +57,7 @@ Do NOT return the creator's name, individual names, or generic terms like "The I
         
         # If LLM failed or low confidence, try regex fallback
         if not company_name or confidence == "low" or confidence == "none":
-            company_name = regex_extract_company(contract_text)
+            company_name = quick.get("company_name") or regex_extract_company(contract_text)
             if company_name:
                 print(f"🏢 Regex fallback found: {company_name}")
         
@@ -76,14 +69,34 @@ Do NOT return the creator's name, individual names, or generic terms like "The I
         
     except Exception as e:
         print(f"Error extracting company name with LLM: {e}")
-        # Fallback to regex
-        company_name = regex_extract_company(contract_text)
+        # Fallback to regex (already computed by the quick look at upload)
+        company_name = quick.get("company_name") or regex_extract_company(contract_text)
         return {
             **state,
             "company_name": company_name or "Unknown Company",
             "company_extraction_method": "regex_fallback"
         }
 
+def strip_code_fence(content: str) -> str:
+    """Pull the JSON out of a ```json fenced block if present"""
+    if "```json" in content:
+        return content.split("```json")[1].split("```")[0].strip()
+    if "```" in content:
+        return content.split("```")[1].split("```")[0].strip()
+    return content
+
+def validate_company_result(content: str) -> tuple:
+    """Cascade validator - escalate unless a company was found with some confidence"""
+    try:
+        result = json.loads(strip_code_fence(content))
+    except json.JSONDecodeError:
+        return False, "invalid JSON"
+    if not isinstance(result, dict) or not result.get("company_name"):
+        return False, "no company name"
+    if result.get("confidence") in ("low", "none"):
+        return False, f"{result.get('confidence')} confidence"
+    return True, None
+
 def regex_extract_company(contract_text: str) -> str:
     """
     Fallback regex-based company name extraction
@@ -1,13 +1,13 @@
 """
 Deliverables extraction node - formats deliverables for calendar
 """
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import SystemMessage, HumanMessage
-import os
+from src.graph.prompts import build_messages
+from src.graph.cascade import invoke_cascade
 import json
 import re
-
-llm = ChatOpenAI(model="gpt-5-mini", temperature=0, api_key=os.getenv("OPENAI_API_KEY"))
+from src.graph.date_extraction import extract_date_candidates
+from src.graph.run_files import run_file
+from src.graph.sections import relevant_text
 
 def extract_deliverables_node(state: dict) -> dict:
     """
@@ -19,6 +19,26 @@ def extract_deliverables_node(state: dict) -> dict:
     if not parsed_contract:
         return {**state, "deliverables": []}
     
+    # Already labeled while the parse was streaming
+    if "extract_deliverables" in (state.get("pipelined") or []):
+        if state.get("deliverables"):
+            print(f"⏩ Using {len(state['deliverables'])} deliverables extracted while parsing")
+            return state
+        print("📆 No deliverables among the date candidates, extracting with the LLM")
+    else:
+        # Find dated obligations deterministically; the LLM only has to label them
+        candidates = [
+            c for c in extract_date_candidates(state.get("contract_text", ""))
+            if not c["is_effective_date"]
+        ]
+        if candidates:
+            print(f"📆 Found {len(candidates)} date candidates in contract text")
+            labeled = label_date_candidates(state, candidates)
+            if labeled.get("deliverables"):
+                return labeled
+            # Labeling failed, or the deadlines hang off events the extractor can't date
+            print("📆 No deliverables among the date candidates, extracting with the LLM")
+    
     system_prompt = """You are extracting deliverables for calendar scheduling.
 
 For each deliverable with a due date, provide:
@@ -52,13 +72,18 @@ Format:
   }
 ]"""
     
-    messages = [
-        SystemMessage(content=system_prompt),
-        HumanMessage(content=f"User email: {user_email}\n\nParsed contract:\n{json.dumps(parsed_contract, indent=2)}")
-    ]
+    # Scope of work, term and exhibits rather than the whole contract
+    excerpt = relevant_text(state, "extract_deliverables")
+    messages = build_messages(
+        excerpt, system_prompt,
+        f"User email: {user_email}\n\nParsed contract:\n{json.dumps(parsed_contract, indent=2)}"
+    )
     
     try:
-        response = llm.invoke(messages)
+        response = invoke_cascade(
+            messages, node="extract_deliverables", validate=validate_deliverables,
+            contract_chars=len(excerpt)
+        )
         content = response.content
         
         # Use robust JSON extraction
@@ -74,13 +99,14 @@ Format:
         # Save to file for calendar integration
         if deliverables:
             print(f"Deliverables Extracted! \n {deliverables}")
-            with open("calendar_deliverables.json", "w") as f:
+            calendar_file = run_file(state, "calendar_deliverables.json")
+            with open(calendar_file, "w") as f:
                 json.dump(deliverables, f, indent=2)
         
         return {
             **state,
             "deliverables": deliverables,
-            "calendar_file": "calendar_deliverables.json" if deliverables else None
+            "calendar_file": calendar_file if deliverables else None
         }
         
     except Exception as e:
@@ -91,6 +117,111 @@ Format:
             "calendar_file": None
         }
 
+def label_date_candidates(state: dict, candidates: list) -> dict:
+    """
+    Ask the LLM which date candidates are deliverable deadlines and what to call them
+    Dates, times and timezones come from the candidates, not from the LLM
+    """
+    parsed_contract = state.get("parsed_contract") or {}
+    user_email = state["user_email"]
+    company_name = state.get("company_name") or "the brand"
+    
+    system_prompt = """You are labeling deadline candidates for calendar scheduling.
+
+Each candidate has an id and the contract sentence it came from.
+Return one entry for each candidate that is a DELIVERABLE due date
+(content to create, submit, post or go live). Skip effective dates,
+payment dates, term/expiry dates and anything that isn't a deliverable.
+
+For each deliverable provide:
+- candidate_id: The id of the candidate (e.g. "D2")
+- summary: Brief title with company name included (e.g., "Instagram Reel Due for Company")
+- description: What needs to be delivered
+
+CRITICAL: Return ONLY valid JSON array. No markdown, no explanations.
+Use double quotes for all strings. No trailing commas.
+
+Format:
+[
+  {
+    "candidate_id": "D2",
+    "summary": "Instagram Reel Due for Company",
+    "description": "Create 30-second reel"
+  }
+]"""
+    
+    # Candidate ids with their sentences (the contract sections are in the shared prefix)
+    lines = []
+    seen_snippets = set()
+    for c in candidates:
+        snippet = c["snippet"] if c["snippet"] not in seen_snippets else "(same sentence as above)"
+        seen_snippets.add(c["snippet"])
+        lines.append(f"{c['id']} [{c['phrase']}]: {snippet}")
+    
+    listed = parsed_contract.get("deliverables") or []
+    excerpt = relevant_text(state, "extract_deliverables")
+    messages = build_messages(
+        excerpt, system_prompt,
+        f"Company: {company_name}\n\n"
+        f"Deliverables listed in the contract:\n{json.dumps(listed, separators=(',', ':'))}\n\n"
+        f"Date candidates:\n" + "\n".join(lines)
+    )
+    
+    try:
+        response = invoke_cascade(
+            messages, node="extract_deliverables", validate=validate_deliverables,
+            contract_chars=len(excerpt)
+        )
+        labels = extract_json_safely(response.content)
+        if isinstance(labels, dict):
+            labels = labels.get("deliverables", [])
+        if not isinstance(labels, list):
+            labels = []
+    except Exception as e:
+        print(f"Error labeling date candidates: {e}")
+        labels = []
+    
+    by_id = {c["id"]: c for c in candidates}
+    deliverables = []
+    for label in labels:
+        if not isinstance(label, dict):
+            continue
+        candidate = by_id.get(str(label.get("candidate_id", "")).strip())
+        if not candidate:
+            continue
+        deliverables.append({
+            "summary": label.get("summary") or f"Deliverable Due for {company_name}",
+            "description": label.get("description") or candidate["snippet"],
+            "start_date": candidate["date"],
+            "start_time": candidate["time"],
+            "timezone": candidate["timezone"],
+            "user_email": user_email,
+            "source": candidate["phrase"]
+        })
+    
+    if deliverables:
+        print(f"Deliverables Extracted! \n {deliverables}")
+        calendar_file = run_file(state, "calendar_deliverables.json")
+        with open(calendar_file, "w") as f:
+            json.dump(deliverables, f, indent=2)
+    
+    return {
+        **state,
+        "deliverables": deliverables,
+        "calendar_file": calendar_file if deliverables else None
+    }
+
+def validate_deliverables(content: str) -> tuple:
+    """Cascade validator - escalate unless a JSON list of deliverables came back"""
+    data = extract_json_safely(content)
+    if isinstance(data, dict):
+        data = data.get("deliverables")
+    if not isinstance(data, list):
+        return False, "not a JSON array"
+    if not all(isinstance(item, dict) for item in data):
+        return False, "malformed entries"
+    return True, None
+
 def extract_json_safely(content: str):
     """
     Try multiple methods to extract valid JSON from LLM response
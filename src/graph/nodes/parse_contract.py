@@ -1,13 +1,20 @@
 """
 Contract parsing node - extracts key clauses and information
 """
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import SystemMessage, HumanMessage
+from src.graph.prompts import build_messages
+from src.graph.cascade import invoke_cascade, stream_cascade
+from src.graph.sections import get_sections, section_batches
+from src.graph.pipeline import ParsePipeline, should_pipeline
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import contextvars
 import os
 import json
 import re
 
-llm = ChatOpenAI(model="gpt-5-mini", temperature=0, api_key=os.getenv("OPENAI_API_KEY"))
+# Contracts at least this long are parsed in section batches, in parallel
+PARALLEL_PARSE_CHARS = int(os.getenv("PARALLEL_PARSE_CHARS", "24000"))
+PARSE_BATCH_CHARS = int(os.getenv("PARSE_BATCH_CHARS", "12000"))
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "4"))
 
 def parse_contract_node(state: dict) -> dict:
     """
@@ -67,13 +74,27 @@ Format:
   "clauses": []
 }"""
     
-    messages = [
-        SystemMessage(content=system_prompt),
-        HumanMessage(content=f"Contract text:\n\n{contract_text}")
-    ]
+    sections = get_sections(state)
+    if len(contract_text) >= PARALLEL_PARSE_CHARS and len(sections) > 1:
+        return parse_in_sections(state, system_prompt, sections)
+    
+    messages = build_messages(contract_text, system_prompt)
+    
+    # Long contracts: stream the response so risk analysis starts on early clauses
+    pipeline = ParsePipeline(state) if should_pipeline(state) else None
     
     try:
-        response = llm.invoke(messages)
+        if pipeline:
+            response = stream_cascade(
+                messages, node="parse_contract", validate=validate_parsed_contract,
+                on_text=pipeline.feed_text, on_discard=pipeline.discard,
+                contract_chars=len(contract_text)
+            )
+        else:
+            response = invoke_cascade(
+                messages, node="parse_contract", validate=validate_parsed_contract,
+                contract_chars=len(contract_text)
+            )
         content = response.content
         
         # Use robust JSON extraction
@@ -83,9 +104,12 @@ Format:
             print(f"Contract Parsed! \n{parsed_data}")
             return {
                 **state,
-                "parsed_contract": parsed_data
+                "parsed_contract": parsed_data,
+                **(pipeline.finish(parsed_data) if pipeline else {})
             }
         else:
+            if pipeline:
+                pipeline.discard(close=True)
             # Fallback: create basic structure
             print("Could not parse contract JSON, creating basic structure")
             return {
@@ -99,6 +123,8 @@ Format:
             }
             
     except Exception as e:
+        if pipeline:
+            pipeline.discard(close=True)
         print(f"Error parsing contract: {e}")
         return {
             **state,
@@ -106,6 +132,107 @@ Format:
             "parsed_contract": {"error": str(e)}
         }
 
+def parse_in_sections(state: dict, system_prompt: str, sections: list) -> dict:
+    """
+    Parse a long contract in batches of consecutive sections, concurrently,
+    and merge the partial results
+    """
+    contract_text = state["contract_text"]
+    batches = section_batches(contract_text, sections, PARSE_BATCH_CHARS)
+    
+    def parse_batch(number: int, batch: dict):
+        headings = ", ".join(s["heading"] for s in batch["sections"])
+        messages = build_messages(
+            batch["text"], system_prompt,
+            f"This is part {number} of {len(batches)} of the contract (sections: {headings}). "
+            f"Extract only what appears in this part."
+        )
+        response = invoke_cascade(
+            messages, node="parse_contract", validate=validate_parsed_batch,
+            contract_chars=len(batch["text"])
+        )
+        return extract_json_safely(response.content)
+    
+    # Risk analysis starts on each batch's clauses as soon as that batch is parsed
+    pipeline = ParsePipeline(state) if should_pipeline(state) else None
+    
+    # Each worker gets a copy of this thread's context (user, node deadline)
+    with ThreadPoolExecutor(max_workers=min(PARSE_WORKERS, len(batches))) as pool:
+        futures = {
+            pool.submit(contextvars.copy_context().run, parse_batch, number, batch): number
+            for number, batch in enumerate(batches, start=1)
+        }
+        results = {}
+        errors = []
+        for future in as_completed(futures):
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                errors.append(str(e))
+                continue
+            if pipeline and isinstance(results[futures[future]], dict):
+                pipeline.feed_clauses(results[futures[future]].get("clauses") or [])
+    
+    parts = [results[number] for number in sorted(results) if isinstance(results[number], dict)]
+    print(f"🧩 Parsed {len(parts)}/{len(batches)} section batches in parallel")
+    if not parts:
+        if pipeline:
+            pipeline.discard(close=True)
+        error = errors[0] if errors else "JSON parsing failed"
+        print(f"Error parsing contract: {error}")
+        return {
+            **state,
+            "error": f"Contract parsing failed: {error}",
+            "parsed_contract": {"error": error}
+        }
+    
+    parsed_data = merge_parsed_parts(parts)
+    if errors or len(parts) < len(batches):
+        parsed_data["incomplete_sections"] = len(batches) - len(parts)
+    print(f"Contract Parsed! \n{parsed_data}")
+    return {
+        **state,
+        "parsed_contract": parsed_data,
+        **(pipeline.finish(parsed_data) if pipeline else {})
+    }
+
+def merge_parsed_parts(parts: list) -> dict:
+    """Concatenate lists (dropping duplicates), merge dicts, keep the first non-empty value otherwise"""
+    merged = {}
+    for part in parts:
+        for key, value in part.items():
+            if value in (None, "", [], {}):
+                continue
+            current = merged.get(key)
+            if isinstance(value, list):
+                items = current if isinstance(current, list) else []
+                seen = {json.dumps(item, sort_keys=True) for item in items}
+                for item in value:
+                    if json.dumps(item, sort_keys=True) not in seen:
+                        seen.add(json.dumps(item, sort_keys=True))
+                        items.append(item)
+                merged[key] = items
+            elif isinstance(value, dict) and isinstance(current, dict):
+                merged[key] = {**value, **current}
+            elif current in (None, "", [], {}):
+                merged[key] = value
+    return merged
+
+def validate_parsed_batch(content: str) -> tuple:
+    """Cascade validator for one section batch - some parts legitimately have no clauses"""
+    if not isinstance(extract_json_safely(content), dict):
+        return False, "invalid JSON"
+    return True, None
+
+def validate_parsed_contract(content: str) -> tuple:
+    """Cascade validator - escalate on unparseable JSON or no clauses"""
+    parsed = extract_json_safely(content)
+    if not isinstance(parsed, dict):
+        return False, "invalid JSON"
+    if not parsed.get("clauses"):
+        return False, "no clauses extracted"
+    return True, None
+
 def extract_json_safely(content: str) -> dict:
     """
     Try multiple methods to extract valid JSON from LLM response
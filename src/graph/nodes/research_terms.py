@@ -2,14 +2,16 @@
 Web research node - searches for unclear contract terms
 Uses LLM to identify which terms need clarification
 """
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_community.tools import DuckDuckGoSearchRun
+from src.graph.prompts import build_messages
+from src.graph.cascade import accept_any, invoke_cascade
+from src.graph.policies import call_external, get_policy
+from src.graph.shared_cache import cache_key, get_cache
 import os
 import json
 import re
 
-llm = ChatOpenAI(model="gpt-5-mini", temperature=0, api_key=os.getenv("OPENAI_API_KEY"))
+# Term explanations don't change often; reuse them across runs (and nodes, with Redis)
+RESEARCH_CACHE_TTL = float(os.getenv("RESEARCH_CACHE_TTL", str(7 * 24 * 3600)))
 
 def research_terms_node(state: dict) -> dict:
     """
@@ -20,7 +22,9 @@ def research_terms_node(state: dict) -> dict:
     risk_analysis = state.get("risk_analysis")
     
     # Use LLM to identify unclear terms that need research
-    unclear_terms = identify_unclear_terms_with_llm(parsed_contract, risk_analysis)
+    unclear_terms = identify_unclear_terms_with_llm(
+        parsed_contract, risk_analysis, state.get("contract_text") or ""
+    )
     
     if not unclear_terms or len(unclear_terms) == 0:
         print("📚 No unclear terms identified - skipping research")
@@ -32,20 +36,32 @@ def research_terms_node(state: dict) -> dict:
     print(f"📚 LLM identified {len(unclear_terms)} terms to research: {unclear_terms}")
     
     # Step 2: Perform web searches for identified terms
+    from langchain_community.tools import DuckDuckGoSearchRun
     search = DuckDuckGoSearchRun()
     research_results = {}
     
+    cache = get_cache()
     for term in unclear_terms[:3]:  # Limit to 3 searches to avoid rate limits
+        key = cache_key("research", str(term).strip().lower())
+        cached = cache.get(key)
+        if cached:
+            print(f"♻️ Reusing research for: {term}")
+            research_results[term] = cached
+            continue
         try:
             # Search with influencer/creator context
             query = f"{term} contract legal meaning"
             print(f"🔍 Searching: {query}")
             
-            search_result = search.run(query)
+            search_result = call_external(
+                "duckduckgo", search.run, query, retries=get_policy("research_terms").retries
+            )
             
             # Step 3: Use LLM to summarize the search results
             summary = summarize_search_results(term, search_result)
             research_results[term] = summary
+            if not summary.startswith("Could not"):
+                cache.set(key, summary, RESEARCH_CACHE_TTL)
             
         except Exception as e:
             print(f"Search failed for '{term}': {str(e)}")
@@ -59,7 +75,7 @@ def research_terms_node(state: dict) -> dict:
         }
     }
 
-def identify_unclear_terms_with_llm(parsed_contract: dict, risk_analysis: dict) -> list:
+def identify_unclear_terms_with_llm(parsed_contract: dict, risk_analysis: dict, contract_text: str = "") -> list:
     """
     Use LLM to identify legal or technical terms that might need clarification
     Returns a list of terms to research
@@ -84,13 +100,15 @@ Format:
         "risk_analysis": risk_analysis
     }
     
-    messages = [
-        SystemMessage(content=system_prompt),
-        HumanMessage(content=f"Contract data:\n\n{json.dumps(context, indent=2)}")
-    ]
+    messages = build_messages(
+        contract_text, system_prompt, f"Contract data:\n\n{json.dumps(context, indent=2)}"
+    )
     
     try:
-        response = llm.invoke(messages)
+        response = invoke_cascade(
+            messages, node="research_terms", route="identify_unclear_terms",
+            validate=validate_terms
+        )
         content = response.content.strip()
         
         # Use robust JSON extraction
@@ -110,6 +128,13 @@ Format:
         print(f"Error identifying unclear terms: {e}")
         return []
 
+def validate_terms(content: str) -> tuple:
+    """Cascade validator - the term list must be a JSON array"""
+    terms = extract_json_safely(content.strip())
+    if not isinstance(terms, list):
+        return False, "not a JSON array"
+    return True, None
+
 def extract_json_safely(content: str):
     """
     Try multiple methods to extract valid JSON from LLM response
@@ -182,13 +207,16 @@ Focus on actionable information that helps clients understand their contract.
 
 If the search results don't provide clear information, say so and provide a basic definition based on your knowledge."""
     
+    from langchain_core.messages import SystemMessage, HumanMessage
     messages = [
         SystemMessage(content=system_prompt),
         HumanMessage(content=f"Term to explain: {term}\n\nSearch results:\n{search_results[:2000]}")
     ]
     
     try:
-        response = llm.invoke(messages)
+        response = invoke_cascade(
+            messages, node="research_terms", route="summarize_research", validate=accept_any
+        )
         return response.content.strip()
     except Exception as e:
         return f"Could not generate explanation: {str(e)}"
\ No newline at end of file
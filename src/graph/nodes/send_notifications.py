@@ -5,19 +5,22 @@ Enhanced with better error logging
 import os
 import json
 import smtplib
+from email.mime.base import MIMEBase
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-import markdown2
-from datetime import datetime, timedelta
-import pytz
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+from email import encoders
+from datetime import datetime
+from src.graph.calendar_backends import GoogleCalendarBackend, get_calendar_backend
+from src.graph.digest import EMAIL_DIGEST, queue_summary
+from src.graph.policies import CircuitOpenError, call_external, get_policy
+# markdown2 is imported on first use (slow import)
 #from sendgrid import SendGridAPIClient
 #from sendgrid.helpers.mail import Mail
 from dotenv import load_dotenv
 load_dotenv()
 
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+
 def send_notifications_node(state: dict) -> dict:
     """
     Send email summary and calendar invites
@@ -30,6 +33,17 @@ def send_notifications_node(state: dict) -> dict:
     
     results = []
     
+    # Calendar events (creator mode only); the ICS backend rides along with the email
+    deliverables = load_deliverables(calendar_file) if mode == "creator" else []
+    calendar = get_calendar_backend() if deliverables else None
+    attachments = []
+    if calendar:
+        try:
+            attachments = calendar.attachments(deliverables, company_name)
+        except Exception as e:
+            print(f"❌ Calendar attachment error: {str(e)}")
+    email_sent = False
+    
     # Send email summary with company name in subject
     print(f"📧 Attempting to send email to {user_email}")
     print(f"📄 Summary file: {summary_file}")
@@ -37,8 +51,15 @@ def send_notifications_node(state: dict) -> dict:
     
     if summary_file and os.path.exists(summary_file):
         try:
-            email_result = send_summary_email(user_email, summary_file, company_name)
+            if EMAIL_DIGEST:
+                # Batched with the user's other summaries (see src/graph/digest.py)
+                email_result = queue_summary(
+                    user_email, read_summary(summary_file), company_name, state.get("run_id"), attachments
+                )
+            else:
+                email_result = send_summary_email(user_email, summary_file, company_name, attachments)
             results.append(email_result)
+            email_sent = True
             print(f"✅ {email_result}")
         except Exception as e:
             error_msg = f"Email error: {str(e)}"
@@ -52,10 +73,12 @@ def send_notifications_node(state: dict) -> dict:
         results.append(no_file_msg)
         print(f"{no_file_msg}")
     
-    # Send calendar invites (creator mode only)
-    if mode == "creator" and calendar_file and os.path.exists(calendar_file):
+    # Send calendar invites
+    if calendar:
         try:
-            calendar_result = send_calendar_invites(user_email)
+            if attachments and not email_sent:
+                raise RuntimeError("calendar file not delivered, the summary email failed")
+            calendar_result = calendar.deliver(user_email, deliverables)
             results.append(calendar_result)
             print(f"✅ {calendar_result}")
         except Exception as e:
@@ -135,11 +158,31 @@ def send_notifications_node(state: dict) -> dict:
 #     return f"✅ Email sent to {recipient}"
 
 
-def send_summary_email(recipient: str, summary_file: str, company_name: str = None) -> str:
-    """Send email with contract summary"""
+def send_summary_email(recipient: str, summary_file: str, company_name: str = None,
+                       attachments: list = None) -> str:
+    """
+    Send email with contract summary
+    attachments: (filename, bytes, subtype) tuples, e.g. the .ics calendar
+    """
     print(f"📧 Starting email send process...")
+    sender_email, _ = smtp_credentials()
+    summary_text = read_summary(summary_file)
     
-    # Check credentials
+    # Create subject line with company name
+    today = datetime.now().strftime('%Y-%m-%d')
+    if company_name and company_name != "Unknown Company":
+        subject = f"Contract Summary - {today} - {company_name}"
+    else:
+        subject = f"Contract Summary - {today}"
+    
+    print(f"📧 Email subject: {subject}")
+    print(f"📧 Recipient: {recipient}")
+    
+    msg = build_email(sender_email, recipient, subject, summary_text, attachments)
+    deliver_messages([msg])
+    return f"✅ Email sent to {recipient}"
+
+def smtp_credentials() -> tuple:
     sender_email = os.getenv("SENDER_EMAIL")
     sender_password = os.getenv("EMAIL_PASSWORD")
     
@@ -148,8 +191,10 @@ def send_summary_email(recipient: str, summary_file: str, company_name: str = No
     
     if not sender_email or not sender_password:
         raise RuntimeError("Missing email credentials (SENDER_EMAIL or EMAIL_PASSWORD)")
-    
-    # Read summary file
+    return sender_email, sender_password
+
+def read_summary(summary_file: str) -> str:
+    """Summary markdown from the run's file, without a wrapping code fence"""
     print(f"📧 Reading summary from: {summary_file}")
     try:
         with open(summary_file, "r", encoding="utf-8") as f:
@@ -164,133 +209,92 @@ def send_summary_email(recipient: str, summary_file: str, company_name: str = No
         summary_text = summary_text[summary_text.find("\n")+1:]
     if summary_text.endswith("```"):
         summary_text = summary_text[:summary_text.rfind("\n")]
+    return summary_text
+
+def build_email(sender_email: str, recipient: str, subject: str, summary_text: str,
+                attachments: list = None):
+    """Plain + HTML (rendered markdown) email, with attachments if any"""
+    body = MIMEMultipart("alternative")
     
-    # Create subject line with company name
-    today = datetime.now().strftime('%Y-%m-%d')
-    if company_name and company_name != "Unknown Company":
-        subject = f"Contract Summary - {today} - {company_name}"
-    else:
-        subject = f"Contract Summary - {today}"
+    import markdown2
+    html_body = markdown2.markdown(summary_text)
+    plain_part = MIMEText(summary_text, "plain")
+    html_part = MIMEText(html_body, "html")
     
-    print(f"📧 Email subject: {subject}")
-    print(f"📧 Recipient: {recipient}")
+    body.attach(plain_part)
+    body.attach(html_part)
     
-    # Build email
-    msg = MIMEMultipart("alternative")
+    if attachments:
+        # mixed: the text/html alternatives, then the files
+        msg = MIMEMultipart("mixed")
+        msg.attach(body)
+        for filename, content, subtype in attachments:
+            part = MIMEBase("text", subtype, method="PUBLISH", charset="utf-8", name=filename) \
+                if subtype == "calendar" else MIMEBase("application", subtype, name=filename)
+            part.set_payload(content)
+            encoders.encode_base64(part)
+            part.add_header("Content-Disposition", "attachment", filename=filename)
+            msg.attach(part)
+        print(f"📧 Attaching {', '.join(a[0] for a in attachments)}")
+    else:
+        msg = body
     msg["From"] = sender_email
     msg["To"] = recipient
     msg["Subject"] = subject
+    return msg
+
+def deliver_messages(messages: list, on_sent=None, on_rejected=None):
+    """
+    Send the messages over a single SMTP connection
+    on_sent(msg) is called as each message goes out. With on_rejected(msg, error),
+    a message the server refuses (bad recipient, rejected content) is reported
+    and skipped instead of failing the rest
+    """
+    sender_email, sender_password = smtp_credentials()
+    done = []
     
-    html_body = markdown2.markdown(summary_text)
-    plain_part = MIMEText(summary_text, "plain")
-    html_part = MIMEText(html_body, "html")
-    
-    msg.attach(plain_part)
-    msg.attach(html_part)
-    
-    # Send email
-    print(f"📧 Connecting to SMTP server...")
-    try:
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
+    def deliver():
+        print(f"📧 Connecting to SMTP server...")
+        with smtplib.SMTP_SSL("smtp.gmail.com", 465, timeout=SMTP_TIMEOUT) as server:
             print(f"📧 Logging in as {sender_email}...")
             server.login(sender_email, sender_password)
-            print(f"📧 Sending message...")
-            server.send_message(msg)
+            print(f"📧 Sending {len(messages)} message(s)...")
+            # A retry after a dropped connection picks up where it stopped
+            for msg in messages[len(done):]:
+                try:
+                    server.send_message(msg)
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError) as e:
+                    if on_rejected is None:
+                        raise
+                    done.append(msg)
+                    on_rejected(msg, e)
+                    continue
+                done.append(msg)
+                if on_sent:
+                    on_sent(msg)
             print(f"📧 Message sent successfully!")
+    
+    try:
+        call_external("smtp", deliver, retries=get_policy("send_notifications").retries)
+    except CircuitOpenError as e:
+        raise RuntimeError(f"Email not sent: {str(e)}")
     except smtplib.SMTPAuthenticationError as e:
         raise RuntimeError(f"SMTP Authentication failed: {str(e)}. Check your SENDER_EMAIL and EMAIL_PASSWORD.")
     except smtplib.SMTPException as e:
         raise RuntimeError(f"SMTP error: {str(e)}")
     except Exception as e:
         raise RuntimeError(f"Unexpected email error: {str(e)}")
-    
-    return f"✅ Email sent to {recipient}"
 
-def send_calendar_invites(user_email: str) -> str:
-    """Send calendar invites for deliverables"""
-    if not os.path.exists('calendar_deliverables.json'):
-        return "No deliverables found"
-    
-    with open('calendar_deliverables.json', 'r') as f:
-        deliverables = json.load(f)
-    
+def load_deliverables(calendar_file: str) -> list:
+    """Deliverables written by extract_deliverables (empty if none)"""
+    if not calendar_file or not os.path.exists(calendar_file):
+        return []
+    with open(calendar_file, 'r') as f:
+        return json.load(f) or []
+
+def send_calendar_invites(user_email: str, calendar_file: str = "calendar_deliverables.json") -> str:
+    """Send Google Calendar invites for deliverables"""
+    deliverables = load_deliverables(calendar_file)
     if not deliverables:
         return "No deliverables to process"
-    
-    token_json_str = os.getenv('GOOGLE_CALENDAR_TOKEN_JSON')
-    if not token_json_str:
-        return "Calendar not configured"
-    
-    token_data = json.loads(token_json_str)
-    creds = Credentials.from_authorized_user_info(
-        token_data, 
-        ['https://www.googleapis.com/auth/calendar']
-    )
-    
-    if not creds.valid and creds.expired and creds.refresh_token:
-        creds.refresh(Request())
-    
-    service = build('calendar', 'v3', credentials=creds)
-    
-    created_count = 0
-    existing_count = 0
-    
-    for deliverable in deliverables:
-        result = create_calendar_event(service, deliverable, user_email)
-        if "created" in result.lower():
-            created_count += 1
-        elif "exists" in result.lower():
-            existing_count += 1
-    
-    return f"📅 Calendar: {created_count} Events Created"
-
-def create_calendar_event(service, deliverable: dict, user_email: str) -> str:
-    """Create a single calendar event"""
-    summary = deliverable.get('summary', '')
-    description = deliverable.get('description', '')
-    start_date = deliverable.get('start_date', '')
-    start_time = deliverable.get('start_time')
-    timezone_str = deliverable.get('timezone')
-    
-    if not all([summary, start_date]):
-        return f"Skipped: {summary}"
-    
-    start_dt = datetime.strptime(start_date, '%Y-%m-%d')
-    pst = pytz.timezone('America/Los_Angeles')
-    
-    # Determine event type
-    if start_time and start_time != 'null':
-        time_obj = datetime.strptime(start_time, '%H:%M').time()
-        combined_dt = datetime.combine(start_dt, time_obj)
-        combined_dt = pst.localize(combined_dt)
-        end_dt = combined_dt + timedelta(hours=1)
-        
-        event_times = {
-            "start": {"dateTime": combined_dt.isoformat(), "timeZone": "America/Los_Angeles"},
-            "end": {"dateTime": end_dt.isoformat(), "timeZone": "America/Los_Angeles"},
-        }
-    else:
-        event_times = {
-            "start": {"date": start_dt.strftime('%Y-%m-%d')},
-            "end": {"date": (start_dt + timedelta(days=1)).strftime('%Y-%m-%d')},
-        }
-    
-    event = {
-        "summary": f"📋 {summary}",
-        "description": f"Contract Deliverable\n\n{description}",
-        "reminders": {"useDefault": True},
-        "attendees": [{"email": user_email}],
-        **event_times
-    }
-    
-    try:
-        service.events().insert(
-            calendarId="primary",
-            body=event,
-            sendUpdates="all"
-        ).execute()
-        return f"Created: {summary}"
-    except Exception as e:
-        if "duplicate" in str(e).lower():
-            return f"Exists: {summary}"
-        return f"Error: {summary} - {str(e)}"
\ No newline at end of file
+    return GoogleCalendarBackend().deliver(user_email, deliverables)
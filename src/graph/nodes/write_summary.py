@@ -1,29 +1,56 @@
 """
 Summary writing node - creates user-friendly contract summary
+Rendered from structured state with a template by default; the LLM-written
+prose summary is optional (SUMMARY_STYLE=llm or state["summary_style"])
 """
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import SystemMessage, HumanMessage
+from src.graph.prompts import build_messages
+from src.graph.cascade import accept_any, invoke_cascade
+from src.graph.run_files import run_file
+from src.graph.summary_renderer import render_summary
 import os
 import json
 
-llm = ChatOpenAI(model="gpt-5-mini", temperature=0, api_key=os.getenv("OPENAI_API_KEY"))
+# 'template' renders the summary without an LLM call, 'llm' has the model write it
+SUMMARY_STYLE = os.getenv("SUMMARY_STYLE", "template")
 
 def write_summary_node(state: dict) -> dict:
     """
     Write a user-friendly summary of the contract
     Includes web research results if available
     """
+    if not state.get("parsed_contract"):
+        return {**state, "error": "No parsed contract to summarize"}
+    
+    style = state.get("summary_style") or SUMMARY_STYLE
+    summary = write_llm_summary(state) if style == "llm" else None
+    if summary is None:
+        summary = render_summary(state)
+        print("✅ Contract summary rendered from template")
+    
+    # Write to file
+    summary_file = run_file(state, "contract_summary.md")
+    with open(summary_file, "w", encoding="utf-8") as f:
+        f.write(summary)
+    
+    return {
+        **state,
+        "summary_file": summary_file,
+        "summary_markdown": summary
+    }
+
+def write_llm_summary(state: dict) -> str:
+    """
+    Have the LLM write the summary as prose
+    Returns None on failure so the caller can fall back to the template
+    """
     parsed_contract = state.get("parsed_contract")
     risk_analysis = state.get("risk_analysis")
     research_results = state.get("research_results")
     mode = state["mode"]
     
-    if not parsed_contract:
-        return {**state, "error": "No parsed contract to summarize"}
-    
-    # Check if research was performed
+    # Check if research was performed (or terms were explained by express analysis)
     has_research = (research_results and 
-                   research_results.get("searched") and 
+                   (research_results.get("searched") or research_results.get("explained")) and 
                    research_results.get("terms"))
     
     if mode == "creator":
@@ -114,13 +141,16 @@ Return ONLY the markdown content."""
         context["research_results"] = research_results
         print(f"📚 Including research for {len(research_results['terms'])} terms in summary")
     
-    messages = [
-        SystemMessage(content=system_prompt),
-        HumanMessage(content=f"Contract data:\n\n{json.dumps(context, indent=2)}")
-    ]
+    messages = build_messages(
+        state.get("contract_text") or "", system_prompt,
+        f"Contract data:\n\n{json.dumps(context, indent=2)}"
+    )
     
     try:
-        response = llm.invoke(messages)
+        response = invoke_cascade(
+            messages, node="write_summary", validate=accept_any,
+            contract_chars=len(state.get("contract_text") or "")
+        )
         summary = response.content
         
         # Remove any markdown code blocks if present
@@ -129,19 +159,8 @@ Return ONLY the markdown content."""
         elif summary.startswith("```") and summary.endswith("```"):
             summary = summary.strip("`").strip()
         
-        # Write to file
-        with open("contract_summary.md", "w", encoding="utf-8") as f:
-            f.write(summary)
-        
         print("✅ Contract summary written successfully")
-        
-        return {
-            **state,
-            "summary_file": "contract_summary.md"
-        }
+        return summary
     except Exception as e:
-        print(f"Error writing summary: {e}")
-        return {
-            **state,
-            "error": f"Summary writing failed: {str(e)}"
-        }
\ No newline at end of file
+        print(f"Error writing summary, falling back to template: {e}")
+        return None
\ No newline at end of file
@@ -0,0 +1,176 @@
+"""
+Parse -> risk/deliverables pipelining
+While parse_contract's response is still streaming, completed clauses are
+sent to risk analysis in batches and the finished deliverables list starts
+deadline labeling, so those stages overlap the parse instead of waiting for
+it. analyze_risks / extract_deliverables then reuse the results.
+"""
+import contextvars
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from src.graph.json_stream import StreamingArrayParser
+from src.graph.risk_rules import prescreen, flags_to_risks, highest_level
+
+# Stream the parse and overlap downstream work (PIPELINE_STREAMING=0 to disable)
+PIPELINE_STREAMING = os.getenv("PIPELINE_STREAMING", "1") == "1"
+# Shorter contracts parse fast enough that overlapping isn't worth the extra calls
+PIPELINE_MIN_CHARS = int(os.getenv("PIPELINE_MIN_CHARS", "12000"))
+RISK_BATCH_CLAUSES = int(os.getenv("PIPELINE_RISK_BATCH", "6"))
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "3"))
+
+
+def clause_key(clause) -> str:
+    """Identity of a clause for matching streamed items against the final parse"""
+    from src.graph.summary_renderer import as_text
+    return " ".join(as_text(clause).split()).lower()
+
+
+def should_pipeline(state: dict) -> bool:
+    return PIPELINE_STREAMING and len(state.get("contract_text") or "") >= PIPELINE_MIN_CHARS
+
+
+class ParsePipeline:
+    """
+    Receives parse output as it is produced and runs downstream work early
+
+    feed_text() for a streamed response, feed_clauses()/feed_deliverables()
+    for results that arrive whole (section batches); finish() waits for the
+    work and returns the state update.
+    """
+
+    def __init__(self, state: dict):
+        self.state = state
+        self.parser = StreamingArrayParser(["clauses", "deliverables"])
+        self.pool = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix="pipeline")
+        self.pending = []
+        # Clauses already sent (or queued) for risk analysis, by clause_key
+        self.fed_clauses = Counter()
+        self.deliverable_items = []
+        self.risk_futures = []
+        self.deliverables_future = None
+        self.risk_preflags = state.get("risk_preflags")
+        if self.risk_preflags is None:
+            self.risk_preflags = prescreen(state.get("contract_text") or "")
+        self.rule_risks = flags_to_risks(self.risk_preflags)
+
+    def _submit(self, fn, *args):
+        # Workers see this thread's context (user, node deadline)
+        return self.pool.submit(contextvars.copy_context().run, fn, *args)
+
+    def feed_text(self, chunk: str):
+        for event, key, value in self.parser.feed(chunk):
+            if event == "item" and key == "clauses":
+                self.feed_clauses([value])
+            elif event == "item" and key == "deliverables":
+                self.deliverable_items.append(value)
+            elif event == "end" and key == "deliverables":
+                self.feed_deliverables(self.deliverable_items)
+
+    def feed_clauses(self, clauses: list):
+        self.pending.extend(clauses)
+        self.fed_clauses.update(clause_key(c) for c in clauses)
+        while len(self.pending) >= RISK_BATCH_CLAUSES:
+            self._submit_risk_batch(self.pending[:RISK_BATCH_CLAUSES])
+            self.pending = self.pending[RISK_BATCH_CLAUSES:]
+
+    def _submit_risk_batch(self, clauses: list):
+        from src.graph.nodes.analyze_risk import analyze_clause_batch
+        print(f"🔀 Risk-analyzing {len(clauses)} clauses while parsing continues")
+        self.risk_futures.append(self._submit(analyze_clause_batch, self.state, clauses, self.rule_risks))
+
+    def feed_deliverables(self, items: list):
+        """The parse's deliverables list is complete; label date candidates now"""
+        if self.deliverables_future is not None or self.state.get("mode") != "creator":
+            return
+        from src.graph.date_extraction import extract_date_candidates
+        from src.graph.nodes.extract_deliverables import label_date_candidates
+        candidates = [
+            c for c in extract_date_candidates(self.state.get("contract_text") or "")
+            if not c["is_effective_date"]
+        ]
+        if not candidates:
+            return
+        print(f"🔀 Labeling {len(candidates)} deadline candidates while parsing continues")
+        self.deliverables_future = self._submit(
+            label_date_candidates, {**self.state, "parsed_contract": {"deliverables": items}}, candidates
+        )
+
+    def discard(self, close: bool = False):
+        """The streamed response was rejected; drop everything started from it"""
+        if close:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+        for future in self.risk_futures + [self.deliverables_future]:
+            if future is not None:
+                future.cancel()
+        self.risk_futures = []
+        self.deliverables_future = None
+        self.pending = []
+        self.fed_clauses = Counter()
+        self.deliverable_items = []
+        self.parser = StreamingArrayParser(["clauses", "deliverables"])
+
+    def finish(self, parsed_contract: dict) -> dict:
+        """
+        Wait for the overlapped work and return the state update
+        Risks are only used when at least one batch started before the parse
+        finished; otherwise analyze_risks runs as usual.
+        """
+        update = {}
+        done = []
+        try:
+            if self.risk_futures:
+                # Clauses of the final parse that weren't fed while streaming go in the last batch
+                unfed = self.fed_clauses.copy()
+                for clause in parsed_contract.get("clauses") or []:
+                    key = clause_key(clause)
+                    if unfed[key] > 0:
+                        unfed[key] -= 1
+                    else:
+                        self.pending.append(clause)
+                if self.pending:
+                    self._submit_risk_batch(self.pending)
+                    self.pending = []
+                risk_analysis = self._merge_risks()
+                if risk_analysis is not None:
+                    update["risk_analysis"] = risk_analysis
+                    update["risk_preflags"] = self.risk_preflags
+                    done.append("analyze_risks")
+            if self.deliverables_future is not None:
+                try:
+                    result = self.deliverables_future.result()
+                    update["deliverables"] = result.get("deliverables") or []
+                    update["calendar_file"] = result.get("calendar_file")
+                    done.append("extract_deliverables")
+                except Exception as e:
+                    print(f"Pipelined deliverable labeling failed, extract_deliverables will retry: {e}")
+        finally:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+        if done:
+            update["pipelined"] = done
+        return update
+
+    def _merge_risks(self):
+        risks = []
+        levels = []
+        for future in self.risk_futures:
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Pipelined risk batch failed, analyze_risks will run instead: {e}")
+                return None
+            if result is None:
+                print("Pipelined risk batch returned no JSON, analyze_risks will run instead")
+                return None
+            seen = {(r.get("category"), r.get("reason")) for r in risks if isinstance(r, dict)}
+            for risk in result.get("risks") or []:
+                if isinstance(risk, dict) and (risk.get("category"), risk.get("reason")) not in seen:
+                    risks.append(risk)
+            levels.append(result.get("overall_risk_score"))
+        print(f"🔀 {len(self.risk_futures)} risk batches finished alongside the parse")
+        return {
+            "risks": risks,
+            "overall_risk_score": highest_level(levels + [r.get("level") for r in risks]) or "Unknown",
+            "batches": len(self.risk_futures),
+        }
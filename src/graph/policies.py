@@ -0,0 +1,294 @@
+"""
+Per-node execution policies - deadlines, retries and circuit breakers
+Each graph node is wrapped with its policy; external calls made inside nodes
+(OpenAI, DuckDuckGo, Google Calendar, SMTP) go through call_external so they
+get bounded, jittered retries and fast-fail when their backend is down.
+"""
+import contextvars
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+# Whole-run time budget; optional nodes are skipped when it runs low
+RUN_DEADLINE_SECONDS = float(os.getenv("RUN_DEADLINE_SECONDS", "600"))
+
+# Monotonic deadlines for the current run and the currently executing node
+run_deadline = contextvars.ContextVar("run_deadline", default=None)
+node_deadline = contextvars.ContextVar("node_deadline", default=None)
+# Set (threading.Event) once the run has given up on the currently executing node
+node_cancelled = contextvars.ContextVar("node_cancelled", default=None)
+
+
+@dataclass
+class NodePolicy:
+    timeout: float                      # seconds the node may run
+    retries: int = 0                    # retries per external call for retryable errors
+    backoff_base: float = 1.0           # first retry delay in seconds (doubles, with jitter)
+    dependency: Optional[str] = None    # circuit breaker the node depends on
+    optional: bool = False              # may be skipped to protect the run deadline
+    min_remaining: float = 0.0          # skip (if optional) when less run time than this is left
+    skip_update: dict = field(default_factory=dict)  # state written when the node is skipped
+    budget_update: dict = field(default_factory=dict)  # state overrides once the run is over budget
+
+
+NODE_POLICIES = {
+    "extract_company": NodePolicy(timeout=60, retries=2, dependency="openai"),
+    # Includes risk batches pipelined with the streamed parse
+    "parse_contract": NodePolicy(timeout=240, retries=2, dependency="openai"),
+    "analyze_risks": NodePolicy(timeout=120, retries=2, dependency="openai"),
+    "research_terms": NodePolicy(
+        timeout=90, retries=1, dependency="duckduckgo", optional=True, min_remaining=120,
+        skip_update={"research_results": {"searched": False, "message": "Research skipped"}}
+    ),
+    "extract_deliverables": NodePolicy(timeout=90, retries=2, dependency="openai"),
+    "write_summary": NodePolicy(
+        timeout=150, retries=2, dependency="openai", budget_update={"summary_style": "template"}
+    ),
+    "express_analysis": NodePolicy(timeout=240, retries=2, dependency="openai"),
+    "send_notifications": NodePolicy(timeout=90, retries=2, dependency="smtp"),
+}
+
+DEFAULT_POLICY = NodePolicy(timeout=120, retries=1)
+
+
+def get_policy(node: str) -> NodePolicy:
+    return NODE_POLICIES.get(node, DEFAULT_POLICY)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a dependency whose breaker is open"""
+
+
+class NodeCancelledError(RuntimeError):
+    """Raised instead of making a new external call from a node that timed out"""
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures, fast-fails calls for
+    `reset_timeout` seconds, then lets a single trial call through (half-open)
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Whether a call may go through right now"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def is_open(self) -> bool:
+        return self.state == "open"
+
+    def release_trial(self):
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                if self.opened_at is None:
+                    print(f"🔌 Circuit for {self.name} opened after {self.failures} failures")
+                self.opened_at = time.monotonic()
+
+
+BREAKERS = {
+    "openai": CircuitBreaker("openai", failure_threshold=5, reset_timeout=30),
+    "duckduckgo": CircuitBreaker("duckduckgo", failure_threshold=3, reset_timeout=120),
+    "google_calendar": CircuitBreaker("google_calendar", failure_threshold=3, reset_timeout=120),
+    "smtp": CircuitBreaker("smtp", failure_threshold=3, reset_timeout=60),
+}
+
+_RETRYABLE_NAMES = ("Timeout", "Connection", "InternalServerError", "ServiceUnavailable",
+                    "RemoteProtocolError", "ServerDisconnected", "Ratelimit")
+
+
+def is_retryable(error: Exception) -> bool:
+    """Transient errors worth retrying: timeouts, dropped connections, 5xx"""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int) and status >= 500:
+        return True
+    name = type(error).__name__
+    return any(part in name for part in _RETRYABLE_NAMES)
+
+
+def time_remaining() -> Optional[float]:
+    """Seconds left before the current node's (or run's) deadline, None if unbounded"""
+    deadlines = [d for d in (node_deadline.get(), run_deadline.get()) if d is not None]
+    if not deadlines:
+        return None
+    return min(deadlines) - time.monotonic()
+
+
+def check_cancelled():
+    """Stop a node the run has already abandoned before it makes (and pays for) another call"""
+    cancelled = node_cancelled.get()
+    if cancelled is not None and cancelled.is_set():
+        raise NodeCancelledError("node was abandoned after its deadline")
+
+
+def start_run_deadline(seconds: float = RUN_DEADLINE_SECONDS):
+    """Start the time budget for the current run (called at run / resume start)"""
+    run_deadline.set(time.monotonic() + seconds)
+
+
+def call_external(dependency: str, fn, *args, retries: int = 0, backoff_base: float = 1.0, **kwargs):
+    """
+    Call fn(*args, **kwargs) guarded by the dependency's circuit breaker,
+    retrying retryable errors with jittered exponential backoff
+    """
+    breaker = BREAKERS.get(dependency)
+    for attempt in range(retries + 1):
+        check_cancelled()
+        if breaker and not breaker.allow():
+            raise CircuitOpenError(f"{dependency} is unavailable (circuit open)")
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            if not is_retryable(e):
+                if breaker:
+                    # Not a health problem (e.g. bad request) - just free the trial slot
+                    breaker.release_trial()
+                raise
+            if breaker:
+                breaker.record_failure()
+            delay = backoff_base * (2 ** attempt) * (0.5 + random.random())
+            remaining = time_remaining()
+            if attempt == retries or (remaining is not None and remaining < delay):
+                raise
+            print(f"↻ {dependency} call failed ({type(e).__name__}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+        if breaker:
+            breaker.record_success()
+        return result
+
+
+def with_policy(name: str, node_fn):
+    """
+    Wrap a graph node with its policy:
+    - optional nodes are skipped when the run deadline is near, their dependency
+      is down or the run is over its token budget (other nodes get budget_update)
+    - the node runs under a deadline; on timeout optional nodes degrade, required nodes error,
+      and the abandoned node's thread stops at its next external call
+    - per-node wall time is recorded in state["timings"], LLM usage so far in state["usage"]
+    """
+    policy = get_policy(name)
+
+    def run_node(state: dict) -> dict:
+        from src.graph.progress import record_event
+        from src.graph.usage import budget_exceeded, run_usage
+        started = time.monotonic()
+        remaining = time_remaining()
+        run_id = state.get("run_id")
+        ledger = run_usage.get()
+        over_budget = budget_exceeded(ledger) if (policy.optional or policy.budget_update) else None
+
+        if over_budget and any(state.get(k) != v for k, v in policy.budget_update.items()):
+            ledger.downgrade(f"{name} downgraded ({over_budget})")
+            state = {**state, **policy.budget_update}
+
+        if policy.optional:
+            breaker = BREAKERS.get(policy.dependency)
+            reason = None
+            if remaining is not None and remaining < policy.min_remaining:
+                reason = f"only {max(0, remaining):.0f}s left in run deadline"
+            elif breaker and breaker.is_open():
+                reason = f"{policy.dependency} unavailable"
+            elif over_budget:
+                reason = over_budget
+                ledger.downgrade(f"{name} skipped ({over_budget})")
+            if reason:
+                print(f"⏭️ Skipping {name}: {reason}")
+                record_event(run_id, name, "skipped", reason=reason)
+                return _with_timing({**state, **_skip_update(policy, reason)}, name, started)
+
+        record_event(run_id, name, "started")
+        outcome = {}
+        context = contextvars.copy_context()
+        cancelled = threading.Event()
+
+        def target():
+            node_deadline.set(time.monotonic() + policy.timeout)
+            node_cancelled.set(cancelled)
+            try:
+                outcome["state"] = node_fn(state)
+            except BaseException as e:
+                outcome["error"] = e
+
+        worker = threading.Thread(target=context.run, args=(target,), name=f"node-{name}", daemon=True)
+        worker.start()
+        worker.join(policy.timeout)
+
+        if worker.is_alive():
+            cancelled.set()
+            print(f"⏱️ {name} exceeded its {policy.timeout:.0f}s deadline")
+            record_event(run_id, name, "timed_out", elapsed_ms=_elapsed_ms(started))
+            if policy.optional:
+                result = {**state, **_skip_update(policy, "timed out")}
+            else:
+                result = {**state, "error": f"{name} timed out after {policy.timeout:.0f}s"}
+            return _with_timing(result, name, started)
+        if "error" in outcome:
+            record_event(run_id, name, "failed", error=str(outcome["error"]), elapsed_ms=_elapsed_ms(started))
+            raise outcome["error"]
+        record_event(run_id, name, "finished", elapsed_ms=_elapsed_ms(started))
+        return _with_timing(outcome["state"], name, started)
+
+    run_node.__name__ = getattr(node_fn, "__name__", name)
+    return run_node
+
+
+def _skip_update(policy: NodePolicy, reason: str) -> dict:
+    update = {}
+    for key, value in policy.skip_update.items():
+        update[key] = {**value, "message": f"{value.get('message', 'Skipped')}: {reason}"} \
+            if isinstance(value, dict) else value
+    return update
+
+
+def _elapsed_ms(started: float) -> int:
+    return int((time.monotonic() - started) * 1000)
+
+
+def _with_timing(state: dict, name: str, started: float) -> dict:
+    from src.graph.usage import run_usage
+    timings = dict(state.get("timings") or {})
+    timings[name] = round(time.monotonic() - started, 3)
+    ledger = run_usage.get()
+    if ledger is None:
+        return {**state, "timings": timings}
+    return {**state, "timings": timings, "usage": ledger.snapshot()}
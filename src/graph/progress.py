@@ -0,0 +1,96 @@
+"""
+Per-run progress events - which node is running, finished, skipped or failed
+with_policy records an event as each node starts and ends. Events go to a
+Redis list (and pub/sub channel) when REDIS_URL is set, so any web node can
+report a run executing on another worker; otherwise they are kept in memory.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from src.graph.redis_client import get_redis, redis_key
+
+PROGRESS_TTL_SECONDS = int(os.getenv("PROGRESS_TTL_SECONDS", str(24 * 3600)))
+# Runs whose events the in-process fallback keeps
+MEMORY_RUNS = 500
+
+_events = OrderedDict()
+_owners = OrderedDict()
+_lock = threading.Lock()
+
+
+def set_run_owner(run_id: str, owner: str):
+    """Remember who started a run (e.g. "api:<client>") so only they can read its progress"""
+    client = get_redis()
+    if client:
+        try:
+            client.set(redis_key("progress", run_id, "owner"), owner, ex=PROGRESS_TTL_SECONDS)
+            return
+        except Exception as e:
+            print(f"⚠️ Run owner not shared: {e}")
+    with _lock:
+        _owners[run_id] = owner
+        while len(_owners) > MEMORY_RUNS:
+            _owners.popitem(last=False)
+
+
+def run_owner(run_id: str) -> str:
+    """Owner recorded with set_run_owner (None if unknown or expired)"""
+    client = get_redis()
+    if client:
+        try:
+            return client.get(redis_key("progress", run_id, "owner"))
+        except Exception as e:
+            print(f"⚠️ Run owner unavailable: {e}")
+    with _lock:
+        return _owners.get(run_id)
+
+
+def record_event(run_id: str, node: str, status: str, **fields):
+    """Append an event ("started", "finished", "skipped", "timed_out", "failed") for a run"""
+    if not run_id:
+        return
+    event = {"node": node, "status": status, "at": time.time(), **fields}
+    client = get_redis()
+    if client:
+        try:
+            key = redis_key("progress", run_id)
+            payload = json.dumps(event)
+            pipe = client.pipeline()
+            pipe.rpush(key, payload)
+            pipe.expire(key, PROGRESS_TTL_SECONDS)
+            pipe.publish(key, payload)
+            pipe.execute()
+            return
+        except Exception as e:
+            print(f"⚠️ Progress event not shared: {e}")
+    with _lock:
+        _events.setdefault(run_id, []).append(event)
+        _events.move_to_end(run_id)
+        while len(_events) > MEMORY_RUNS:
+            _events.popitem(last=False)
+
+
+def get_events(run_id: str, since: int = 0) -> list:
+    """Events of a run in order, starting at index since"""
+    client = get_redis()
+    if client:
+        try:
+            return [json.loads(e) for e in client.lrange(redis_key("progress", run_id), since, -1)]
+        except Exception as e:
+            print(f"⚠️ Progress events unavailable: {e}")
+    with _lock:
+        return list(_events.get(run_id, [])[since:])
+
+
+def progress_summary(run_id: str, since: int = 0) -> dict:
+    events = get_events(run_id, since)
+    current = None
+    for event in events:
+        if event["status"] == "started":
+            current = event["node"]
+        elif event["node"] == current:
+            current = None
+    return {"run_id": run_id, "events": events, "next": since + len(events), "current_node": current}
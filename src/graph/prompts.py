@@ -0,0 +1,46 @@
+"""
+Shared prompt prefix for every contract-related LLM call
+The provider caches prompt prefixes automatically, so every node's messages
+start with the same instructions and the same contract text; node-specific
+instructions and data come after. Nodes that only need a few sections
+(src/graph/sections.py) send those instead when that is much smaller. Calls later in a run (and retries/cascade
+escalations on the same model) then reuse the cached prefix.
+"""
+import hashlib
+
+# Must stay byte-for-byte identical across nodes or the cache won't hit
+SHARED_INSTRUCTIONS = """You are an expert contract analyst working on one step of a contract review pipeline.
+The contract (or the sections of it this step needs) is provided below. After it you will
+receive the instructions for this step, sometimes with data produced by earlier steps. Follow
+those step instructions exactly, including the required output format. Do NOT fabricate information that is not in the contract."""
+
+
+def contract_prefix(contract_text: str) -> list:
+    """The stable leading messages: shared instructions, then the contract"""
+    from langchain_core.messages import HumanMessage, SystemMessage
+    return [
+        SystemMessage(content=SHARED_INSTRUCTIONS),
+        HumanMessage(content=f"<contract>\n{contract_text}\n</contract>"),
+    ]
+
+
+def build_messages(contract_text: str, step_instructions: str, step_input: str = None) -> list:
+    """
+    Messages for one node's call: shared prefix, then the node's instructions
+    and any node-specific data
+    """
+    from langchain_core.messages import HumanMessage
+    content = f"STEP INSTRUCTIONS:\n{step_instructions}"
+    if step_input:
+        content += f"\n\n{step_input}"
+    return contract_prefix(contract_text) + [HumanMessage(content=content)]
+
+
+def prefix_cache_key(messages: list):
+    """
+    Stable per-contract key for messages built with build_messages (None otherwise)
+    Sent as prompt_cache_key so calls sharing the prefix are routed to the same cache
+    """
+    if len(messages) < 2 or getattr(messages[0], "content", None) != SHARED_INSTRUCTIONS:
+        return None
+    return hashlib.sha256(str(messages[1].content).encode("utf-8")).hexdigest()[:32]
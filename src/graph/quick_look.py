@@ -0,0 +1,61 @@
+"""
+Quick-look extraction - instant, regex-only overview of a contract
+Used by /upload for the synchronous preliminary result and by graph nodes
+"""
+import re
+import time
+
+from src.graph.nodes.extract_company import regex_extract_company
+from src.graph.risk_rules import quick_scan
+from src.graph.date_extraction import DATE_RE
+
+AMOUNT_RE = re.compile(
+    r"(?:US\s?)?\$\s?\d[\d,]*(?:\.\d{1,2})?(?:\s?(?:k|K|million|thousand|M)\b)?"
+    r"|\b\d[\d,]*(?:\.\d{1,2})?\s?(?:USD|dollars)\b"
+    r"|\bUSD\s?\d[\d,]*(?:\.\d{1,2})?",
+)
+
+
+def _unique(values: list, limit: int) -> list:
+    seen = []
+    for value in values:
+        value = " ".join(value.split())
+        if value not in seen:
+            seen.append(value)
+        if len(seen) >= limit:
+            break
+    return seen
+
+
+def quick_look(contract_text: str, page_count: int = None, max_items: int = 20) -> dict:
+    """
+    Build a preliminary overview of the contract without any LLM calls
+
+    Args:
+        contract_text: Extracted contract text
+        page_count: Number of PDF pages, if known
+        max_items: Cap on dates/amounts returned
+
+    Returns:
+        Dict with company name, counts, detected dates and dollar amounts,
+        and rule-based red flags
+    """
+    start = time.perf_counter()
+    scan = quick_scan(contract_text)
+
+    result = {
+        "company_name": regex_extract_company(contract_text) or None,
+        "page_count": page_count,
+        "word_count": len(contract_text.split()),
+        "char_count": len(contract_text),
+        "dates": _unique([m.group(0) for m in DATE_RE.finditer(contract_text)], max_items),
+        "amounts": _unique(AMOUNT_RE.findall(contract_text), max_items),
+        "red_flags": [
+            {"category": r["category"], "level": r["level"], "reason": r["reason"],
+             "evidence": r["evidence"][0] if r["evidence"] else ""}
+            for r in scan["risks"]
+        ],
+        "overall_risk_score": scan["overall_risk_score"],
+    }
+    result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return result
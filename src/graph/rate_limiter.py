@@ -0,0 +1,331 @@
+"""
+Shared LLM rate limiter - token bucket over requests/min and tokens/min
+State lives in a local SQLite file so every thread and gunicorn worker on the
+host draws from the same budget. Waiting callers are served in start-time
+fair-queuing order, so one user's batch can't starve everyone else.
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+RATE_LIMIT_ENABLED = os.getenv("LLM_RATE_LIMIT", "1") == "1"
+RATE_LIMIT_DB = os.getenv("LLM_RATE_LIMIT_DB", os.path.join(tempfile.gettempdir(), "legal_agent_ratelimit.sqlite"))
+REQUESTS_PER_MINUTE = float(os.getenv("LLM_RPM", "500"))
+TOKENS_PER_MINUTE = float(os.getenv("LLM_TPM", "200000"))
+# Give up waiting for capacity after this many seconds
+MAX_WAIT_SECONDS = float(os.getenv("LLM_RATE_LIMIT_MAX_WAIT", "300"))
+
+POLL_SECONDS = 0.05
+# Waiters that stop polling (crashed worker) are dropped after this long
+STALE_WAITER_SECONDS = 30
+
+
+class RateLimitTimeout(RuntimeError):
+    """Raised when capacity doesn't free up within MAX_WAIT_SECONDS"""
+
+
+class RateLimiter:
+    """
+    Cross-process token bucket with per-user fair queuing
+
+    Each acquire() joins a queue ordered by a per-user virtual start time
+    (the user's previous virtual finish time, or the global clock if the user
+    has been idle). The head of the queue is served as soon as both buckets
+    have enough capacity.
+    """
+
+    def __init__(self, path: str = RATE_LIMIT_DB, rpm: float = REQUESTS_PER_MINUTE,
+                 tpm: float = TOKENS_PER_MINUTE):
+        self.path = path
+        self.rpm = rpm
+        self.tpm = tpm
+        self._local = threading.local()
+        self._init_db()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS bucket (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                requests REAL, tokens REAL, updated REAL,
+                blocked_until REAL, vclock REAL
+            );
+            CREATE TABLE IF NOT EXISTS waiters (
+                ticket INTEGER PRIMARY KEY AUTOINCREMENT,
+                user TEXT, vtime REAL, heartbeat REAL
+            );
+            CREATE TABLE IF NOT EXISTS users (
+                user TEXT PRIMARY KEY, vtime REAL
+            );
+        """)
+        conn.execute(
+            "INSERT OR IGNORE INTO bucket VALUES (1, ?, ?, ?, 0, 0)",
+            (self.rpm, self.tpm, time.time())
+        )
+
+    def _refill(self, conn, now: float) -> tuple:
+        requests, tokens, updated, blocked_until, vclock = conn.execute(
+            "SELECT requests, tokens, updated, blocked_until, vclock FROM bucket WHERE id = 1"
+        ).fetchone()
+        elapsed = max(0.0, now - updated)
+        requests = min(self.rpm, requests + elapsed * self.rpm / 60)
+        tokens = min(self.tpm, tokens + elapsed * self.tpm / 60)
+        return requests, tokens, blocked_until, vclock
+
+    def _enqueue(self, user: str, cost: float) -> int:
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            vclock = conn.execute("SELECT vclock FROM bucket WHERE id = 1").fetchone()[0]
+            row = conn.execute("SELECT vtime FROM users WHERE user = ?", (user,)).fetchone()
+            start = max(vclock, row[0] if row else 0.0)
+            conn.execute(
+                "INSERT INTO users (user, vtime) VALUES (?, ?) "
+                "ON CONFLICT(user) DO UPDATE SET vtime = excluded.vtime",
+                (user, start + cost)
+            )
+            cursor = conn.execute(
+                "INSERT INTO waiters (user, vtime, heartbeat) VALUES (?, ?, ?)", (user, start, now)
+            )
+            conn.execute("COMMIT")
+            return cursor.lastrowid
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def acquire(self, user: str, tokens: float, timeout: float = MAX_WAIT_SECONDS) -> float:
+        """
+        Block until one request and `tokens` tokens can be spent
+
+        Returns:
+            Seconds spent waiting
+        """
+        cost = min(float(tokens), self.tpm)
+        started = time.time()
+        ticket = self._enqueue(user or "anonymous", cost)
+        conn = self._conn()
+        try:
+            while True:
+                now = time.time()
+                wait = POLL_SECONDS
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.execute("DELETE FROM waiters WHERE heartbeat < ?", (now - STALE_WAITER_SECONDS,))
+                    conn.execute("UPDATE waiters SET heartbeat = ? WHERE ticket = ?", (now, ticket))
+                    head = conn.execute(
+                        "SELECT ticket, vtime FROM waiters ORDER BY vtime, ticket LIMIT 1"
+                    ).fetchone()
+                    if head and head[0] == ticket:
+                        requests, available, blocked_until, _ = self._refill(conn, now)
+                        if now >= blocked_until and requests >= 1 and available >= cost:
+                            conn.execute(
+                                "UPDATE bucket SET requests = ?, tokens = ?, updated = ?, vclock = ? WHERE id = 1",
+                                (requests - 1, available - cost, now, head[1])
+                            )
+                            conn.execute("DELETE FROM waiters WHERE ticket = ?", (ticket,))
+                            conn.execute("COMMIT")
+                            return now - started
+                        wait = max(
+                            blocked_until - now,
+                            (1 - requests) * 60 / self.rpm,
+                            (cost - available) * 60 / self.tpm,
+                            POLL_SECONDS
+                        )
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+
+                if now - started > timeout:
+                    raise RateLimitTimeout(f"Waited {timeout:.0f}s for LLM rate limit capacity")
+                # Re-check often enough to keep our heartbeat fresh
+                time.sleep(min(wait, 1.0))
+        except BaseException:
+            conn.execute("DELETE FROM waiters WHERE ticket = ?", (ticket,))
+            raise
+
+    def reconcile(self, estimated: float, actual: float):
+        """Return (or charge) the difference between estimated and actual token usage"""
+        if not actual:
+            return
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            requests, tokens, _, _ = self._refill(conn, time.time())
+            conn.execute(
+                "UPDATE bucket SET requests = ?, tokens = ?, updated = ? WHERE id = 1",
+                (requests, min(self.tpm, tokens + estimated - actual), time.time())
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def penalize(self, seconds: float):
+        """Pause everyone after a 429 from the provider"""
+        conn = self._conn()
+        conn.execute(
+            "UPDATE bucket SET blocked_until = MAX(blocked_until, ?) WHERE id = 1",
+            (time.time() + seconds,)
+        )
+
+    def queue_depth(self) -> dict:
+        """Number of waiting calls per user"""
+        rows = self._conn().execute("SELECT user, COUNT(*) FROM waiters GROUP BY user").fetchall()
+        return dict(rows)
+
+
+# Redis version of the same bucket + fair queue. Each script runs atomically on
+# the server and uses the server clock, so hosts with skewed clocks agree.
+_REFILL_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1e6
+local rpm, tpm = tonumber(ARGV[1]), tonumber(ARGV[2])
+local b = redis.call('HMGET', KEYS[1], 'requests', 'tokens', 'updated', 'blocked_until', 'vclock')
+local requests, tokens, updated = tonumber(b[1]) or rpm, tonumber(b[2]) or tpm, tonumber(b[3]) or now
+local elapsed = math.max(0, now - updated)
+requests = math.min(rpm, requests + elapsed * rpm / 60)
+tokens = math.min(tpm, tokens + elapsed * tpm / 60)
+local blocked_until, vclock = tonumber(b[4]) or 0, tonumber(b[5]) or 0
+"""
+
+_ENQUEUE_LUA = """
+local vclock = tonumber(redis.call('HGET', KEYS[1], 'vclock')) or 0
+local previous = tonumber(redis.call('HGET', KEYS[2], ARGV[1])) or 0
+local start = math.max(vclock, previous)
+redis.call('HSET', KEYS[2], ARGV[1], tostring(start + tonumber(ARGV[2])))
+local t = redis.call('TIME')
+local ticket = string.format('%020d', redis.call('INCR', KEYS[5])) .. ':' .. ARGV[1]
+redis.call('ZADD', KEYS[3], start, ticket)
+redis.call('HSET', KEYS[4], ticket, t[1])
+return ticket
+"""
+
+_ACQUIRE_LUA = _REFILL_LUA + """
+local ticket, cost, stale, poll = ARGV[3], tonumber(ARGV[4]), tonumber(ARGV[5]), tonumber(ARGV[6])
+local beats = redis.call('HGETALL', KEYS[3])
+for i = 1, #beats, 2 do
+    if tonumber(beats[i + 1]) < now - stale then
+        redis.call('ZREM', KEYS[2], beats[i])
+        redis.call('HDEL', KEYS[3], beats[i])
+    end
+end
+redis.call('HSET', KEYS[3], ticket, tostring(now))
+local head = redis.call('ZRANGE', KEYS[2], 0, 0, 'WITHSCORES')
+if head[1] ~= ticket then
+    return {0, tostring(poll)}
+end
+if now >= blocked_until and requests >= 1 and tokens >= cost then
+    redis.call('HSET', KEYS[1], 'requests', tostring(requests - 1), 'tokens', tostring(tokens - cost),
+               'updated', tostring(now), 'vclock', head[2])
+    redis.call('ZREM', KEYS[2], ticket)
+    redis.call('HDEL', KEYS[3], ticket)
+    return {1, '0'}
+end
+local wait = math.max(blocked_until - now, (1 - requests) * 60 / rpm, (cost - tokens) * 60 / tpm, poll)
+return {0, tostring(wait)}
+"""
+
+_RECONCILE_LUA = _REFILL_LUA + """
+tokens = math.min(tpm, tokens + tonumber(ARGV[3]))
+redis.call('HSET', KEYS[1], 'requests', tostring(requests), 'tokens', tostring(tokens), 'updated', tostring(now))
+"""
+
+_PENALIZE_LUA = """
+local t = redis.call('TIME')
+local until_ = tonumber(t[1]) + tonumber(t[2]) / 1e6 + tonumber(ARGV[1])
+local current = tonumber(redis.call('HGET', KEYS[1], 'blocked_until')) or 0
+redis.call('HSET', KEYS[1], 'blocked_until', tostring(math.max(current, until_)))
+"""
+
+
+class RedisRateLimiter:
+    """
+    RateLimiter with its bucket and waiter queue in Redis, shared by every
+    node using the same REDIS_URL (same interface and fairness rules)
+    """
+
+    def __init__(self, client, rpm: float = REQUESTS_PER_MINUTE, tpm: float = TOKENS_PER_MINUTE):
+        from src.graph.redis_client import redis_key
+        self.rpm = rpm
+        self.tpm = tpm
+        self.client = client
+        self.bucket = redis_key("ratelimit", "bucket")
+        self.users = redis_key("ratelimit", "users")
+        self.waiters = redis_key("ratelimit", "waiters")
+        self.heartbeats = redis_key("ratelimit", "heartbeats")
+        self.tickets = redis_key("ratelimit", "tickets")
+        self._enqueue = client.register_script(_ENQUEUE_LUA)
+        self._acquire = client.register_script(_ACQUIRE_LUA)
+        self._reconcile = client.register_script(_RECONCILE_LUA)
+        self._penalize = client.register_script(_PENALIZE_LUA)
+
+    def acquire(self, user: str, tokens: float, timeout: float = MAX_WAIT_SECONDS) -> float:
+        cost = min(float(tokens), self.tpm)
+        started = time.time()
+        ticket = self._enqueue(
+            keys=[self.bucket, self.users, self.waiters, self.heartbeats, self.tickets],
+            args=[user or "anonymous", cost]
+        )
+        try:
+            while True:
+                granted, wait = self._acquire(
+                    keys=[self.bucket, self.waiters, self.heartbeats],
+                    args=[self.rpm, self.tpm, ticket, cost, STALE_WAITER_SECONDS, POLL_SECONDS]
+                )
+                if int(granted):
+                    return time.time() - started
+                if time.time() - started > timeout:
+                    raise RateLimitTimeout(f"Waited {timeout:.0f}s for LLM rate limit capacity")
+                time.sleep(min(float(wait), 1.0))
+        except BaseException:
+            self.client.zrem(self.waiters, ticket)
+            self.client.hdel(self.heartbeats, ticket)
+            raise
+
+    def reconcile(self, estimated: float, actual: float):
+        if not actual:
+            return
+        self._reconcile(keys=[self.bucket], args=[self.rpm, self.tpm, estimated - actual])
+
+    def penalize(self, seconds: float):
+        self._penalize(keys=[self.bucket], args=[seconds])
+
+    def queue_depth(self) -> dict:
+        depth = {}
+        for ticket in self.client.zrange(self.waiters, 0, -1):
+            user = ticket.split(":", 1)[1]
+            depth[user] = depth.get(user, 0) + 1
+        return depth
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """
+    Process-wide limiter (None when LLM_RATE_LIMIT=0)
+    Shared through Redis when REDIS_URL is set, otherwise through the host's SQLite file
+    """
+    global _limiter
+    if not RATE_LIMIT_ENABLED:
+        return None
+    with _limiter_lock:
+        if _limiter is None:
+            from src.graph.redis_client import get_redis
+            client = get_redis()
+            _limiter = RedisRateLimiter(client) if client else RateLimiter()
+        return _limiter
@@ -0,0 +1,51 @@
+"""
+Optional Redis connection for running several web/worker nodes together
+With REDIS_URL set (redis://host:6379/0), the job queue, LLM response cache,
+rate limiter and progress events are shared through Redis. Without it, or if
+Redis can't be reached at startup, each of them falls back to its in-process
+(or host-local SQLite) backend.
+"""
+import os
+import threading
+
+REDIS_URL = os.getenv("REDIS_URL")
+# Namespace for every key, so several deployments can share one Redis
+REDIS_PREFIX = os.getenv("REDIS_PREFIX", "legal_agent")
+
+_client = None
+_checked = False
+_lock = threading.Lock()
+
+
+def get_redis():
+    """Shared Redis client (decoded strings), or None when not configured or unreachable"""
+    global _client, _checked
+    if not REDIS_URL:
+        return None
+    with _lock:
+        if not _checked:
+            _checked = True
+            try:
+                import redis
+                client = redis.Redis.from_url(
+                    REDIS_URL, decode_responses=True, socket_timeout=10,
+                    socket_connect_timeout=5, health_check_interval=30
+                )
+                client.ping()
+                _client = client
+                print(f"🧰 Using Redis at {_redacted(REDIS_URL)} for shared queues and caches")
+            except Exception as e:
+                print(f"⚠️ Redis unavailable ({e}), using in-process backends")
+        return _client
+
+
+def redis_key(*parts) -> str:
+    return ":".join([REDIS_PREFIX] + [str(p) for p in parts])
+
+
+def _redacted(url: str) -> str:
+    """redis://:secret@host -> redis://***@host"""
+    scheme, sep, rest = url.partition("://")
+    if "@" in rest:
+        rest = "***@" + rest.split("@", 1)[1]
+    return scheme + sep + rest
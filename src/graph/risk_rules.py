@@ -0,0 +1,199 @@
+"""
+Rule-based risk pre-screening - flags common risky contract language
+All rules are compiled into a single regex so the contract is scanned in one pass
+"""
+import re
+import sys
+import time
+from typing import NamedTuple, Optional
+
+
+class RiskRule(NamedTuple):
+    name: str
+    category: str
+    level: str
+    pattern: str
+    reason: str
+    recommendation: str
+
+
+RULES = [
+    RiskRule("perpetual", "Usage Rights", "High",
+             r"\bin\s+perpetuity\b|\bperpetual(?:ly)?\b",
+             "Rights are granted forever",
+             "Negotiate a fixed term (e.g. 6-12 months) for usage rights"),
+    RiskRule("irrevocable", "Usage Rights", "Medium",
+             r"\birrevocabl[ey]\b",
+             "Rights cannot be taken back even if the deal goes wrong",
+             "Ask for rights to be revocable on breach or non-payment"),
+    RiskRule("worldwide_royalty_free", "Usage Rights", "High",
+             r"\bworldwide,?\s+(?:non-exclusive,?\s+|exclusive,?\s+)?royalty[- ]free\b",
+             "Worldwide, royalty-free license to use the work",
+             "Limit territory and add usage fees beyond the initial term"),
+    RiskRule("universe", "Usage Rights", "High",
+             r"\bthroughout\s+the\s+universe\b",
+             "Unlimited territorial scope",
+             "Restrict usage to the markets the campaign actually targets"),
+    RiskRule("all_media", "Usage Rights", "High",
+             r"\b(?:any\s+and\s+all|all)\s+media,?\s+(?:whether\s+)?now\s+known\s+or\s+(?:hereafter|later)\s+(?:devised|developed|invented)\b",
+             "Content can be used in any format, including future ones",
+             "List the specific channels and formats allowed"),
+    RiskRule("work_for_hire", "Content Ownership", "High",
+             r"\bwork(?:s)?[\s-]+(?:made[\s-]+)?for[\s-]+hire\b",
+             "The other party owns the work outright as a work made for hire",
+             "Keep ownership and grant a limited license instead"),
+    RiskRule("assign_all_rights", "Content Ownership", "High",
+             r"\bassigns?\s+(?:to\s+\w+\s+)?all\s+(?:of\s+\w+\s+)?right,?\s+title,?\s+and\s+interest\b",
+             "All rights in the work are assigned away",
+             "Replace the assignment with a limited license"),
+    RiskRule("moral_rights", "Content Ownership", "Medium",
+             r"\bwaives?\s+(?:any\s+and\s+)?(?:all\s+)?moral\s+rights\b",
+             "Moral rights (credit, integrity of the work) are waived",
+             "Keep the right to be credited and to object to edits"),
+    RiskRule("exclusive", "Exclusivity", "Medium",
+             r"(?<!non-)(?<!non)(?<!non )\bexclusiv(?:e|ely|ity)\b",
+             "Exclusivity restricts working with other parties",
+             "Limit exclusivity to direct competitors and a short window"),
+    RiskRule("non_compete", "Exclusivity", "High",
+             r"\bnon[\s-]?compet(?:e|ition|itive)\b|\bshall\s+not\s+(?:promote|work\s+with|endorse)\s+(?:any\s+)?compet\w*",
+             "Non-compete limits future work",
+             "Narrow the competitor list, category and duration"),
+    RiskRule("long_net_terms", "Payment Terms", "High",
+             r"\bnet[\s-]?(?:6\d|[7-9]\d|1\d\d)\b(?:\s+days)?",
+             "Payment is due 60+ days after invoice",
+             "Ask for net 30 or a deposit up front"),
+    RiskRule("long_payment_window", "Payment Terms", "Medium",
+             r"\bwithin\s+(?:sixty|ninety|one\s+hundred\s+twenty|6\d|[7-9]\d|1\d\d)\s*(?:\(\d+\)\s*)?days?\s+(?:of|after|from)\s+(?:receipt\s+of\s+)?(?:an?\s+|the\s+)?(?:invoice|receipt|publication|posting|completion)\b",
+             "Long wait between delivery and payment",
+             "Shorten the payment window or tie it to delivery"),
+    RiskRule("payment_contingent", "Payment Terms", "Medium",
+             r"\b(?:payment|compensation|fee)s?\s+(?:is|are|shall\s+be)\s+(?:contingent|conditional)\s+(?:up)?on\b|\bsubject\s+to\s+(?:brand|client|company)(?:'s)?\s+(?:sole\s+)?(?:approval|satisfaction)\b",
+             "Payment depends on the other party's approval or satisfaction",
+             "Define objective acceptance criteria"),
+    RiskRule("unilateral_termination", "Termination", "Medium",
+             r"\bmay\s+terminate\s+(?:this\s+agreement\s+)?(?:at\s+any\s+time|for\s+any\s+reason|for\s+convenience|without\s+cause|immediately\s+upon\s+notice)\b",
+             "The other party can end the deal at will",
+             "Make termination mutual and require payment for work completed"),
+    RiskRule("sole_discretion", "Termination", "Medium",
+             r"\b(?:in|at)\s+(?:its|their)\s+sole\s+(?:and\s+absolute\s+)?discretion\b",
+             "Decisions are left entirely to the other party",
+             "Require decisions to be reasonable and in good faith"),
+    RiskRule("auto_renewal", "Termination", "Medium",
+             r"\bautomatically\s+renew(?:s|ed|al)?\b|\bauto[\s-]renew\w*",
+             "The agreement renews unless you remember to cancel",
+             "Require mutual written agreement to renew"),
+    RiskRule("indemnify", "Liability", "Medium",
+             r"\bindemnify,?\s+(?:and\s+)?(?:defend|hold\s+harmless)\b|\bhold\s+harmless\b",
+             "You may have to cover the other party's legal costs",
+             "Make indemnities mutual and cap them at the fee"),
+    RiskRule("unlimited_liability", "Liability", "High",
+             r"\bunlimited\s+liability\b|\bliability\s+shall\s+not\s+be\s+limited\b",
+             "No cap on what you could owe",
+             "Cap liability at the total fees paid"),
+    RiskRule("liquidated_damages", "Liability", "Medium",
+             r"\bliquidated\s+damages\b",
+             "Fixed penalties apply for breach",
+             "Make sure penalties are proportionate and mutual"),
+    RiskRule("unlimited_revisions", "Approval Process", "Medium",
+             r"\bunlimited\s+(?:revisions|rounds\s+of\s+revisions|edits|reshoots)\b",
+             "No limit on revisions or reshoots",
+             "Cap revisions (e.g. two rounds) and charge for extra"),
+    RiskRule("right_of_first_refusal", "Exclusivity", "Medium",
+             r"\bright\s+of\s+first\s+(?:refusal|negotiation)\b",
+             "The other party gets first claim on future deals",
+             "Limit the right to a short window or remove it"),
+]
+
+LEVEL_ORDER = {"Low": 0, "Medium": 1, "High": 2}
+
+_RULES_BY_NAME = {rule.name: rule for rule in RULES}
+_COMBINED = re.compile(
+    "|".join(f"(?P<{rule.name}>{rule.pattern})" for rule in RULES),
+    re.IGNORECASE
+)
+
+
+def prescreen(contract_text: str, context_chars: int = 80) -> list:
+    """
+    Scan the contract once and return every rule hit
+
+    Returns:
+        List of {"rule", "category", "level", "match", "start", "end", "snippet"}
+        ordered by position in the text
+    """
+    flags = []
+    for match in _COMBINED.finditer(contract_text or ""):
+        rule = _RULES_BY_NAME[match.lastgroup]
+        start, end = match.span()
+        snippet = contract_text[max(0, start - context_chars):end + context_chars]
+        flags.append({
+            "rule": rule.name,
+            "category": rule.category,
+            "level": rule.level,
+            "match": match.group(0),
+            "start": start,
+            "end": end,
+            "snippet": " ".join(snippet.split()),
+        })
+    return flags
+
+
+def flags_to_risks(flags: list) -> list:
+    """
+    Collapse individual hits into one risk entry per rule,
+    in the same shape the risk analysis node returns
+    """
+    grouped = {}
+    for flag in flags:
+        grouped.setdefault(flag["rule"], []).append(flag)
+
+    risks = []
+    for name, hits in grouped.items():
+        rule = _RULES_BY_NAME[name]
+        risks.append({
+            "category": rule.category,
+            "level": rule.level,
+            "reason": rule.reason,
+            "recommendation": rule.recommendation,
+            "source": "rules",
+            "evidence": [h["snippet"] for h in hits[:3]],
+            "offsets": [[h["start"], h["end"]] for h in hits],
+        })
+    risks.sort(key=lambda r: -LEVEL_ORDER[r["level"]])
+    return risks
+
+
+def highest_level(levels: list) -> Optional[str]:
+    """Most severe of a list of Low/Medium/High levels (None if empty)"""
+    known = [lvl for lvl in levels if lvl in LEVEL_ORDER]
+    return max(known, key=LEVEL_ORDER.get) if known else None
+
+
+def quick_scan(contract_text: str) -> dict:
+    """
+    Offline rule-only risk scan, no LLM calls
+    """
+    start = time.perf_counter()
+    flags = prescreen(contract_text)
+    risks = flags_to_risks(flags)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    return {
+        "risks": risks,
+        "flags": flags,
+        "overall_risk_score": highest_level([r["level"] for r in risks]) or "Low",
+        "elapsed_ms": round(elapsed_ms, 2),
+        "method": "rules",
+    }
+
+
+if __name__ == "__main__":
+    # python -m src.graph.risk_rules contract.txt
+    if len(sys.argv) != 2:
+        print("Usage: python -m src.graph.risk_rules <contract.txt>")
+        sys.exit(1)
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        result = quick_scan(f.read())
+    for risk in result["risks"]:
+        print(f"[{risk['level']}] {risk['category']}: {risk['reason']} ({len(risk['offsets'])} hits)")
+    print(f"Overall: {result['overall_risk_score']} in {result['elapsed_ms']} ms")
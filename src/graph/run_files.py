@@ -0,0 +1,26 @@
+"""
+Per-run output files - keeps concurrent and resumed runs from overwriting
+each other's summary / deliverables files
+"""
+import os
+import shutil
+
+RUNS_DIR = os.getenv("RUNS_DIR", os.path.join("data", "runs"))
+
+
+def run_file(state: dict, filename: str) -> str:
+    """
+    Path for a run's output file (data/runs/<run_id>/<filename>)
+    Falls back to the working directory when the run has no id
+    """
+    run_id = state.get("run_id")
+    if not run_id:
+        return filename
+    run_dir = os.path.join(RUNS_DIR, run_id)
+    os.makedirs(run_dir, exist_ok=True)
+    return os.path.join(run_dir, filename)
+
+
+def remove_run_files(run_id: str):
+    """Delete a run's output directory"""
+    shutil.rmtree(os.path.join(RUNS_DIR, run_id), ignore_errors=True)
@@ -0,0 +1,185 @@
+"""
+Contract section segmentation - split the contract into numbered sections
+Each section gets its heading and a lightweight classification (preamble,
+deliverables, payment, term, ip, ...) so nodes can send the LLM only the
+sections they need, and long contracts can be parsed section batch by
+section batch in parallel. Regex only, no LLM call.
+"""
+import os
+import re
+
+# Send nodes only their relevant sections (SECTION_ROUTING=0 sends the whole contract)
+SECTION_ROUTING = os.getenv("SECTION_ROUTING", "1") == "1"
+# Only route when the relevant sections are at most this share of the contract,
+# otherwise the full (cached) contract prefix is cheaper
+ROUTE_MAX_SHARE = float(os.getenv("SECTION_ROUTE_MAX_SHARE", "0.6"))
+
+HEADING_RES = [
+    # "Section 4. Payment", "ARTICLE IV - TERM", "Clause 2: Services"
+    re.compile(r"^(?:section|article|clause)\s+(?P<number>\d+|[IVXLC]+)\b[.:)\-–—]?\s*(?P<heading>.{0,100})$", re.IGNORECASE),
+    # "4. Payment", "4) Payment. Brand shall pay..." (top-level numbers only, 4.1 stays in its section)
+    re.compile(r"^(?P<number>\d{1,2})[.)]\s+(?P<heading>[A-Z][^\n]{0,200})$"),
+    # "EXHIBIT A - Deliverables", "Schedule 1"
+    re.compile(r"^(?P<number>(?:exhibit|schedule|appendix|annex)\s+[A-Z0-9]{1,3})\b[.:\-–—]?\s*(?P<heading>.{0,100})$", re.IGNORECASE),
+    # "IN WITNESS WHEREOF, the parties..."
+    re.compile(r"^(?P<heading>in witness whereof)\b", re.IGNORECASE),
+    # "COMPENSATION", "TERM AND TERMINATION" (short all-caps line)
+    re.compile(r"^(?P<heading>[A-Z][A-Z &/,\-']{3,60})$"),
+]
+
+KIND_PATTERNS = {
+    "deliverables": re.compile(
+        r"deliverable|scope of (?:work|services)|statement of work|\bservices\b|content|posts?\b|campaign|"
+        r"video|reel|stories|publish|go live", re.IGNORECASE),
+    "payment": re.compile(r"payment|compensation|\bfees?\b|invoice|remuneration|\$\s?\d|royalt", re.IGNORECASE),
+    "term": re.compile(r"\bterm\b|terminat|duration|expir|renew", re.IGNORECASE),
+    "ip": re.compile(
+        r"intellectual property|ownership|licen[cs]e|usage rights|copyright|trademark|work made for hire|"
+        r"right to use", re.IGNORECASE),
+    "exclusivity": re.compile(r"exclusiv|non-?compet|competitor", re.IGNORECASE),
+    "confidentiality": re.compile(r"confidential|non-?disclosure", re.IGNORECASE),
+    "liability": re.compile(r"indemn|liabilit|warrant|damages", re.IGNORECASE),
+    "definitions": re.compile(r"^definitions?\b|\bmeans\b", re.IGNORECASE),
+}
+# Body keyword hits needed to classify a section whose heading says nothing
+BODY_HITS = 2
+BODY_CHARS = 600
+
+# Section kinds each node needs
+NODE_SECTIONS = {
+    "extract_company": ["preamble", "signature"],
+    "extract_deliverables": ["preamble", "deliverables", "term", "exhibits"],
+}
+
+
+def segment_contract(contract_text: str) -> list:
+    """
+    Split the contract into sections
+
+    Returns:
+        List of {"index", "number", "heading", "kinds", "start", "end"} in
+        document order; start/end are offsets into contract_text. Text before
+        the first heading is the preamble.
+    """
+    headings = []
+    offset = 0
+    for line in contract_text.splitlines(keepends=True):
+        stripped = line.strip()
+        match = _match_heading(stripped)
+        if match:
+            headings.append((offset, match))
+        offset += len(line)
+
+    if not headings or headings[0][0] > 0:
+        headings.insert(0, (0, {"number": None, "heading": "Preamble", "kind": "preamble"}))
+
+    # A title line ("SPONSORSHIP AGREEMENT") opens the preamble
+    if headings[0][0] == 0 and not headings[0][1]["number"] and not headings[0][1].get("kind"):
+        headings[0] = (0, {**headings[0][1], "kind": "preamble"})
+
+    sections = []
+    for i, (start, match) in enumerate(headings):
+        end = headings[i + 1][0] if i + 1 < len(headings) else len(contract_text)
+        body = contract_text[start:end]
+        if not body.strip():
+            continue
+        sections.append({
+            "index": len(sections),
+            "number": match["number"],
+            "heading": match["heading"],
+            "kinds": [match["kind"]] if match.get("kind") else _classify(match["heading"], body),
+            "start": start,
+            "end": end,
+        })
+    return sections
+
+
+def _match_heading(line: str):
+    if not line or len(line) > 220:
+        return None
+    for pattern in HEADING_RES:
+        m = pattern.match(line)
+        if not m:
+            continue
+        groups = m.groupdict()
+        heading = (groups.get("heading") or "").strip()
+        number = groups.get("number")
+        # "4. Payment. Brand shall pay..." -> "Payment"
+        heading = re.split(r"(?<=[a-z])\.\s", heading, maxsplit=1)[0].rstrip(".:")[:80]
+        if number and re.match(r"exhibit|schedule|appendix|annex", number, re.IGNORECASE):
+            return {"number": number.title(), "heading": heading or number.title(), "kind": "exhibits"}
+        if heading.lower().startswith("in witness whereof"):
+            return {"number": None, "heading": "Signatures", "kind": "signature"}
+        if not number and len(heading.split()) > 6:
+            return None
+        return {"number": number, "heading": heading or f"Section {number}"}
+    return None
+
+
+def _classify(heading: str, body: str) -> list:
+    kinds = [kind for kind, pattern in KIND_PATTERNS.items() if pattern.search(heading)]
+    if kinds:
+        return kinds
+    sample = body[:BODY_CHARS]
+    kinds = [kind for kind, pattern in KIND_PATTERNS.items() if len(pattern.findall(sample)) >= BODY_HITS]
+    return kinds or ["general"]
+
+
+def get_sections(state: dict) -> list:
+    """Sections from the state, segmenting on the fly for older checkpoints"""
+    sections = state.get("contract_sections")
+    if sections is None:
+        sections = segment_contract(state.get("contract_text") or "")
+    return sections
+
+
+def sections_text(contract_text: str, sections: list) -> str:
+    """Text of the given sections, in document order"""
+    ordered = sorted(sections, key=lambda s: s["start"])
+    return "\n\n".join(contract_text[s["start"]:s["end"]].strip() for s in ordered)
+
+
+def select_sections(sections: list, kinds: list) -> list:
+    return [s for s in sections if set(s["kinds"]) & set(kinds)]
+
+
+def relevant_text(state: dict, node: str) -> str:
+    """
+    The part of the contract a node needs (its NODE_SECTIONS kinds)
+    Falls back to the full contract when routing is off, nothing matched, or
+    the selection isn't much smaller than the contract
+    """
+    contract_text = state.get("contract_text") or ""
+    kinds = NODE_SECTIONS.get(node)
+    if not SECTION_ROUTING or not kinds:
+        return contract_text
+    sections = get_sections(state)
+    selected = select_sections(sections, kinds)
+    if len(sections) < 2 or not selected:
+        return contract_text
+    text = sections_text(contract_text, selected)
+    if len(text) > ROUTE_MAX_SHARE * len(contract_text):
+        return contract_text
+    print(f"✂️ {node}: {len(selected)}/{len(sections)} sections, "
+          f"{len(text)}/{len(contract_text)} chars ({', '.join(kinds)})")
+    return text
+
+
+def section_batches(contract_text: str, sections: list, max_chars: int) -> list:
+    """
+    Group consecutive sections into batches of at most ~max_chars each
+    (a single longer section gets a batch of its own)
+    """
+    batches = []
+    current = []
+    size = 0
+    for section in sections:
+        length = section["end"] - section["start"]
+        if current and size + length > max_chars:
+            batches.append(current)
+            current, size = [], 0
+        current.append(section)
+        size += length
+    if current:
+        batches.append(current)
+    return [{"sections": batch, "text": sections_text(contract_text, batch)} for batch in batches]
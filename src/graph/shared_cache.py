@@ -0,0 +1,86 @@
+"""
+Result cache shared by every process (Redis) or local to this one
+Holds JSON-serializable values with a TTL: LLM responses keyed by model and
+prompt (see llm.py) and web research summaries keyed by term. With Redis,
+a result computed on one node is a cache hit on every other node.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from src.graph.redis_client import get_redis, redis_key
+
+# Entries kept by the in-process fallback (least recently used are evicted)
+MEMORY_CACHE_ENTRIES = int(os.getenv("MEMORY_CACHE_ENTRIES", "512"))
+
+
+class MemoryCache:
+    """In-process LRU with per-entry expiry"""
+
+    def __init__(self, max_entries: int = MEMORY_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, ttl: float):
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+
+class RedisCache:
+    """JSON values under the shared Redis namespace"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key: str):
+        try:
+            raw = self.client.get(redis_key("cache", key))
+        except Exception as e:
+            print(f"⚠️ Cache read failed: {e}")
+            return None
+        return json.loads(raw) if raw else None
+
+    def set(self, key: str, value, ttl: float):
+        try:
+            self.client.set(redis_key("cache", key), json.dumps(value), ex=max(1, int(ttl)))
+        except Exception as e:
+            print(f"⚠️ Cache write failed: {e}")
+
+
+def cache_key(namespace: str, *parts) -> str:
+    """Stable key from arbitrary JSON-serializable parts"""
+    digest = hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Redis-backed when REDIS_URL is reachable, in-process otherwise"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            client = get_redis()
+            _cache = RedisCache(client) if client else MemoryCache()
+        return _cache
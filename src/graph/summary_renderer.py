@@ -0,0 +1,106 @@
+"""
+Template summary renderer - markdown summary straight from structured state
+No LLM call: parsed_contract, risk_analysis, research_results and deliverables
+are rendered with Jinja templates (src/graph/templates/summary_<mode>.md.j2).
+"""
+import os
+import re
+
+from jinja2 import Environment, FileSystemLoader
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "templates")
+
+LEVEL_ICONS = {"High": "🔴", "Medium": "🟠", "Low": "🟢"}
+LEVEL_ORDER = {"High": 0, "Medium": 1, "Low": 2}
+
+
+def as_text(value) -> str:
+    """One readable line for a clause/obligation/term that may be a string, dict or list"""
+    if value is None:
+        return ""
+    if isinstance(value, dict):
+        title = value.get("title") or value.get("type") or value.get("name") or value.get("category")
+        body = value.get("text") or value.get("description") or value.get("details") or value.get("summary")
+        if title and body:
+            return f"**{title}**: {as_text(body)}"
+        named = {"title", "type", "name", "category", "text", "description", "details", "summary"}
+        rest = "; ".join(
+            f"{humanize(k)}: {as_text(v)}" for k, v in value.items()
+            if k not in named and v not in (None, "", [])
+        )
+        if title or body:
+            label = as_text(title or body)
+            return f"{label} ({rest})" if rest else label
+        return rest
+    if isinstance(value, (list, tuple)):
+        return ", ".join(as_text(v) for v in value if v not in (None, ""))
+    return " ".join(str(value).split())
+
+
+def humanize(key) -> str:
+    return str(key).replace("_", " ").strip().capitalize()
+
+
+def key_values(value) -> list:
+    """Payment terms etc. as 'Key: value' lines, whatever shape the parser returned"""
+    if not value:
+        return []
+    if isinstance(value, dict):
+        return [f"{humanize(k)}: {as_text(v)}" for k, v in value.items() if v not in (None, "", [], {})]
+    if isinstance(value, list):
+        return [as_text(v) for v in value if v]
+    return [as_text(value)]
+
+
+def mentioning(items, *words) -> list:
+    """Items whose text mentions any of the words (e.g. termination clauses)"""
+    pattern = re.compile("|".join(re.escape(w) for w in words), re.IGNORECASE)
+    return [item for item in items or [] if pattern.search(as_text(item))]
+
+
+def sorted_risks(risks) -> list:
+    risks = [r for r in risks or [] if isinstance(r, dict)]
+    return sorted(risks, key=lambda r: LEVEL_ORDER.get(r.get("level"), 3))
+
+
+def format_deadline(deliverable: dict) -> str:
+    when = deliverable.get("start_date") or ""
+    if deliverable.get("start_time"):
+        when += f" {deliverable['start_time']}"
+        if deliverable.get("timezone"):
+            when += f" {deliverable['timezone']}"
+    return when
+
+
+_env = Environment(
+    loader=FileSystemLoader(TEMPLATES_DIR),
+    autoescape=False,  # markdown, not HTML
+    trim_blocks=True,
+    lstrip_blocks=True,
+    keep_trailing_newline=True,
+)
+_env.filters.update({
+    "as_text": as_text,
+    "key_values": key_values,
+    "mentioning": mentioning,
+    "sorted_risks": sorted_risks,
+    "deadline": format_deadline,
+})
+_env.globals["level_icon"] = lambda level: LEVEL_ICONS.get(level, "⚪")
+
+
+def render_summary(state: dict) -> str:
+    """Render the contract summary markdown for the state's mode"""
+    mode = "creator" if state.get("mode") == "creator" else "legal"
+    template = _env.get_template(f"summary_{mode}.md.j2")
+    research = state.get("research_results") or {}
+    terms = research.get("terms") if (research.get("searched") or research.get("explained")) else None
+    markdown = template.render(
+        company_name=state.get("company_name"),
+        contract=state.get("parsed_contract") or {},
+        risk=state.get("risk_analysis") or {},
+        terms=terms or {},
+        deliverables=state.get("deliverables") or [],
+    )
+    # Collapse runs of blank lines left by empty sections
+    return re.sub(r"\n{3,}", "\n\n", markdown).strip() + "\n"
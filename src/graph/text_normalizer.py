@@ -0,0 +1,167 @@
+"""
+Contract text normalization - run once on the extracted PDF pages
+Strips running headers/footers, page numbers and "Confidential" stamps,
+re-joins words hyphenated across line breaks and collapses whitespace, so
+every LLM prompt downstream is smaller. Signature blocks and exhibits can
+optionally be dropped too.
+"""
+import math
+import os
+import re
+from collections import Counter
+
+# Drop "IN WITNESS WHEREOF" signature blocks and blank signature fields
+DROP_SIGNATURES = os.getenv("NORMALIZE_DROP_SIGNATURES", "0") == "1"
+# Drop exhibits/schedules at the end of the contract (they can hold deliverable details)
+DROP_EXHIBITS = os.getenv("NORMALIZE_DROP_EXHIBITS", "0") == "1"
+
+# Lines at the top/bottom of a page checked for running headers/footers
+EDGE_LINES = 3
+# A header/footer must repeat on at least this share of pages
+REPEAT_RATIO = 0.6
+
+PAGE_NUMBER_RE = re.compile(
+    r"^[-–—\s]*(?:page\s*)?\d{1,4}(?:\s*(?:of|/)\s*\d{1,4})?[-–—\s]*$", re.IGNORECASE
+)
+STAMP_RE = re.compile(
+    r"^(?:strictly\s+|highly\s+)?(?:confidential|proprietary)(?:\s*(?:and|&)\s*(?:confidential|proprietary))?"
+    r"(?:\s+(?:draft|document))?$|^(?:draft|execution copy|for discussion purposes only)$",
+    re.IGNORECASE
+)
+HYPHEN_BREAK_RE = re.compile(r"([A-Za-z])-\n([a-z])")
+SPACES_RE = re.compile(r"[ \t ]+")
+SIGNATURE_START_RE = re.compile(r"^\s*in witness whereof", re.IGNORECASE)
+SIGNATURE_FIELD_RE = re.compile(
+    r"^\s*(?:(?:by|name|title|date|signature|its)\s*:?\s*)?_{3,}[\s_]*$|^\s*(?:by|signature)\s*:\s*$",
+    re.IGNORECASE
+)
+# A heading line only ("EXHIBIT A", "Schedule 2 - Deliverables", "ANNEX IV PRICING"), never body text
+# like "Schedule of Payments" or "Exhibit A sets forth..."; the identifier is case-sensitive
+EXHIBIT_RE = re.compile(
+    r"^\s*(?i:exhibit|schedule|appendix|annex)\s+(?:[A-Z]|\d+|[IVX]+)(?:-\d+)?"
+    r"(?:\s*[:.\-–—]\s*[^.;]{0,80}|\s+[A-Z0-9][A-Z0-9 &,'/()-]{0,80})?\s*$"
+)
+SECTION_RE = re.compile(r"^\s*(?:\d+(?:\.\d+)*|section\s+\d+|article\s+[IVX\d]+)[.:)]?\s+\S", re.IGNORECASE)
+# The only headings ranking above an exhibit; numbered sections inside an exhibit belong to it
+ARTICLE_RE = re.compile(r"^\s*article\s+[IVX\d]+\b", re.IGNORECASE)
+# A signature block never runs longer than this
+MAX_SIGNATURE_LINES = 25
+
+
+def _line_key(line: str, page_number: int) -> str:
+    """Header/footer identity ignoring case, spacing and the page's own number ("Acme - 3")"""
+    key = SPACES_RE.sub(" ", line.strip().lower())
+    return re.sub(rf"(?<!\d){page_number}(?!\d)", "#", key)
+
+
+def _edge_keys(lines: list, page_number: int) -> set:
+    """(position, key) for the lines at the top and bottom of a page"""
+    top = [(i, line) for i, line in enumerate(lines[:EDGE_LINES])]
+    bottom = [(i - len(lines), line) for i, line in enumerate(lines) if i >= len(lines) - EDGE_LINES]
+    return {(pos, _line_key(line, page_number)) for pos, line in top + bottom if line.strip()}
+
+
+def _repeated_edge_lines(pages: list) -> set:
+    """(position, key) of lines found in the same spot at the top/bottom of most pages"""
+    counts = Counter()
+    for number, lines in enumerate(pages, start=1):
+        counts.update(_edge_keys(lines, number))
+    threshold = max(2, math.ceil(len(pages) * REPEAT_RATIO))
+    return {key for key, count in counts.items() if count >= threshold}
+
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken when available, ~4 chars/token otherwise"""
+    try:
+        import tiktoken
+        return len(tiktoken.get_encoding("o200k_base").encode(text, disallowed_special=()))
+    except Exception:
+        return len(text) // 4
+
+
+def normalize_pages(pages: list, drop_signatures: bool = DROP_SIGNATURES,
+                    drop_exhibits: bool = DROP_EXHIBITS) -> tuple:
+    """
+    Clean extracted page text and join it into one contract string
+
+    Args:
+        pages: Text of each PDF page
+        drop_signatures: Remove signature blocks and blank signature fields
+        drop_exhibits: Remove exhibits/schedules that follow the main agreement
+
+    Returns:
+        (text, stats) where stats reports what was removed and tokens saved
+    """
+    raw = "\n".join(pages)
+    removed = Counter()
+    page_lines = [page.splitlines() for page in pages]
+    repeated = _repeated_edge_lines(page_lines) if len(pages) > 1 else set()
+
+    kept_pages = []
+    for number, lines in enumerate(page_lines, start=1):
+        kept = []
+        for i, line in enumerate(lines):
+            stripped = line.strip()
+            at_edge = i < EDGE_LINES or i >= len(lines) - EDGE_LINES
+            position = i if i < EDGE_LINES else i - len(lines)
+            if not stripped:
+                kept.append("")
+            elif at_edge and PAGE_NUMBER_RE.match(stripped):
+                removed["page_numbers"] += 1
+            elif at_edge and (position, _line_key(stripped, number)) in repeated:
+                removed["headers_footers"] += 1
+            elif STAMP_RE.match(stripped):
+                removed["stamps"] += 1
+            else:
+                kept.append(SPACES_RE.sub(" ", stripped))
+        kept_pages.append("\n".join(kept))
+
+    text = "\n".join(kept_pages)
+    text, hyphenations = HYPHEN_BREAK_RE.subn(r"\1\2", text)
+    removed["hyphenations"] = hyphenations
+
+    if drop_signatures or drop_exhibits:
+        text = _drop_boilerplate(text, drop_signatures, drop_exhibits, removed)
+
+    text = re.sub(r"\n{3,}", "\n\n", text).strip()
+
+    tokens_before = count_tokens(raw)
+    tokens_after = count_tokens(text)
+    stats = {
+        "chars_before": len(raw),
+        "chars_after": len(text),
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "tokens_saved": tokens_before - tokens_after,
+        "percent_saved": round(100 * (tokens_before - tokens_after) / tokens_before, 1) if tokens_before else 0.0,
+        "removed": {key: count for key, count in removed.items() if count},
+    }
+    return text, stats
+
+
+def _drop_boilerplate(text: str, drop_signatures: bool, drop_exhibits: bool, removed: Counter) -> str:
+    lines = text.split("\n")
+    kept = []
+    in_signature = in_exhibit = False
+    signature_lines = 0
+    for line in lines:
+        if EXHIBIT_RE.match(line):
+            in_signature = False
+            in_exhibit = drop_exhibits
+        elif in_exhibit and ARTICLE_RE.match(line):
+            # Back in the body of the contract (the next exhibit heading starts a new exhibit above)
+            in_exhibit = False
+        elif drop_signatures and SIGNATURE_START_RE.match(line):
+            in_signature = True
+            signature_lines = 0
+        elif in_signature and (SECTION_RE.match(line) or signature_lines >= MAX_SIGNATURE_LINES):
+            in_signature = False
+        signature_lines += in_signature
+
+        if in_exhibit:
+            removed["exhibit_lines"] += 1
+        elif in_signature or (drop_signatures and SIGNATURE_FIELD_RE.match(line)):
+            removed["signature_lines"] += 1
+        else:
+            kept.append(line)
+    return "\n".join(kept)
@@ -0,0 +1,262 @@
+"""
+Token and cost accounting per run, with per-run and per-user daily budgets
+Every LLM call's prompt/completion/cached token usage is added to the run's
+ledger (per node and in total), copied into state["usage"] after each node
+and saved with the run. Spend also accrues to the user's daily total (UTC
+day), shared through Redis when REDIS_URL is set, in a local SQLite file
+otherwise.
+
+Once a run passes RUN_BUDGET_USD or its user passes USER_DAILY_BUDGET_USD,
+the rest of the run is downgraded instead of stopped: optional nodes
+(research_terms) are skipped, the summary uses the template, and the model
+cascade no longer escalates to the strong tier. A legal-mode run that starts
+with the user already over budget runs in express mode.
+
+CLI:
+    python -m src.graph.usage report [--days 7]
+"""
+import argparse
+import contextvars
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+
+from src.graph.redis_client import get_redis, redis_key
+
+# 0 = unlimited
+RUN_BUDGET_USD = float(os.getenv("RUN_BUDGET_USD", "0"))
+USER_DAILY_BUDGET_USD = float(os.getenv("USER_DAILY_BUDGET_USD", "0"))
+USAGE_DB = os.getenv("USAGE_DB", os.path.join("data", "usage.sqlite"))
+# Cached prompt tokens are billed at this fraction of the input price
+CACHED_INPUT_PRICE_RATIO = float(os.getenv("LLM_CACHED_INPUT_PRICE_RATIO", "0.1"))
+# Redis keeps daily totals this long
+DAILY_TTL_SECONDS = 8 * 86400
+
+TOKEN_FIELDS = ("input_tokens", "cached_tokens", "output_tokens", "reasoning_tokens", "total_tokens")
+
+# Ledger of the run executing in this context (set by run_legal_analysis)
+run_usage = contextvars.ContextVar("run_usage", default=None)
+
+_conn = None
+_lock = threading.Lock()
+
+
+def _empty_totals() -> dict:
+    return {"calls": 0, "cached_responses": 0, **{f: 0 for f in TOKEN_FIELDS}, "cost_usd": 0.0}
+
+
+def call_cost(model: str, input_tokens: int, cached_tokens: int, output_tokens: int) -> float:
+    """USD for one call at the cascade's MODEL_PRICES (dated model names match their base name)"""
+    from src.graph.cascade import MODEL_PRICES
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        base = max((name for name in MODEL_PRICES if model and model.startswith(name)), key=len, default=None)
+        prices = MODEL_PRICES.get(base, (0.0, 0.0))
+    price_in, price_out = prices
+    uncached = input_tokens - cached_tokens
+    return (uncached * price_in + cached_tokens * price_in * CACHED_INPUT_PRICE_RATIO
+            + output_tokens * price_out) / 1_000_000
+
+
+class RunUsage:
+    """Token usage and cost of one run, per node"""
+
+    def __init__(self, run_id: str = None, user: str = None, previous: dict = None):
+        self.run_id = run_id
+        self.user = user
+        self.nodes = {node: dict(totals) for node, totals in ((previous or {}).get("nodes") or {}).items()}
+        self.downgrades = list((previous or {}).get("downgrades") or [])
+        self._lock = threading.Lock()
+
+    def add(self, node: str, model: str, response) -> dict:
+        """Add one LLM response's usage under node; returns the call's tokens and cost"""
+        usage = getattr(response, "usage_metadata", None) or {}
+        metadata = getattr(response, "response_metadata", None) or {}
+        call = {
+            "input_tokens": usage.get("input_tokens") or 0,
+            "cached_tokens": (usage.get("input_token_details") or {}).get("cache_read") or 0,
+            "output_tokens": usage.get("output_tokens") or 0,
+            "reasoning_tokens": (usage.get("output_token_details") or {}).get("reasoning") or 0,
+            "total_tokens": usage.get("total_tokens") or 0,
+        }
+        call["cost_usd"] = call_cost(model, call["input_tokens"], call["cached_tokens"], call["output_tokens"])
+        with self._lock:
+            totals = self.nodes.setdefault(node, _empty_totals())
+            totals["calls"] += 1
+            if metadata.get("cache_hit"):
+                totals["cached_responses"] += 1
+            for field in TOKEN_FIELDS:
+                totals[field] += call[field]
+            totals["cost_usd"] += call["cost_usd"]
+        return call
+
+    def total(self) -> dict:
+        with self._lock:
+            total = _empty_totals()
+            for totals in self.nodes.values():
+                for key in total:
+                    total[key] += totals.get(key) or 0
+        total["cost_usd"] = round(total["cost_usd"], 6)
+        return total
+
+    def downgrade(self, reason: str):
+        with self._lock:
+            if reason not in self.downgrades:
+                self.downgrades.append(reason)
+                print(f"💸 Run {self.run_id}: {reason}")
+
+    def snapshot(self) -> dict:
+        """JSON-serializable view stored in state["usage"]"""
+        total = self.total()
+        with self._lock:
+            nodes = {node: {**totals, "cost_usd": round(totals["cost_usd"], 6)} for node, totals in self.nodes.items()}
+            downgrades = list(self.downgrades)
+        return {"total": total, "nodes": nodes, "downgrades": downgrades, "budget_usd": RUN_BUDGET_USD or None}
+
+
+def start_run_usage(run_id: str, user: str, previous: dict = None) -> RunUsage:
+    """Open the ledger for the current run (previous: state["usage"] of a resumed run)"""
+    ledger = RunUsage(run_id, user, previous)
+    run_usage.set(ledger)
+    return ledger
+
+
+def record_llm_usage(node: str, model: str, response, user: str = None):
+    """Charge an LLM response to the current run and its user's daily total"""
+    ledger = run_usage.get()
+    if ledger is None:
+        return
+    call = ledger.add(node, model, response)
+    user = user or ledger.user
+    if user and (call["total_tokens"] or call["cost_usd"]):
+        add_daily_spend(user, call["total_tokens"], call["cost_usd"])
+
+
+def budget_exceeded(ledger: RunUsage = None) -> str:
+    """Why the current run should be downgraded, or None while it is within budget"""
+    ledger = ledger or run_usage.get()
+    if ledger is None:
+        return None
+    if RUN_BUDGET_USD and ledger.total()["cost_usd"] >= RUN_BUDGET_USD:
+        return f"run budget of ${RUN_BUDGET_USD:.2f} reached"
+    if USER_DAILY_BUDGET_USD and ledger.user and daily_spend(ledger.user)["cost_usd"] >= USER_DAILY_BUDGET_USD:
+        return f"daily budget of ${USER_DAILY_BUDGET_USD:.2f} for {ledger.user} reached"
+    return None
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def _connection() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        directory = os.path.dirname(USAGE_DB)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(USAGE_DB, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS daily_usage (
+                user_email TEXT NOT NULL,
+                day TEXT NOT NULL,
+                tokens INTEGER NOT NULL DEFAULT 0,
+                cost_usd REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_email, day)
+            )
+        """)
+        conn.commit()
+        _conn = conn
+    return _conn
+
+
+def add_daily_spend(user: str, tokens: int, cost_usd: float, day: str = None):
+    day = day or _today()
+    client = get_redis()
+    if client:
+        try:
+            pipe = client.pipeline()
+            pipe.hincrby(redis_key("usage", "tokens", day), user, int(tokens))
+            pipe.hincrbyfloat(redis_key("usage", "cost", day), user, cost_usd)
+            for kind in ("tokens", "cost"):
+                pipe.expire(redis_key("usage", kind, day), DAILY_TTL_SECONDS)
+            pipe.execute()
+            return
+        except Exception as e:
+            print(f"⚠️ Daily usage not shared: {e}")
+    with _lock:
+        conn = _connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO daily_usage (user_email, day, tokens, cost_usd) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (user_email, day) DO UPDATE SET "
+                "tokens = tokens + excluded.tokens, cost_usd = cost_usd + excluded.cost_usd",
+                (user, day, int(tokens), cost_usd)
+            )
+
+
+def daily_spend(user: str, day: str = None) -> dict:
+    """{"tokens", "cost_usd"} the user has spent on the given UTC day (today by default)"""
+    day = day or _today()
+    client = get_redis()
+    if client:
+        try:
+            tokens = client.hget(redis_key("usage", "tokens", day), user)
+            cost = client.hget(redis_key("usage", "cost", day), user)
+            return {"tokens": int(tokens or 0), "cost_usd": float(cost or 0)}
+        except Exception as e:
+            print(f"⚠️ Daily usage unavailable: {e}")
+    with _lock:
+        row = _connection().execute(
+            "SELECT tokens, cost_usd FROM daily_usage WHERE user_email = ? AND day = ?", (user, day)
+        ).fetchone()
+    return {"tokens": row[0], "cost_usd": row[1]} if row else {"tokens": 0, "cost_usd": 0.0}
+
+
+def daily_report(days: int = 7) -> dict:
+    """{day: {user: {"tokens", "cost_usd"}}} for the last `days` UTC days"""
+    today = datetime.now(timezone.utc)
+    day_list = [(today - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days)]
+    report = {}
+    client = get_redis()
+    if client:
+        try:
+            for d in day_list:
+                tokens = client.hgetall(redis_key("usage", "tokens", d))
+                costs = client.hgetall(redis_key("usage", "cost", d))
+                if tokens or costs:
+                    report[d] = {
+                        user: {"tokens": int(tokens.get(user) or 0), "cost_usd": round(float(costs.get(user) or 0), 6)}
+                        for user in set(tokens) | set(costs)
+                    }
+            return report
+        except Exception as e:
+            print(f"⚠️ Daily usage unavailable: {e}")
+    placeholders = ", ".join("?" for _ in day_list)
+    with _lock:
+        rows = _connection().execute(
+            f"SELECT day, user_email, tokens, cost_usd FROM daily_usage WHERE day IN ({placeholders})", day_list
+        ).fetchall()
+    for d, user, tokens, cost in rows:
+        report.setdefault(d, {})[user] = {"tokens": tokens, "cost_usd": round(cost, 6)}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM token usage and cost per user")
+    sub = parser.add_subparsers(dest="command", required=True)
+    report_cmd = sub.add_parser("report", help="Daily spend per user")
+    report_cmd.add_argument("--days", type=int, default=7)
+    args = parser.parse_args()
+
+    report = daily_report(args.days)
+    for day in sorted(report, reverse=True):
+        for user, spend in sorted(report[day].items(), key=lambda item: -item[1]["cost_usd"]):
+            print(f"{day}  {user:<40} {spend['tokens']:>10} tokens  ${spend['cost_usd']:.4f}")
+    if not report:
+        print(f"No LLM usage recorded in the last {args.days} days")
+
+
+if __name__ == "__main__":
+    main()
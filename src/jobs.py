@@ -0,0 +1,441 @@
+"""
+Background job runner for contract analyses
+Lets /upload return immediately while the LangGraph run continues
+
+With REDIS_URL set, jobs go through a shared Redis queue instead: any web
+node can submit or report on a job, and every node running workers (web
+processes, plus `python -m src.jobs worker` on dedicated worker hosts) takes
+jobs from the same queue.
+
+Queued jobs run shortest-first rather than in arrival order: each job carries
+an estimated run time (from its contract's token count and mode), and the
+job with the lowest estimate minus SCHEDULER_AGING x seconds waited runs
+next, so a long MSA can't hold up a batch of short briefs but is never
+starved by them either. A per-user priority shifts that by
+PRIORITY_STEP_SECONDS per level.
+"""
+import argparse
+import heapq
+import importlib
+import itertools
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import Counter, deque
+
+MAX_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "2"))
+# Finished jobs are forgotten after this many seconds
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "3600"))
+# Redis queue: web processes also run this many workers (0 for submit-only web nodes)
+WEB_WORKERS = int(os.getenv("JOB_WEB_WORKERS", str(MAX_WORKERS)))
+# A running job whose worker hasn't checked in for this long is assumed lost and requeued
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "1800"))
+# Redis queue: workers refresh the heartbeat of the job they are running this often
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "60"))
+# Seconds of estimated run time a queued job gains per second it waits (0 = pure SJF)
+SCHEDULER_AGING = float(os.getenv("SCHEDULER_AGING", "1.0"))
+# Seconds of estimated run time each priority level is worth
+PRIORITY_STEP_SECONDS = float(os.getenv("PRIORITY_STEP_SECONDS", "120"))
+# Recent queue waits kept for the metrics
+WAIT_SAMPLES = 500
+# Rough run time per mode: (fixed seconds, seconds per 1k contract tokens)
+MODE_COST = {"legal": (20.0, 1.5), "creator": (25.0, 2.0), "express": (6.0, 0.5)}
+# Contract tokens assumed per page when only the page count is known
+TOKENS_PER_PAGE = 600
+
+
+def load_user_priorities() -> dict:
+    """user -> priority level from USER_PRIORITIES="ceo@acme.com:2,api:bulk:-1" (default 0)"""
+    priorities = {}
+    for entry in os.getenv("USER_PRIORITIES", "").split(","):
+        user, _, level = entry.strip().rpartition(":")
+        try:
+            priorities[user] = int(level)
+        except ValueError:
+            continue
+    return priorities
+
+
+USER_PRIORITIES = load_user_priorities()
+
+
+def estimate_run_seconds(contract_text: str = "", mode: str = "legal", page_count: int = None) -> float:
+    """Expected analysis time from the contract's size and the mode's pipeline"""
+    fixed, per_1k = MODE_COST.get(mode, MODE_COST["legal"])
+    if contract_text:
+        from src.graph.text_normalizer import count_tokens
+        tokens = count_tokens(contract_text)
+    else:
+        tokens = (page_count or 0) * TOKENS_PER_PAGE
+    return round(fixed + per_1k * tokens / 1000, 1)
+
+
+def schedule_score(cost: float, priority: int, submitted_at: float) -> float:
+    """
+    Lower runs first. Aging lowers every waiting job's score at the same rate,
+    so ordering by cost + aging x submission time is the same as ordering by
+    cost - aging x seconds waited, and the score never needs recomputing.
+    """
+    return cost - priority * PRIORITY_STEP_SECONDS + SCHEDULER_AGING * submitted_at
+
+
+def queue_metrics(queued: list, running: int, waits: list) -> dict:
+    """Queue depth and wait times from the queued jobs and recent waits"""
+    now = time.time()
+    waits = sorted(waits)
+
+    def percentile(q):
+        return round(waits[min(len(waits) - 1, int(q * len(waits)))], 1) if waits else 0
+
+    return {
+        "queued": len(queued),
+        "running": running,
+        "queued_by_user": dict(Counter(job.get("user") or "unknown" for job in queued)),
+        "queued_estimated_seconds": round(sum(job.get("cost") or 0 for job in queued), 1),
+        "oldest_queued_seconds": round(max((now - job["submitted_at"] for job in queued), default=0), 1),
+        "wait_seconds": {
+            "samples": len(waits),
+            "p50": percentile(0.5),
+            "p95": percentile(0.95),
+            "max": round(waits[-1], 1) if waits else 0,
+        },
+    }
+
+
+class JobManager:
+    """
+    Runs analysis functions on worker threads, shortest estimated job first,
+    and tracks their status
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS):
+        self.workers = max_workers
+        self._jobs = {}
+        self._queue = []
+        self._order = itertools.count()
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._started = False
+
+    def submit(self, fn, *args, cost: float = 0.0, user: str = None, priority: int = None,
+               owner: str = None, **kwargs) -> str:
+        """
+        Queue fn(*args, **kwargs) and return a job id. cost (estimated
+        seconds), user and priority only steer scheduling; priority defaults
+        to the user's USER_PRIORITIES level. owner is stored with the job so
+        callers can restrict who reads it.
+        """
+        job_id = uuid.uuid4().hex
+        priority = USER_PRIORITIES.get(user, 0) if priority is None else priority
+        now = time.time()
+        with self._lock:
+            self._prune()
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "status": "queued",
+                "submitted_at": now,
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None,
+                "cost": cost,
+                "user": user,
+                "priority": priority,
+                "owner": owner,
+            }
+            # The counter breaks ties in submission order
+            score = schedule_score(cost, priority, now)
+            heapq.heappush(self._queue, (score, next(self._order), job_id, fn, args, kwargs))
+            self._ready.notify()
+        self.start_workers()
+        return job_id
+
+    def start_workers(self, count: int = None):
+        """Start the worker threads (once, on first use so they survive a pre-fork import)"""
+        count = self.workers if count is None else count
+        with self._lock:
+            if self._started or count <= 0:
+                return
+            self._started = True
+        for i in range(count):
+            threading.Thread(target=self._work, name=f"analysis-{i}", daemon=True).start()
+
+    def _work(self):
+        while True:
+            with self._ready:
+                while not self._queue:
+                    self._ready.wait()
+                _, _, job_id, fn, args, kwargs = heapq.heappop(self._queue)
+            self._run(job_id, fn, args, kwargs)
+
+    def _run(self, job_id: str, fn, args, kwargs):
+        started = time.time()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                job.update(status="running", started_at=started)
+                self._waits.append(started - job["submitted_at"])
+        try:
+            result = fn(*args, **kwargs)
+            self._update(job_id, status="done", result=result, finished_at=time.time())
+        except Exception as e:
+            print(f"❌ Job {job_id} failed: {e}")
+            self._update(job_id, status="failed", error=str(e), finished_at=time.time())
+
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def _prune(self):
+        cutoff = time.time() - JOB_TTL_SECONDS
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["finished_at"] and job["finished_at"] < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> dict:
+        """Snapshot of a job's status (None if unknown)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def metrics(self) -> dict:
+        """Queue depth, queued work per user and recent wait times"""
+        with self._lock:
+            queued = [dict(self._jobs[entry[2]]) for entry in self._queue if entry[2] in self._jobs]
+            running = sum(1 for job in self._jobs.values() if job["status"] == "running")
+            waits = list(self._waits)
+        return queue_metrics(queued, running, waits)
+
+
+class RedisJobManager:
+    """
+    JobManager over a shared Redis queue (same submit/get interface)
+
+    A job is a hash (status, timestamps, function path, JSON arguments,
+    result) plus its id on the pending sorted set, scored by schedule_score.
+    Workers atomically move the lowest-scored id to a processing list while
+    they run it, refreshing the job's heartbeat; ids left there by a dead
+    worker are requeued once the heartbeat is older than the lease.
+    Arguments and results must be JSON-serializable and the function
+    importable by module path.
+    """
+
+    # Lowest score off the pending set and onto the processing list, claimed
+    # (status and heartbeat) in the same step so it never looks stale there
+    POP_SCRIPT = """
+    local popped = redis.call('ZPOPMIN', KEYS[1])
+    if popped[1] then
+        redis.call('LPUSH', KEYS[2], popped[1])
+        redis.call('HSET', ARGV[1] .. popped[1], 'status', 'running', 'heartbeat_at', ARGV[2])
+        return popped[1]
+    end
+    return false
+    """
+    # Idle workers check for new jobs this often
+    POLL_SECONDS = 0.5
+
+    def __init__(self, client, workers: int = WEB_WORKERS):
+        from src.graph.redis_client import redis_key
+        self.client = client
+        self.pending = redis_key("jobs", "pending")
+        self.processing = redis_key("jobs", "processing")
+        self.waits = redis_key("jobs", "waits")
+        self._pop = client.register_script(self.POP_SCRIPT)
+        self._key = lambda job_id: redis_key("job", job_id)
+        self.workers = workers
+        self._started = False
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, cost: float = 0.0, user: str = None, priority: int = None,
+               owner: str = None, **kwargs) -> str:
+        job_id = uuid.uuid4().hex
+        priority = USER_PRIORITIES.get(user, 0) if priority is None else priority
+        now = time.time()
+        score = schedule_score(cost, priority, now)
+        pipe = self.client.pipeline()
+        pipe.hset(self._key(job_id), mapping={
+            "job_id": job_id,
+            "status": "queued",
+            "submitted_at": now,
+            "fn": f"{fn.__module__}:{fn.__qualname__}",
+            "payload": json.dumps({"args": args, "kwargs": kwargs}),
+            "cost": cost,
+            "user": user or "",
+            "priority": priority,
+            "score": score,
+            "owner": owner or "",
+        })
+        pipe.zadd(self.pending, {job_id: score})
+        pipe.execute()
+        self.start_workers()
+        return job_id
+
+    def get(self, job_id: str) -> dict:
+        job = self.client.hgetall(self._key(job_id))
+        if not job:
+            return None
+        return {
+            "job_id": job_id,
+            "status": job.get("status"),
+            "submitted_at": _float(job.get("submitted_at")),
+            "started_at": _float(job.get("started_at")),
+            "finished_at": _float(job.get("finished_at")),
+            "result": json.loads(job["result"]) if job.get("result") else None,
+            "error": job.get("error"),
+            "worker": job.get("worker"),
+            "cost": _float(job.get("cost")),
+            "user": job.get("user") or None,
+            "priority": int(job.get("priority") or 0),
+            "owner": job.get("owner") or None,
+        }
+
+    def metrics(self) -> dict:
+        """Queue depth, queued work per user and recent wait times, across every node"""
+        job_ids = self.client.zrange(self.pending, 0, -1)
+        pipe = self.client.pipeline()
+        for job_id in job_ids:
+            pipe.hmget(self._key(job_id), "user", "cost", "submitted_at")
+        queued = [
+            {"user": user, "cost": _float(cost), "submitted_at": _float(submitted_at) or time.time()}
+            for user, cost, submitted_at in pipe.execute()
+        ]
+        running = self.client.llen(self.processing)
+        waits = [float(w) for w in self.client.lrange(self.waits, 0, -1)]
+        return queue_metrics(queued, running, waits)
+
+    def start_workers(self, count: int = None):
+        """Start consuming the queue in this process (once)"""
+        count = self.workers if count is None else count
+        with self._lock:
+            if self._started or count <= 0:
+                return
+            self._started = True
+        self.requeue_stale()
+        for i in range(count):
+            threading.Thread(target=self._work, name=f"analysis-{i}", daemon=True).start()
+        threading.Thread(target=self._reap, name="job-reaper", daemon=True).start()
+
+    def _reap(self):
+        """Requeue lost workers' jobs while this process runs, not only when one starts"""
+        while True:
+            time.sleep(JOB_LEASE_SECONDS / 4)
+            try:
+                self.requeue_stale()
+            except Exception as e:
+                print(f"⚠️ Stale job check failed: {e}")
+
+    def requeue_stale(self) -> int:
+        """Put back jobs whose worker disappeared mid-run"""
+        requeued = 0
+        for job_id in self.client.lrange(self.processing, 0, -1):
+            job = self.client.hgetall(self._key(job_id))
+            if not job or job.get("status") in ("done", "failed"):
+                self.client.lrem(self.processing, 0, job_id)
+            elif time.time() - float(job["heartbeat_at"]) > JOB_LEASE_SECONDS:
+                if self.client.lrem(self.processing, 0, job_id):
+                    self.client.hset(self._key(job_id), "status", "queued")
+                    self.client.zadd(self.pending, {job_id: float(job["score"])})
+                    requeued += 1
+        if requeued:
+            print(f"🔁 Requeued {requeued} jobs left running by a lost worker")
+        return requeued
+
+    def _work(self):
+        worker = f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+        while True:
+            try:
+                job_id = self._pop(keys=[self.pending, self.processing], args=[self._key(""), time.time()])
+            except Exception as e:
+                print(f"⚠️ Job queue unavailable: {e}")
+                time.sleep(5)
+                continue
+            if job_id:
+                self._run(job_id, worker)
+            else:
+                time.sleep(self.POLL_SECONDS)
+
+    def _run(self, job_id: str, worker: str):
+        key = self._key(job_id)
+        job = self.client.hgetall(key)
+        if not job:
+            self.client.lrem(self.processing, 0, job_id)
+            return
+        started = time.time()
+        pipe = self.client.pipeline()
+        pipe.hset(key, mapping={"status": "running", "started_at": started, "worker": worker})
+        pipe.lpush(self.waits, started - (_float(job.get("submitted_at")) or started))
+        pipe.ltrim(self.waits, 0, WAIT_SAMPLES - 1)
+        pipe.execute()
+        finished = threading.Event()
+        threading.Thread(target=self._heartbeat, args=(key, finished), name=f"heartbeat-{job_id[:8]}",
+                         daemon=True).start()
+        try:
+            module, _, name = job["fn"].partition(":")
+            fn = importlib.import_module(module)
+            for attr in name.split("."):
+                fn = getattr(fn, attr)
+            payload = json.loads(job["payload"])
+            result = fn(*payload["args"], **payload["kwargs"])
+            self.client.hset(key, mapping={
+                "status": "done", "result": json.dumps(result, default=str), "finished_at": time.time()
+            })
+        except Exception as e:
+            print(f"❌ Job {job_id} failed: {e}")
+            self.client.hset(key, mapping={"status": "failed", "error": str(e), "finished_at": time.time()})
+        finally:
+            finished.set()
+            self.client.expire(key, JOB_TTL_SECONDS)
+            self.client.lrem(self.processing, 0, job_id)
+
+    def _heartbeat(self, key: str, finished: threading.Event):
+        """Keep the running job's lease fresh until it finishes"""
+        while not finished.wait(JOB_HEARTBEAT_SECONDS):
+            try:
+                self.client.hset(key, "heartbeat_at", time.time())
+            except Exception as e:
+                print(f"⚠️ Job heartbeat failed: {e}")
+
+
+def _float(value):
+    return float(value) if value not in (None, "") else None
+
+
+def create_job_manager():
+    """Redis queue when REDIS_URL is reachable, in-process thread pool otherwise"""
+    from src.graph.redis_client import get_redis
+    client = get_redis()
+    return RedisJobManager(client) if client else JobManager()
+
+
+jobs = create_job_manager()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analysis job worker (needs REDIS_URL)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    worker_cmd = sub.add_parser("worker", help="Run analysis jobs from the shared queue")
+    worker_cmd.add_argument("--workers", type=int, default=MAX_WORKERS)
+    args = parser.parse_args()
+
+    if not isinstance(jobs, RedisJobManager):
+        raise SystemExit("REDIS_URL is not set or Redis is unreachable - nothing to consume")
+    # Job functions live in the web app modules; import them like a web process would
+    import src.app  # noqa: F401
+    from src.graph.digest import start_flusher
+    jobs.start_workers(args.workers)
+    start_flusher()
+    print(f"👷 Worker running {args.workers} analysis threads on {socket.gethostname()}")
+    while True:
+        time.sleep(3600)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+PDF upload handling - bounded memory regardless of upload size
+The upload is copied to a spooled temporary file (in memory while small, on
+disk beyond SPOOL_MEMORY_BYTES) with a hard size cap, checked to be a PDF
+before pdfplumber touches it, page-count limited, and read through mmap with
+each page released as soon as its text is extracted.
+"""
+import mmap
+import os
+import tempfile
+
+MAX_UPLOAD_MB = float(os.getenv("MAX_UPLOAD_MB", "20"))
+MAX_UPLOAD_BYTES = int(MAX_UPLOAD_MB * 1024 * 1024)
+MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", "100"))
+# Uploads larger than this are spooled to disk instead of memory
+SPOOL_MEMORY_BYTES = int(os.getenv("UPLOAD_SPOOL_MEMORY_BYTES", str(1024 * 1024)))
+CHUNK_BYTES = 64 * 1024
+
+
+class UploadError(ValueError):
+    """Upload rejected before analysis; status is the HTTP status to return"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def spool_upload(stream, max_bytes: int = MAX_UPLOAD_BYTES):
+    """
+    Copy an upload stream into a SpooledTemporaryFile, chunk by chunk
+    Raises UploadError (413) as soon as the upload passes max_bytes
+    """
+    spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES, suffix=".pdf")
+    size = 0
+    try:
+        while True:
+            chunk = stream.read(CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadError(f"File is larger than the {MAX_UPLOAD_MB:g} MB limit", 413)
+            spooled.write(chunk)
+    except BaseException:
+        spooled.close()
+        raise
+    spooled.seek(0)
+    return spooled
+
+
+def validate_pdf(fileobj):
+    """Cheap structural check (header and EOF marker) before any real parsing"""
+    fileobj.seek(0)
+    head = fileobj.read(1024)
+    if b"%PDF-" not in head:
+        raise UploadError("File is not a PDF")
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(max(0, size - 2048))
+    if b"%%EOF" not in fileobj.read():
+        raise UploadError("PDF is truncated or corrupt (no end-of-file marker)")
+    fileobj.seek(0)
+
+
+def _open_for_reading(spooled):
+    """mmap the spooled file once it lives on disk, otherwise read it in place"""
+    if getattr(spooled, "_rolled", False):
+        return mmap.mmap(spooled.fileno(), 0, access=mmap.ACCESS_READ)
+    spooled.seek(0)
+    return spooled
+
+
+def read_pdf_upload(stream, max_pages: int = MAX_PDF_PAGES) -> list:
+    """
+    Spool, validate and extract an uploaded PDF, one string per page
+
+    Raises:
+        UploadError: too large, not a PDF, or too many pages
+    """
+    import pdfplumber  # slow import, only needed once a PDF arrives
+
+    with spool_upload(stream) as spooled:
+        validate_pdf(spooled)
+        source = _open_for_reading(spooled)
+        try:
+            with pdfplumber.open(source) as pdf:
+                page_count = len(pdf.pages)
+                if page_count > max_pages:
+                    raise UploadError(f"PDF has {page_count} pages; the limit is {max_pages}", 413)
+                pages = []
+                for page in pdf.pages:
+                    pages.append(page.extract_text() or "")
+                    # Drop the page's parsed layout objects before moving on
+                    page.close()
+                return pages
+        except UploadError:
+            raise
+        except Exception as e:
+            raise UploadError(f"Could not read PDF: {e}")
+        finally:
+            if isinstance(source, mmap.mmap):
+                source.close()